@@ -0,0 +1,96 @@
+"""
+捕获解码基准测试：用合成的pcapng文件代替网卡，测量DumpcapCapturer进程内解码的吞吐量，
+可选对比 tshark -r 读取同一文件并做显示过滤的耗时
+
+用法（在项目根目录下运行）:
+    python -m benchmarks.capture_ingest --media-mb 50 --noise 2000 --repeat 3
+    python -m benchmarks.capture_ingest --tshark "C:\\Program Files\\Wireshark\\tshark.exe"
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import tempfile
+import time
+
+from src.dumpcap_capture import DumpcapCapturer
+from src.synthetic_capture import generate_publish_capture
+
+# 与app.py相同的显示过滤器
+DISPLAY_FILTER = (
+    "rtmpt && "
+    "(amf.string == \"connect\" || "
+    "amf.string == \"releaseStream\" || "
+    "amf.string == \"FCPublish\" || "
+    "amf.string == \"publish\")"
+)
+
+
+def run_dumpcap_backend(path: str) -> dict:
+    """用DumpcapCapturer读取捕获文件，返回耗时和结果"""
+    capturer = DumpcapCapturer()
+    capturer.set_input_file(path)
+    start = time.perf_counter()
+    capturer.start()
+    capturer.wait()
+    elapsed = time.perf_counter() - start
+    result = {
+        'seconds': elapsed,
+        'lines': capturer.get_captured_count(),
+        'stream_info': capturer.get_stream_info(),
+        'stats': capturer.get_decoder_stats()
+    }
+    capturer.close()
+    return result
+
+
+def run_tshark(tshark_path: str, path: str) -> dict:
+    """用 tshark -r 读取同一文件（完整解析每个数据包后再过滤），返回耗时和输出行数"""
+    capturer = DumpcapCapturer()
+    command = [tshark_path, '-r', path, '-Y', DISPLAY_FILTER, '-T', 'fields', '-E', 'separator=;']
+    for field in capturer.default_fields:
+        command.extend(['-e', field])
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', errors='ignore')
+    elapsed = time.perf_counter() - start
+    return {'seconds': elapsed, 'lines': len([line for line in result.stdout.splitlines() if line.strip()])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="捕获解码基准测试")
+    parser.add_argument("--media-mb", type=float, default=20.0, help="推流后的音视频数据量（MB）")
+    parser.add_argument("--noise", type=int, default=1000, help="无关连接的数据包规模")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数")
+    parser.add_argument("--tshark", help="可选，tshark可执行文件路径，用于对比")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(prefix="capture_ingest_"), "publish.pcapng")
+    expected = generate_publish_capture(path, media_bytes=int(args.media_mb * 1024 * 1024), noise=args.noise)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"合成捕获: {expected['packets']} 个数据包，{size_mb:.1f} MB")
+
+    timings = []
+    result = None
+    for _ in range(args.repeat):
+        result = run_dumpcap_backend(path)
+        timings.append(result['seconds'])
+    median = statistics.median(timings)
+    ok = result['stream_info'] == {'server': expected['server'], 'stream_code': expected['stream_key']}
+    print(f"{'✅' if ok else '❌'} dumpcap后端: 中位数 {median * 1000:.1f} ms，"
+          f"{expected['packets'] / median:,.0f} 包/秒，{size_mb / median:.0f} MB/秒，输出 {result['lines']} 行")
+    print(f"   {result['stats']}")
+
+    if args.tshark:
+        tshark_timings = []
+        for _ in range(args.repeat):
+            tshark_result = run_tshark(args.tshark, path)
+            tshark_timings.append(tshark_result['seconds'])
+        tshark_median = statistics.median(tshark_timings)
+        print(f"tshark -r -Y: 中位数 {tshark_median * 1000:.1f} ms，输出 {tshark_result['lines']} 行，"
+              f"dumpcap后端快 {tshark_median / median:.1f} 倍")
+
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
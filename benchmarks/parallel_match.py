@@ -0,0 +1,75 @@
+"""
+并行模板匹配基准测试：对比顺序匹配与线程池并行匹配的耗时
+
+用法（在项目根目录下运行）:
+    python -m benchmarks.parallel_match --size 1920x1080 --workers 4 --repeat 20
+"""
+import argparse
+import statistics
+import time
+
+from src.application_operation import WindowController, TemplateSpec
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import compose_frame
+
+# 与app.py中开始直播流程相同的模板列表
+TEMPLATES = [
+    TemplateSpec("main_stop_live.png"),
+    TemplateSpec("main_start_live.png"),
+    TemplateSpec("main_live_stopped_return.png"),
+    TemplateSpec("sec_restore_live_broadcast_screen.png", 0.85, (0.75, 0.875)),
+    TemplateSpec("sec_failed_resume_live.png", 0.85, (0.75, 0.75)),
+    TemplateSpec("sec_no_sound_reminder.png", 0.85, (0.5, 0.875)),
+    TemplateSpec("sec_confirm_withdrawal.png", 0.85, (0.25, 0.875)),
+    TemplateSpec("sec_confirm_withdrawal_live.png", 0.85, (0.25, 0.875)),
+    TemplateSpec("sec_true_stop_live_is.png", 0.85, (0.25, 0.875)),
+]
+
+
+def run_case(controller: WindowController, workers: int, first_only: bool, repeat: int) -> list:
+    """重复执行match_all，返回每次耗时（秒）"""
+    controller.set_match_workers(workers)
+    controller.match_all(TEMPLATES, first_only=first_only, use_last_screenshot=True)  # 预热
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        controller.match_all(TEMPLATES, first_only=first_only, use_last_screenshot=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并行模板匹配基准测试")
+    parser.add_argument("--img-tmp-dir", default="img_tmp", help="模板目录")
+    parser.add_argument("--size", default="1920x1080", help="合成窗口尺寸，如1920x1080")
+    parser.add_argument("--workers", type=int, default=4, help="并行匹配线程数")
+    parser.add_argument("--repeat", type=int, default=20, help="每种情况重复次数")
+    args = parser.parse_args()
+
+    width, height = (int(value) for value in args.size.lower().split("x"))
+
+    # 只嵌入最后一个模板，first_only时顺序匹配需要检查全部模板
+    frame, embedded = compose_frame(args.img_tmp_dir, [TEMPLATES[-1].template_path], (width, height))
+
+    backend = ReplayBackend(advance='manual')
+    controller = WindowController(frame_source=backend)
+    controller.set_img_tmp_dir(args.img_tmp_dir)
+    controller.set_window_handle(backend.add_window([frame]))
+    controller.use_region_search = False  # 只比较全图匹配的耗时
+    controller.use_frame_cache = False  # 每次都实际执行匹配
+    controller.capture_frame()
+
+    print(f"窗口尺寸: {width}x{height}，模板数量: {len(TEMPLATES)}，嵌入: {embedded}")
+    for first_only in (False, True):
+        sequential = run_case(controller, 0, first_only, args.repeat)
+        parallel = run_case(controller, args.workers, first_only, args.repeat)
+        sequential_ms = statistics.median(sequential) * 1000
+        parallel_ms = statistics.median(parallel) * 1000
+        print(f"first_only={first_only}: 顺序 {sequential_ms:.1f} ms, "
+              f"{args.workers}线程 {parallel_ms:.1f} ms, 加速比 {sequential_ms / parallel_ms:.2f}x")
+
+    controller.close()
+
+
+if __name__ == "__main__":
+    main()
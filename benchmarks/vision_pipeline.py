@@ -0,0 +1,296 @@
+"""
+视觉流水线基准测试：截图 → 准备BGR截图 → 模板匹配（按DPI预先缩放的模板） → 坐标计算
+
+在多种分辨率和DPI缩放下合成窗口截图（img_tmp模板嵌入已知位置），对每种匹配模式报告
+每秒匹配次数、各阶段耗时分位数、峰值内存和定位准确率，结果保存为JSON，可与基线对比发现性能退化
+
+用法（在项目根目录下运行）:
+    python -m benchmarks.vision_pipeline --repeat 10
+    python -m benchmarks.vision_pipeline --output benchmarks/results/new.json --baseline benchmarks/results/old.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from src.application_operation import WindowController, TemplateSpec
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import compose_frame
+
+# 与开始直播流程相同的模板列表，未嵌入截图的模板用于测量不匹配时的耗时
+TEMPLATES = [
+    TemplateSpec("main_stop_live.png"),
+    TemplateSpec("main_start_live.png"),
+    TemplateSpec("main_live_stopped_return.png"),
+    TemplateSpec("sec_restore_live_broadcast_screen.png", 0.85, (0.75, 0.875)),
+    TemplateSpec("sec_failed_resume_live.png", 0.85, (0.75, 0.75)),
+    TemplateSpec("sec_no_sound_reminder.png", 0.85, (0.5, 0.875)),
+    TemplateSpec("sec_confirm_withdrawal.png", 0.85, (0.25, 0.875)),
+    TemplateSpec("sec_confirm_withdrawal_live.png", 0.85, (0.25, 0.875)),
+    TemplateSpec("sec_true_stop_live_is.png", 0.85, (0.25, 0.875)),
+]
+
+# 嵌入截图中的模板
+EMBEDDED = ["main_start_live.png", "sec_no_sound_reminder.png", "sec_true_stop_live_is.png"]
+
+STAGES = ("capture", "scale", "match", "coordinates", "total")
+
+
+def setup_full(controller: WindowController):
+    """全分辨率全图匹配"""
+    controller.set_match_mode('full')
+    controller.use_region_search = False
+
+
+def setup_pyramid(controller: WindowController):
+    """金字塔由粗到精匹配"""
+    controller.set_match_mode('pyramid')
+    controller.use_region_search = False
+
+
+def setup_region(controller: WindowController):
+    """全分辨率匹配，优先在上次匹配位置附近搜索（预热一轮后生效）"""
+    controller.set_match_mode('full')
+    controller.use_region_search = True
+
+
+def setup_multiscale(controller: WindowController):
+    """金字塔匹配 + 多尺度匹配：窗口报告错误的DPI（1.0），一轮全部未匹配后搜索并锁定缩放比例"""
+    controller.set_match_mode('pyramid')
+    controller.use_region_search = False
+    controller.set_scale_search(True, miss_threshold=1)
+    controller.dpi_scale = 1.0
+    controller.match_all(TEMPLATES)
+
+
+# 匹配模式 -> 控制器设置函数
+MODES = {
+    'full': setup_full,
+    'pyramid': setup_pyramid,
+    'region': setup_region,
+    'multiscale': setup_multiscale,
+}
+
+
+def run_pipeline(controller: WindowController, timings: Dict[str, List[float]]) -> List[Dict]:
+    """
+    执行一次完整流水线并记录各阶段耗时
+
+    Returns:
+        匹配成功的坐标信息列表
+    """
+    start = time.perf_counter()
+    frame = controller.capture_frame()
+    captured = time.perf_counter()
+    screenshot_cv = controller._prepare_screenshot(frame)
+    scaled = time.perf_counter()
+
+    hits = []
+    for spec in TEMPLATES:
+        template, template_size = controller.load_template(spec.template_path, controller.dpi_scale)
+        match_result = controller._match_with_region_memory(screenshot_cv, spec.template_path, template,
+                                                            template_size, spec.confidence)
+        if match_result[0] is not None:
+            hits.append((spec, match_result, template_size))
+    matched = time.perf_counter()
+
+    coordinates = []
+    for spec, match_result, template_size in hits:
+        result = controller._calculate_match_coordinates(match_result[0], template_size, 1.0,
+                                                         controller.hwnd, spec.click_position_ratio)
+        result['template_path'] = spec.template_path
+        coordinates.append(result)
+    end = time.perf_counter()
+
+    timings['capture'].append(captured - start)
+    timings['scale'].append(scaled - captured)
+    timings['match'].append(matched - scaled)
+    timings['coordinates'].append(end - matched)
+    timings['total'].append(end - start)
+    return coordinates
+
+
+def accuracy(coordinates: List[Dict], embedded: Dict[str, Tuple[int, int, int, int]], tolerance: int = 3) -> float:
+    """
+    定位准确率
+
+    Args:
+        coordinates: 匹配成功的坐标信息
+        embedded: 嵌入模板的物理像素位置 {模板文件名: (x, y, 宽度, 高度)}
+
+    Returns:
+        匹配位置与嵌入位置相差不超过tolerance像素的模板比例
+    """
+    found = {result['template_path']: result for result in coordinates}
+    correct = 0
+    for name, (x, y, _, _) in embedded.items():
+        result = found.get(name)
+        if result is None:
+            continue
+        match_x, match_y = result['match_position_scaled']
+        if abs(match_x - x) <= tolerance and abs(match_y - y) <= tolerance:
+            correct += 1
+    return correct / len(embedded) if embedded else 1.0
+
+
+def run_case(img_tmp_dir: str, size: Tuple[int, int], scale: float, mode: str, repeat: int) -> Dict:
+    """运行一种 分辨率/DPI/匹配模式 组合"""
+    frame, embedded = compose_frame(img_tmp_dir, EMBEDDED, size, scale, seed=1)
+
+    backend = ReplayBackend(advance='manual')
+    controller = WindowController(frame_source=backend)
+    controller.set_img_tmp_dir(img_tmp_dir)
+    controller.set_window_handle(backend.add_window([frame], dpi_scale=scale))
+    MODES[mode](controller)
+
+    warmup = {stage: [] for stage in STAGES}
+    run_pipeline(controller, warmup)  # 预热：加载模板缓存、学习匹配区域
+
+    timings = {stage: [] for stage in STAGES}
+    coordinates = []
+    for _ in range(repeat):
+        coordinates = run_pipeline(controller, timings)
+
+    # 单独测量峰值内存，避免tracemalloc的开销影响耗时
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run_pipeline(controller, {stage: [] for stage in STAGES})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    controller.close()
+
+    total = sum(timings['total'])
+    return {
+        'size': list(size),
+        'scale': scale,
+        'mode': mode,
+        'repeat': repeat,
+        'matches_per_sec': len(TEMPLATES) * repeat / total if total else 0.0,
+        'accuracy': accuracy(coordinates, embedded),
+        'peak_memory_mb': peak / 1024 / 1024,
+        'stages': {stage: percentiles(values) for stage, values in timings.items()}
+    }
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """计算耗时分位数（毫秒）"""
+    data = np.array(values) * 1000
+    return {
+        'p50': float(np.percentile(data, 50)),
+        'p90': float(np.percentile(data, 90)),
+        'p99': float(np.percentile(data, 99)),
+        'mean': float(data.mean())
+    }
+
+
+def case_key(case: Dict) -> str:
+    width, height = case['size']
+    return f"{width}x{height}@{case['scale']:g}/{case['mode']}"
+
+
+def environment() -> Dict:
+    """记录运行环境和代码版本，便于对比不同版本的结果"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'time': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'python': sys.version.split()[0],
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    与基线结果对比
+
+    Returns:
+        性能退化描述列表（p50耗时增加或每秒匹配次数下降超过threshold比例）
+    """
+    baseline_cases = {case_key(case): case for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        key = case_key(case)
+        old = baseline_cases.get(key)
+        if old is None:
+            continue
+        for stage in STAGES:
+            old_p50 = old['stages'][stage]['p50']
+            new_p50 = case['stages'][stage]['p50']
+            if old_p50 > 0.05 and new_p50 > old_p50 * (1 + threshold):
+                regressions.append(f"{key} {stage} p50: {old_p50:.2f}ms -> {new_p50:.2f}ms")
+        if case['matches_per_sec'] < old['matches_per_sec'] * (1 - threshold):
+            regressions.append(f"{key} 每秒匹配: {old['matches_per_sec']:.1f} -> {case['matches_per_sec']:.1f}")
+        if case['accuracy'] < old['accuracy']:
+            regressions.append(f"{key} 准确率: {old['accuracy']:.2f} -> {case['accuracy']:.2f}")
+    return regressions
+
+
+def parse_sizes(value: str) -> List[Tuple[int, int]]:
+    return [tuple(int(part) for part in size.lower().split("x")) for size in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视觉流水线基准测试")
+    parser.add_argument("--img-tmp-dir", default="img_tmp", help="模板目录")
+    parser.add_argument("--sizes", default="1280x720,1920x1080,2560x1440", help="合成窗口尺寸，逗号分隔")
+    parser.add_argument("--scales", default="1.0,1.25,1.5", help="DPI缩放比例，逗号分隔")
+    parser.add_argument("--modes", default=",".join(MODES), help="匹配模式，逗号分隔")
+    parser.add_argument("--repeat", type=int, default=10, help="每种组合重复次数")
+    parser.add_argument("--output", help="结果JSON文件，默认 benchmarks/results/<提交>.json")
+    parser.add_argument("--baseline", help="用于对比的基线结果JSON文件")
+    parser.add_argument("--threshold", type=float, default=0.2, help="视为性能退化的变化比例")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    for mode in modes:
+        if mode not in MODES:
+            parser.error(f"不支持的匹配模式: {mode}")
+
+    results = {'environment': environment(), 'cases': []}
+    print(f"{'组合':<28}{'匹配/秒':>10}{'准确率':>8}{'内存MB':>9}" +
+          "".join(f"{stage + ' p50/p90':>22}" for stage in STAGES))
+    for size in parse_sizes(args.sizes):
+        for scale in (float(value) for value in args.scales.split(",")):
+            for mode in modes:
+                case = run_case(args.img_tmp_dir, size, scale, mode, args.repeat)
+                results['cases'].append(case)
+                stages = "".join(f"{case['stages'][stage]['p50']:>13.2f}/{case['stages'][stage]['p90']:<8.2f}"
+                                 for stage in STAGES)
+                print(f"{case_key(case):<28}{case['matches_per_sec']:>10.1f}{case['accuracy']:>8.2f}"
+                      f"{case['peak_memory_mb']:>9.1f}{stages}")
+
+    output = args.output or os.path.join("benchmarks", "results", f"{results['environment']['commit'] or 'latest'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存: {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"⚠️  相对基线 {baseline['environment'].get('commit')} 的性能退化:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"与基线 {baseline['environment'].get('commit')} 相比没有性能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,109 @@
-import ctypes
-import subprocess
-
-# 尝试设置为“每显示器DPI感知”，这是最推荐的方式
-try:
-    # 2 = PROCESS_PER_MONITOR_DPI_AWARE
-    ctypes.windll.shcore.SetProcessDpiAwareness(2)
-except Exception as e:
-    # 如果上面的API不存在（如Win8.1以下），尝试旧版API
-    try:
-        # 1 = PROCESS_SYSTEM_DPI_AWARE
-        ctypes.windll.shcore.SetProcessDpiAwareness(1)
-    except:
-        # 终极备选方案：使用user32的旧API
-        ctypes.windll.user32.SetProcessDPIAware()
-
-import os
+import threading
 import time
-from ctypes import windll
-from typing import Optional, Tuple, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, List, NamedTuple, Union
 
 import cv2
 import numpy as np
-import win32api
-import win32con
-import win32gui
-import win32ui
 from PIL import Image
 from cv2 import Mat
 
+from src.backends import FrameSource, InputSink
+from src.frame import Frame
+from src.frame_change import FrameChangeDetector
+from src.metrics import Metrics
+from src.region_memory import RegionMemory
+from src.scale_selector import ScaleSelector
+from src.scheduler import PollScheduler
+from src.session_recorder import SessionRecorder
+from src.template_store import TemplateStore
+from src.waits import WaitResult, WaitStats, poll_until
+from src.window_registry import WindowRegistry
+
+
+class TemplateSpec(NamedTuple):
+    """批量匹配时的模板描述"""
+    template_path: str  # 模板图像文件名
+    confidence: float = 0.7  # 匹配置信度阈值
+    click_position_ratio: tuple = (0.5, 0.5)  # 点击位置比例 (x_ratio, y_ratio)
+
+    @classmethod
+    def from_value(cls, value: Union['TemplateSpec', str, tuple, Dict]) -> 'TemplateSpec':
+        """将模板文件名、元组或字典转换为TemplateSpec"""
+        if isinstance(value, cls):
+            spec = value
+        elif isinstance(value, str):
+            spec = cls(value)
+        elif isinstance(value, dict):
+            spec = cls(**value)
+        else:
+            spec = cls(*value)
+        # 点击位置比例统一为元组，保证TemplateSpec可以作为缓存键
+        return spec._replace(click_position_ratio=tuple(spec.click_position_ratio))
+
 
 class WindowController:
     """窗口控制器类，用于处理窗口查找、截图、模板匹配和点击操作"""
 
-    def __init__(self, launcher_path: str = r"C:\Program Files (x86)\webcast_mate\直播伴侣 Launcher.exe"):
+    def __init__(self, launcher_path: str = r"C:\Program Files (x86)\webcast_mate\直播伴侣 Launcher.exe",
+                 frame_source: Optional[FrameSource] = None, input_sink: Optional[InputSink] = None,
+                 template_store: Optional[TemplateStore] = None, window_registry: Optional[WindowRegistry] = None,
+                 process_id: Optional[int] = None):
         """
         初始化窗口控制器
 
         Args:
-            launcher_path: 应用程序启动路径
+            launcher_path: 应用程序启动路径，为空时不自动启动程序
+            frame_source: 截图来源，默认使用Win32后端
+            input_sink: 输入接口，默认与frame_source相同（如果它也实现了InputSink）或使用Win32后端
+            template_store: 可选，与其他控制器共享的模板缓存
+            window_registry: 可选，与其他控制器共享的窗口注册表（需使用同一个frame_source）
+            process_id: 可选，只操作属于该进程的窗口（同时控制多个直播伴侣实例时使用）
         """
-        self.img_tmp_dir = "../img_tmp"
-        self._set_dpi_awareness()
+        self.img_tmp_dir = template_store.img_tmp_dir if template_store else "../img_tmp"
+        self._owns_backend = frame_source is None
+        if frame_source is None:
+            from src.win32_backend import Win32Backend  # 只在Windows上导入win32模块
+            frame_source = Win32Backend()
+        if input_sink is None:
+            if isinstance(frame_source, InputSink):
+                input_sink = frame_source
+            else:
+                from src.win32_backend import Win32Backend
+                input_sink = Win32Backend()
+        self.frame_source = frame_source
+        self.input_sink = input_sink
         self.launcher_path = launcher_path
         self.hwnd = None  # 当前操作的窗口句柄
         self.dpi_scale = 1.0  # DPI缩放比例
-        self.last_screenshot = None  # 最后一张截图
-
-    @staticmethod
-    def _set_dpi_awareness():
-        """设置DPI感知，确保截图和坐标计算的准确性"""
-        try:
-            # 2 = PROCESS_PER_MONITOR_DPI_AWARE
-            ctypes.windll.shcore.SetProcessDpiAwareness(2)
-        except Exception as e:
-            try:
-                # 1 = PROCESS_SYSTEM_DPI_AWARE
-                ctypes.windll.shcore.SetProcessDpiAwareness(1)
-            except:
-                # 终极备选方案：使用user32的旧API
-                ctypes.windll.user32.SetProcessDPIAware()
+        self.last_frame: Optional[Frame] = None  # 最后一张截图帧
+        self.black_threshold = 0.99  # 全黑检测：黑色采样点比例阈值
+        self.black_sample_grid = (32, 32)  # 全黑检测：采样网格 (列数, 行数)
+        self.black_level = 10  # 全黑检测：平均亮度低于该值视为黑色
+        self.template_store = template_store or TemplateStore(self.img_tmp_dir)  # 模板缓存
+        self.region_memory = RegionMemory()  # 模板上次匹配位置
+        self.use_region_search = True  # 是否优先在上次匹配位置附近搜索
+        self.match_mode = 'full'  # 全图匹配模式: 'full' 全分辨率彩色匹配, 'pyramid' 由粗到精的金字塔匹配
+        self.pyramid_factor = 0.5  # 金字塔粗匹配的降采样系数
+        self.pyramid_candidates = 3  # 金字塔粗匹配保留的候选位置数量
+        self._pyramid_frame = (None, None)  # (截图, 降采样灰度截图)，同一张截图只降采样一次
+        self.match_workers = 0  # 批量匹配的线程数，0表示顺序匹配
+        self._match_executor: Optional[ThreadPoolExecutor] = None
+        self.frame_change = FrameChangeDetector()  # 帧变化检测器
+        self.use_frame_cache = True  # 截图未变化时是否复用上次的匹配结果
+        self.frame_cache_max_age = 2.0  # 缓存匹配结果的最长复用时间（秒）
+        self._frame_states: Dict[int, Dict] = {}  # 窗口句柄 -> 上一帧指纹和匹配结果缓存
+        self.cached_match_count = 0  # 复用缓存结果的模板次数
+        self.evaluated_match_count = 0  # 实际执行匹配的模板次数
+        self.wait_interval = (0.02, 0.25)  # 条件等待的 (初始, 最大) 轮询间隔（秒）
+        self.wait_stats = WaitStats()  # 条件等待统计
+        self.scheduler = PollScheduler()  # 每个窗口的自适应轮询调度
+        self.window_registry = window_registry or WindowRegistry(self.frame_source)  # 窗口枚举、DPI和角色缓存
+        self.process_id = process_id  # 只操作属于该进程的窗口，None表示不限
+        self.metrics = Metrics()  # 分阶段耗时统计，默认关闭
+        self.recorder: Optional[SessionRecorder] = None  # 会话录制器，默认不录制
+        self.use_scale_search = False  # 是否启用多尺度匹配（DPI不准确时搜索并锁定匹配缩放比例）
+        self.scale_selector = ScaleSelector()  # 每个窗口锁定的匹配缩放比例
 
     def find_window(self, class_name: str, window_name: str, start_program: bool = True,
                     timeout: int = 10, retry_interval: float = 1.0) -> Optional[int]:
@@ -75,97 +120,57 @@ class WindowController:
         Returns:
             窗口句柄或None
         """
-        start_time = time.time()
+        last_start = [None]  # 上次尝试启动程序的时间，启动成功后不再重复启动
 
-        while time.time() - start_time < timeout:
+        def found():
             windows = self._get_windows(class_name, window_name)
-
             if windows:
-                self.hwnd = windows[0]
-                self.dpi_scale = self._get_dpi_scale(self.hwnd)
-                return self.hwnd
+                return windows[0]
 
             # 如果没找到窗口且允许启动程序
-            if start_program and not windows:
+            now = time.monotonic()
+            if start_program and (last_start[0] is None or
+                                  (last_start[0] > 0 and now - last_start[0] >= retry_interval)):
                 if self._start_program():
                     print(f"已启动程序，等待窗口出现...")
+                    last_start[0] = 0  # 已启动
+                else:
+                    last_start[0] = now
+            return None
 
-            time.sleep(retry_interval)
+        # 窗口刚启动时很快出现，先短间隔查找，再逐步放宽到retry_interval
+        result = poll_until(found, timeout, min(self.scheduler.min_interval * 5, retry_interval), retry_interval)
+        if result.satisfied:
+            self.set_window_handle(result.value)
+            return self.hwnd
 
         print(f"❌ 在{timeout}秒内未找到窗口: {class_name} - {window_name}")
         return None
 
-    @staticmethod
-    def _get_windows(class_name: str, window_name: str) -> List[int]:
+    def _get_windows(self, class_name: str, window_name: str) -> List[int]:
         """
         通过class和title获取窗口句柄
 
         Returns:
             窗口句柄列表
         """
-        target_windows = []
-
-        def enum_window_callback(hwnd, extra):
-            """枚举窗口回调"""
-            try:
-                current_class = win32gui.GetClassName(hwnd)
-                current_title = win32gui.GetWindowText(hwnd)
-
-                if (current_class, current_title) == extra:
-                    target_windows.append(hwnd)
-            except:
-                pass
-            return True
-
-        try:
-            win32gui.EnumWindows(enum_window_callback, (class_name, window_name))
-        except:
-            pass
-
-        return target_windows
+        hwnds = self.window_registry.find(class_name, window_name)
+        if self.process_id is not None:
+            hwnds = [hwnd for hwnd in hwnds if self.window_registry.get_process_id(hwnd) == self.process_id]
+        return hwnds
 
     def _start_program(self) -> bool:
         """启动程序"""
-        if not os.path.exists(self.launcher_path):
-            print(f"❌ 程序路径不存在: {self.launcher_path}")
-            return False
-
-        try:
-            subprocess.Popen(self.launcher_path)
-            return True
-        except Exception as e:
-            print(f"❌ 启动程序失败: {e}")
+        if not self.launcher_path:
             return False
+        return self.input_sink.start_program(self.launcher_path)
 
-    @staticmethod
-    def _get_dpi_scale(hwnd) -> float:
-        """精确获取窗口的DPI缩放比例"""
-        try:
-            # 方法1: 使用GetDpiForWindow (Windows 10 1607+)
-            dpi = ctypes.windll.user32.GetDpiForWindow(hwnd)
-            return dpi / 96.0
-        except:
-            try:
-                # 方法2: 使用GetDpiForSystem作为备用
-                dpi = ctypes.windll.user32.GetDpiForSystem()
-                return dpi / 96.0
-            except:
-                try:
-                    # 方法3: 通过窗口边框估算（兼容性方案）
-                    left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-                    window_width = right - left
-
-                    client_rect = win32gui.GetClientRect(hwnd)
-                    client_width = client_rect[2]
-
-                    if window_width > 0 and client_width > 0:
-                        estimated_border = (window_width - client_width) / 2
-                        if estimated_border > 5:
-                            return estimated_border / 8.0
-                except:
-                    pass
-
-        return 1.0
+    def _get_dpi_scale(self, hwnd) -> float:
+        """精确获取窗口的DPI缩放比例，窗口尺寸没有变化时复用缓存结果；启用多尺度匹配时优先使用已锁定的比例"""
+        scale = self.window_registry.get_dpi_scale(hwnd)
+        if self.use_scale_search:
+            scale = self.scale_selector.get_scale(hwnd, scale)
+        return scale
 
     def set_window_handle(self, hwnd: int):
         """设置当前操作的窗口句柄"""
@@ -173,8 +178,10 @@ class WindowController:
         self.dpi_scale = self._get_dpi_scale(hwnd)
 
     def set_img_tmp_dir(self, img_tmp_dir: str):
-        """设置模板目录"""
+        """设置模板目录，并一次性预加载目录下的全部模板"""
         self.img_tmp_dir = img_tmp_dir
+        self.template_store.set_directory(img_tmp_dir)
+        self.template_store.preload()
 
     def capture_window(self, save_to_file: Optional[str] = None) -> Optional[Image.Image]:
         """
@@ -186,273 +193,553 @@ class WindowController:
         Returns:
             PIL图像对象或None
         """
-        if not self.hwnd:
-            print("❌ 未设置窗口句柄")
+        frame = self.capture_frame(save_to_file)
+        if frame is None:
             return None
+        with self.metrics.timer('pil_convert'):
+            return frame.to_pil()
 
-        try:
-            # 获取窗口位置和大小
-            left, top, right, bottom = win32gui.GetWindowRect(self.hwnd)
-            width = right - left
-            height = bottom - top
-
-            # 获取窗口设备上下文
-            hwnd_dc = win32gui.GetWindowDC(self.hwnd)
-            mfc_dc = win32ui.CreateDCFromHandle(hwnd_dc)
-            save_dc = mfc_dc.CreateCompatibleDC()
+    def capture_frame(self, save_to_file: Optional[str] = None) -> Optional[Frame]:
+        """
+        捕获当前窗口的截图帧，直接包装位图缓冲区，不经过PIL转换
 
-            # 创建位图
-            bitmap = win32ui.CreateBitmap()
-            bitmap.CreateCompatibleBitmap(mfc_dc, width, height)
-            save_dc.SelectObject(bitmap)
+        Args:
+            save_to_file: 可选，保存截图到文件
 
-            # 捕获窗口内容
-            result = windll.user32.PrintWindow(self.hwnd, save_dc.GetSafeHdc(), 3)
+        Returns:
+            Frame对象或None
+        """
+        if not self.hwnd:
+            print("❌ 未设置窗口句柄")
+            return None
 
-            if not result:
+        try:
+            with self.metrics.timer('capture'):
+                frame = self.frame_source.capture(self.hwnd)
+            if frame is None:
                 print("❌ 窗口捕获失败")
-                # 清理资源
-                win32gui.DeleteObject(bitmap.GetHandle())
-                save_dc.DeleteDC()
-                mfc_dc.DeleteDC()
-                win32gui.ReleaseDC(self.hwnd, hwnd_dc)
                 return None
 
-            # 转换为PIL图像
-            bmpinfo = bitmap.GetInfo()
-            bmpstr = bitmap.GetBitmapBits(True)
-
-            im = Image.frombuffer(
-                'RGB',
-                (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
-                bmpstr, 'raw', 'BGRX', 0, 1
-            )
-
             # 快速全黑检测
-            if self._is_image_mostly_black(im, threshold=0.99):
+            with self.metrics.timer('black_check'):
+                black = self._is_image_mostly_black(frame)
+            self.window_registry.note_frame(self.hwnd, black)
+            if black:
                 print("⚠️  截图可能为全黑或几乎全黑，可能是窗口最小化或不可见")
-                # 清理资源
-                win32gui.DeleteObject(bitmap.GetHandle())
-                save_dc.DeleteDC()
-                mfc_dc.DeleteDC()
-                win32gui.ReleaseDC(self.hwnd, hwnd_dc)
                 return None
 
-            # 清理资源
-            win32gui.DeleteObject(bitmap.GetHandle())
-            save_dc.DeleteDC()
-            mfc_dc.DeleteDC()
-            win32gui.ReleaseDC(self.hwnd, hwnd_dc)
-
-            self.last_screenshot = im
+            self.last_frame = frame
+            if self.recorder is not None:
+                self._record_frame(frame)
 
             # 保存到文件（如果需要）
             if save_to_file:
-                im.save(save_to_file)
+                frame.save(save_to_file)
                 print(f"📸 截图已保存: {save_to_file}")
 
-            return im
+            return frame
 
         except Exception as e:
             print(f"❌ 截图失败: {e}")
+            # 窗口可能已销毁，释放该窗口的截图资源
+            self.close_capture_session(self.hwnd)
+            self.window_registry.invalidate(self.hwnd)
             return None
 
-    def _is_image_mostly_black(self, image: Image.Image, threshold: float = 0.99) -> bool:
+    def start_recording(self, path: str) -> SessionRecorder:
         """
-        快速检测图像是否大部分为黑色
+        开始录制会话：之后的截图、匹配结果、点击和窗口操作都写入存档
 
         Args:
-            image: PIL图像对象
-            threshold: 黑色像素比例阈值，默认为0.99（99%）
+            path: 会话存档路径（.zip）
+        """
+        self.stop_recording()
+        self.recorder = SessionRecorder(path)
+        return self.recorder
+
+    def stop_recording(self) -> Optional[Dict]:
+        """
+        停止录制并关闭存档
 
         Returns:
-            如果大部分为黑色返回True，否则返回False
+            录制统计信息，没有在录制时返回None
         """
-        # 方法1：使用缩略图快速检测（最快）
-        # 创建缩略图（大大减少像素数量，加快处理速度）
-        thumbnail_size = (16, 16)  # 16x16足够检测大部分情况
-        thumbnail = image.resize(thumbnail_size, Image.Resampling.NEAREST)
+        if self.recorder is None:
+            return None
+        recorder, self.recorder = self.recorder, None
+        recorder.close()
+        return recorder.get_stats()
 
-        # 转换为灰度图
-        gray_thumb = thumbnail.convert('L')
+    def _record_frame(self, frame: Frame):
+        """录制截图帧，窗口信息变化时同时录制窗口信息"""
+        try:
+            info = self.frame_source.get_window_info(self.hwnd)
+            left, top, right, bottom = self.frame_source.get_window_rect(self.hwnd)
+            client_x, client_y = self.frame_source.screen_to_client(self.hwnd, (left, top))
+            self.recorder.record_window(self.hwnd, {
+                'class_name': info['class_name'],
+                'title': info['title'],
+                'process_id': self.window_registry.get_process_id(self.hwnd),
+                'rect': [left, top, right, bottom],
+                'client_offset': [client_x, client_y],
+                'dpi_scale': self.dpi_scale
+            })
+        except Exception as e:
+            print(f"⚠️  录制窗口信息失败: {e}")
+        self.recorder.record_frame(self.hwnd, frame)
 
-        # 获取像素数据（使用numpy提高速度）
-        import numpy as np
-        pixels = np.array(gray_thumb)
+    def close_capture_session(self, hwnd: int):
+        """释放窗口的截图资源"""
+        self.frame_source.release(hwnd)
 
-        # 计算黑色像素比例（像素值<10视为黑色）
-        black_pixel_count = np.sum(pixels < 10)
-        total_pixels = pixels.size
-        black_ratio = black_pixel_count / total_pixels
+    def get_capture_stats(self) -> Dict:
+        """获取截图资源分配统计，用于检查资源复用和泄漏"""
+        return self.frame_source.get_capture_stats()
 
-        # 如果黑色像素比例超过阈值，认为图像大部分为黑色
-        if black_ratio >= threshold:
-            return True
+    @property
+    def last_screenshot(self) -> Optional[Image.Image]:
+        """最后一张截图（PIL图像，访问时才转换）"""
+        return self.last_frame.to_pil() if self.last_frame is not None else None
 
-        # 方法2：采样检测（更快但可能不够准确）
-        # 只在图像中采样部分像素
-        width, height = image.size
-        sample_points = 100  # 采样点数量
+    @last_screenshot.setter
+    def last_screenshot(self, image: Optional[Image.Image]):
+        self.last_frame = Frame.from_pil(image) if image is not None else None
 
-        # 生成随机采样点
-        import random
-        random.seed(0)  # 设置固定种子以便重现结果
+    def _is_image_mostly_black(self, frame: Frame, threshold: Optional[float] = None) -> bool:
+        """
+        快速检测截图帧是否大部分为黑色（在原始缓冲区上向量化采样）
 
-        # 采样像素并检查
-        dark_count = 0
-        for _ in range(sample_points):
-            x = random.randint(0, width - 1)
-            y = random.randint(0, height - 1)
+        Args:
+            frame: 截图帧
+            threshold: 黑色像素比例阈值，默认使用 self.black_threshold
 
-            # 获取像素值（RGB）
-            pixel = image.getpixel((x, y))
+        Returns:
+            如果大部分为黑色返回True，否则返回False
+        """
+        if threshold is None:
+            threshold = self.black_threshold
+        return frame.is_mostly_black(threshold, self.black_sample_grid, self.black_level)
 
-            # 计算亮度（简单平均）
-            brightness = sum(pixel) / 3
+    def load_template(self, template_path: str, scale: float = 1.0) -> Tuple[Optional[Mat], Optional[Tuple[int, int]]]:
+        """
+        加载模板图像（从模板缓存中获取，只在首次使用或文件修改后读取磁盘）
 
-            # 如果亮度小于10，认为是黑色
-            if brightness < 10:
-                dark_count += 1
+        Args:
+            template_path: 模板图像文件名
+            scale: DPI缩放比例，不为1.0时返回预先缩放好的模板
 
-        # 如果大部分采样点都是黑色
-        if dark_count / sample_points >= threshold:
-            return True
+        Returns:
+            (模板图像, (宽度, 高度)) 或 (None, None)
+        """
+        return self.template_store.get(template_path, scale)
 
-        return False
+    def get_template_cache_stats(self) -> Dict:
+        """获取模板缓存的命中/未命中统计"""
+        return self.template_store.get_stats()
 
-    # 或者使用更快的版本（仅采样检测）：
-    def _is_image_mostly_black_fast(self, image: Image.Image, threshold: float = 0.99) -> bool:
+    def find_template(self, template_path: str, confidence: float = 0.7,
+                      use_last_screenshot: bool = False,
+                      click_position_ratio: tuple = (0.5, 0.5)) -> Optional[Dict]:
         """
-        更快速检测图像是否大部分为黑色（仅采样）
+        在当前窗口中查找模板图像
 
         Args:
-            image: PIL图像对象
-            threshold: 黑色像素比例阈值，默认为0.99（99%）
+            template_path: 模板图像路径
+            confidence: 匹配置信度阈值
+            use_last_screenshot: 是否使用最后一张截图
+            click_position_ratio: 点击位置比例 (x_ratio, y_ratio)，范围0-1
+                                  默认(0.5, 0.5)表示中心点
+                                  (0, 0)表示左上角，(1, 1)表示右下角
 
         Returns:
-            如果大部分为黑色返回True，否则返回False
+            包含匹配信息的字典或None
         """
-        width, height = image.size
+        with self.metrics.timer('find_template', template_path):
+            matches = self.match_all([TemplateSpec(template_path, confidence, click_position_ratio)],
+                                     use_last_screenshot=use_last_screenshot)
+        return matches[0] if matches else None
 
-        # 采样点数量（可根据图像大小调整）
-        if width * height < 10000:
-            sample_points = 50
-        else:
-            sample_points = 100
-
-        # 预计算采样位置（避免在循环中生成随机数）
-        import random
-        random.seed(0)  # 固定种子
-
-        # 生成采样位置
-        sample_positions = [
-            (random.randint(0, width - 1), random.randint(0, height - 1))
-            for _ in range(sample_points)
-        ]
-
-        # 统计黑色像素数量
-        dark_count = 0
-
-        # 批量获取像素值（比单个getpixel快）
-        pixels = image.load()  # 获取像素访问对象
-
-        for x, y in sample_positions:
-            try:
-                pixel = pixels[x, y]
-                # 如果是RGBA模式，只取RGB
-                if len(pixel) == 4:
-                    r, g, b, a = pixel
-                else:
-                    r, g, b = pixel
+    def match_all(self, templates: List[Union[TemplateSpec, str, tuple, Dict]], first_only: bool = False,
+                  use_last_screenshot: bool = False) -> List[Dict]:
+        """
+        只截图一次，按顺序在同一张截图中匹配多个模板
 
-                # 计算亮度（加权平均，更符合人眼感知）
-                brightness = 0.299 * r + 0.587 * g + 0.114 * b
+        截图与上一帧相比没有变化时直接返回缓存的匹配结果；只有部分图块变化时，
+        只重新匹配上次匹配位置与变化图块重叠（或位置未知）的模板
 
-                # 如果亮度小于阈值（15），认为是黑色
-                if brightness < 15:
-                    dark_count += 1
+        Args:
+            templates: 模板列表，元素可以是TemplateSpec、模板文件名、
+                       (模板文件名, 置信度, 点击位置比例) 元组或同名字段的字典
+            first_only: 是否在第一个匹配成功后立即返回
+            use_last_screenshot: 是否使用最后一张截图
 
-                    # 如果已经超过阈值，提前返回
-                    if dark_count / sample_points >= threshold:
-                        return True
-            except:
-                # 如果坐标越界，跳过
+        Returns:
+            按模板顺序排列的匹配信息字典列表（first_only时最多一个元素）
+        """
+        if not self.hwnd:
+            print("❌ 未设置窗口句柄")
+            return []
+
+        frame = self._get_screenshot(use_last_screenshot)
+        if frame is None:
+            return []
+
+        specs = [TemplateSpec.from_value(spec) for spec in templates]
+        with self.metrics.timer('frame_diff'):
+            cached_results = self._update_frame_state(frame)
+
+        # 找出缓存结果失效、需要重新匹配的模板
+        pending = []
+        cached_hit = False
+        for index, spec in enumerate(specs):
+            entry = cached_results.get(spec)
+            if entry is not None and self._is_cached_match_valid(spec, entry, frame.size):
+                self.cached_match_count += 1
+                self.metrics.increment('cached_matches', spec.template_path)
+                if entry['result']:
+                    cached_hit = True
+                    if first_only:
+                        break  # 排在后面的模板不会被用到
+                continue
+            pending.append(index)
+
+        screenshot_cv = None
+        pending_results = {}
+        if pending:
+            screenshot_cv = self._prepare_screenshot(frame)
+            pending_results = self._evaluate_specs(screenshot_cv, [specs[index] for index in pending], first_only)
+
+        # 多尺度匹配：连续多轮没有任何匹配（包括复用缓存结果的轮次）时，在候选缩放比例下重新匹配全部模板
+        if self.use_scale_search and self.scale_selector.record(self.hwnd,
+                                                                cached_hit or any(pending_results.values())):
+            if screenshot_cv is None:
+                screenshot_cv = self._prepare_screenshot(frame)
+            searched = self._search_scales(screenshot_cv, specs)
+            if searched is not None:
+                pending, pending_results = list(range(len(specs))), searched
+
+        evaluated = {}
+        now = time.monotonic()
+        for position, result in pending_results.items():
+            index = pending[position]
+            evaluated[index] = result
+            cached_results[specs[index]] = {'result': result, 'time': now, 'dirty': None}
+            if self.recorder is not None:
+                spec = specs[index]
+                self.recorder.record_match(self.hwnd, spec.template_path, spec.confidence,
+                                           spec.click_position_ratio, result)
+
+        matches = []
+        for index, spec in enumerate(specs):
+            if index in evaluated:
+                result = evaluated[index]
+            elif index not in pending and spec in cached_results:
+                result = cached_results[spec]['result']
+                result = dict(result) if result else None
+            else:
                 continue
+            if result:
+                matches.append(result)
+                if first_only:
+                    break
 
-        return dark_count / sample_points >= threshold
+        return matches
 
-    def load_template(self, template_path: str) -> Tuple[Optional[Mat], Optional[Tuple[int, int]]]:
+    def _update_frame_state(self, frame: Frame) -> Dict:
         """
-        加载模板图像
+        计算截图指纹并与当前窗口的上一帧对比，更新缓存结果的脏图块记录
+
+        Returns:
+            当前窗口的匹配结果缓存 {TemplateSpec: {'result', 'time', 'dirty'}}
+        """
+        state = self._frame_states.setdefault(self.hwnd, {'frame': None, 'fingerprint': None, 'results': {},
+                                                          'changed': True})
+        if not self.use_frame_cache:
+            state['results'].clear()
+            state['changed'] = True
+            return state['results']
+        if state['frame'] is frame:
+            return state['results']
+
+        fingerprint = self.frame_change.fingerprint(frame.data)
+        previous = state['fingerprint'] if state['frame'] is not None and state['frame'].size == frame.size else None
+        dirty = self.frame_change.compare(previous, fingerprint)
+        state['frame'] = frame
+        state['fingerprint'] = fingerprint
+        state['changed'] = dirty is None or bool(dirty.any())
+
+        if dirty is None:
+            state['results'].clear()
+        elif dirty.any():
+            # 累积每个缓存结果产生之后的所有变化图块
+            for entry in state['results'].values():
+                entry['dirty'] = dirty.copy() if entry['dirty'] is None else entry['dirty'] | dirty
+
+        return state['results']
+
+    def last_frame_changed(self, hwnd: Optional[int] = None) -> bool:
+        """窗口（默认为当前窗口）最近一次匹配的截图与前一帧相比是否有变化，没有记录时视为变化"""
+        state = self._frame_states.get(hwnd or self.hwnd)
+        return state['changed'] if state else True
+
+    def set_scale_search(self, enabled: bool = True, scales: Optional[Tuple[float, ...]] = None,
+                         miss_threshold: Optional[int] = None):
+        """
+        启用或关闭多尺度匹配
 
         Args:
-            template_path: 模板图像文件名
+            enabled: 是否启用
+            scales: 可选，候选缩放比例
+            miss_threshold: 可选，连续全部未匹配多少次后搜索缩放比例
+        """
+        if scales is not None:
+            self.scale_selector.scales = tuple(scales)
+        if miss_threshold is not None:
+            self.scale_selector.miss_threshold = max(1, miss_threshold)
+        self.use_scale_search = enabled
+        if self.hwnd:
+            self.dpi_scale = self._get_dpi_scale(self.hwnd)
+
+    def _search_scales(self, screenshot_cv: np.ndarray,
+                       specs: List[TemplateSpec]) -> Optional[Dict[int, Optional[Dict]]]:
+        """
+        搜索匹配缩放比例：先在降采样灰度截图中按模板的最高匹配分数给候选比例排序，
+        再只在分数最高的几个比例下完整匹配，锁定匹配数量最多（相同时置信度之和最高）的比例
 
         Returns:
-            (模板图像, (宽度, 高度)) 或 (None, None)
+            锁定比例下的匹配结果，所有比例都没有匹配时返回None并保持原比例
         """
-        full_path = os.path.join(self.img_tmp_dir, template_path)
+        original = self.dpi_scale
+        best = None
+        with self.metrics.timer('scale_search'):
+            gray = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
+            gray_small = cv2.resize(gray, None, fx=self.pyramid_factor, fy=self.pyramid_factor,
+                                    interpolation=cv2.INTER_AREA)
+            ranked = []
+            for scale in self.scale_selector.candidates(original):
+                score = -1.0
+                for spec in specs:
+                    template_small, size = self.template_store.get_downsampled_gray(spec.template_path, scale,
+                                                                                     self.pyramid_factor)
+                    if template_small is None or size[0] > gray_small.shape[1] or size[1] > gray_small.shape[0]:
+                        continue
+                    result = cv2.matchTemplate(gray_small, template_small, cv2.TM_CCOEFF_NORMED)
+                    score = max(score, float(result.max()))
+                ranked.append((score, scale))
+            ranked.sort(reverse=True)
+
+            for _, scale in ranked[:self.scale_selector.evaluate_top]:
+                self.dpi_scale = scale
+                results = self._evaluate_specs(screenshot_cv, specs)
+                hits = [result for result in results.values() if result]
+                score = (len(hits), sum(result['confidence'] for result in hits))
+                if hits and (best is None or score > best[0]):
+                    best = (score, scale, results)
+
+        if best is None:
+            self.dpi_scale = original
+            self.scale_selector.search_failed(self.hwnd)
+            return None
 
-        if not os.path.exists(full_path):
-            print(f"❌ 模板文件不存在: {full_path}")
-            return None, None
+        _, scale, results = best
+        self.dpi_scale = scale
+        self.scale_selector.lock(self.hwnd, scale)
+        print(f"📐 窗口 {self.hwnd} 的匹配缩放比例: {original:g} -> {scale:g}")
+        return results
 
-        try:
-            template = cv2.imread(full_path, cv2.IMREAD_COLOR)
-            if template is None:
-                print(f"❌ 无法加载模板图像: {full_path}")
-                return None, None
+    def get_scale_search_stats(self) -> Dict:
+        """获取多尺度匹配的搜索统计和每个窗口锁定的缩放比例"""
+        return self.scale_selector.get_stats()
 
-            template_h, template_w = template.shape[:2]
-            return template, (template_w, template_h)
-        except Exception as e:
-            print(f"❌ 加载模板失败: {e}")
-            return None, None
+    def enable_metrics(self, enabled: bool = True):
+        """启用或关闭分阶段耗时统计"""
+        self.metrics.enabled = enabled
 
-    def find_template(self, template_path: str, confidence: float = 0.7,
-                      use_last_screenshot: bool = False,
-                      click_position_ratio: tuple = (0.5, 0.5)) -> Optional[Dict]:
+    def export_metrics(self, path: Optional[str] = None, fmt: str = 'json') -> str:
         """
-        在当前窗口中查找模板图像
+        导出分阶段耗时统计
+
+        Args:
+            path: 可选，写入的文件路径
+            fmt: 'json' JSON快照，'prometheus' Prometheus文本格式
+
+        Returns:
+            导出的文本
+        """
+        if fmt == 'prometheus':
+            return self.metrics.to_prometheus(path)
+        return self.metrics.to_json(path)
+
+    def get_window_role(self, hwnd: Optional[int] = None) -> Optional[str]:
+        """
+        获取窗口角色
+
+        Returns:
+            'main' 主窗口/'secondary' 副窗口/'overlay' 遮罩窗口，无法分类时返回None
+        """
+        return self.window_registry.get_role(hwnd or self.hwnd)
+
+    def get_window_registry_stats(self) -> Dict:
+        """获取窗口枚举缓存统计信息"""
+        return self.window_registry.get_stats()
+
+    def get_scheduler_stats(self) -> Dict:
+        """获取每个窗口的轮询调度统计信息"""
+        return self.scheduler.get_stats()
+
+    def _is_cached_match_valid(self, spec: TemplateSpec, entry: Dict, frame_size: Tuple[int, int]) -> bool:
+        """判断缓存的匹配结果在当前帧中是否仍然有效"""
+        if time.monotonic() - entry['time'] > self.frame_cache_max_age:
+            return False
+
+        dirty = entry['dirty']
+        if dirty is None or not dirty.any():
+            return True
+
+        region = self.region_memory.get_region((self.hwnd, spec.template_path))
+        if region is None:
+            return False
+
+        # 模板按DPI预先缩放，在原始截图中匹配，区域记录即为物理像素
+        return not self.frame_change.region_overlaps(region, dirty, frame_size)
+
+    def get_frame_change_stats(self) -> Dict:
+        """获取帧变化检测和缓存结果复用的统计信息"""
+        stats = self.frame_change.get_stats()
+        stats.update({
+            'cached_matches': self.cached_match_count,
+            'evaluated_matches': self.evaluated_match_count
+        })
+        return stats
+
+    def set_match_workers(self, workers: int):
+        """
+        设置批量匹配使用的线程数
+
+        OpenCV的matchTemplate在计算时会释放GIL，多个模板可以在线程池中并行匹配
 
         Args:
+            workers: 线程数，0或1表示在当前线程中顺序匹配
+        """
+        if self._match_executor is not None:
+            self._match_executor.shutdown(wait=True)
+            self._match_executor = None
+
+        self.match_workers = max(0, workers)
+        if self.match_workers > 1:
+            self._match_executor = ThreadPoolExecutor(max_workers=self.match_workers,
+                                                      thread_name_prefix="template-match")
+
+    def _evaluate_specs(self, screenshot_cv: np.ndarray, specs: List[TemplateSpec],
+                        first_only: bool = False) -> Dict[int, Optional[Dict]]:
+        """
+        在同一张截图中匹配多个模板
+
+        Returns:
+            {模板序号: 匹配信息字典或None}，first_only时第一个匹配之后未执行的模板不在结果中
+        """
+        self.evaluated_match_count += len(specs)
+        if self._match_executor is not None and len(specs) > 1:
+            return self._match_specs_parallel(screenshot_cv, specs, first_only)
+
+        results = {}
+        for index, spec in enumerate(specs):
+            results[index] = self._find_in_screenshot(
+                screenshot_cv, spec.template_path, spec.confidence, spec.click_position_ratio
+            )
+            if results[index] and first_only:
+                break
+
+        return results
+
+    def _match_specs_parallel(self, screenshot_cv: np.ndarray, specs: List[TemplateSpec],
+                              first_only: bool = False) -> Dict[int, Optional[Dict]]:
+        """
+        在线程池中并行匹配多个模板，结果仍按模板顺序确定
+
+        first_only时，一旦某个模板匹配成功且排在它前面的模板都已确定未匹配，
+        就取消尚未开始的匹配任务
+        """
+        # 降采样截图只计算一次，避免各线程重复计算；只在金字塔模式下需要
+        if self.match_mode == 'pyramid':
+            self._get_pyramid_frame(screenshot_cv)
+
+        cancelled = threading.Event()
+
+        def find_spec(spec: TemplateSpec) -> Optional[Dict]:
+            if cancelled.is_set():
+                return None
+            return self._find_in_screenshot(screenshot_cv, spec.template_path, spec.confidence,
+                                            spec.click_position_ratio)
+
+        futures = [self._match_executor.submit(find_spec, spec) for spec in specs]
+
+        results = {}
+        for index, future in enumerate(futures):
+            results[index] = future.result()
+            if results[index] and first_only:
+                cancelled.set()
+                for pending in futures[index + 1:]:
+                    pending.cancel()
+                break
+
+        return results
+
+    def close(self):
+        """释放控制器占用的资源（录制存档、匹配线程池，以及由控制器创建的后端的截图资源）"""
+        self.stop_recording()
+        self.set_match_workers(0)
+        if self._owns_backend:
+            self.frame_source.close()
+
+    def __enter__(self) -> 'WindowController':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _get_screenshot(self, use_last_screenshot: bool = False) -> Optional[Frame]:
+        """获取截图帧，可选复用最后一张截图"""
+        if use_last_screenshot and self.last_frame is not None:
+            return self.last_frame
+        return self.capture_frame()
+
+    def _prepare_screenshot(self, frame: Frame) -> np.ndarray:
+        """
+        获取可直接匹配的BGR数组
+
+        截图保持物理像素分辨率，DPI缩放由模板缓存中预先缩放好的模板处理，每次匹配不再缩放整张截图
+        """
+        with self.metrics.timer('bgr_convert'):
+            return frame.bgr
+
+    def _find_in_screenshot(self, screenshot_cv: np.ndarray, template_path: str, confidence: float = 0.7,
+                            click_position_ratio: tuple = (0.5, 0.5)) -> Optional[Dict]:
+        """
+        在已准备好的截图中查找模板图像
+
+        Args:
+            screenshot_cv: 物理像素分辨率的BGR截图
             template_path: 模板图像路径
             confidence: 匹配置信度阈值
-            use_last_screenshot: 是否使用最后一张截图
             click_position_ratio: 点击位置比例 (x_ratio, y_ratio)，范围0-1
-                                  默认(0.5, 0.5)表示中心点
-                                  (0, 0)表示左上角，(1, 1)表示右下角
 
         Returns:
             包含匹配信息的字典或None
         """
-        if not self.hwnd:
-            print("❌ 未设置窗口句柄")
-            return None
-
         # 验证比例参数
         if not (0 <= click_position_ratio[0] <= 1 and 0 <= click_position_ratio[1] <= 1):
             print("❌ 点击位置比例必须在0到1之间")
             click_position_ratio = (0.5, 0.5)  # 使用默认值
 
-        # 加载模板
-        template, template_size = self.load_template(template_path)
+        # 加载按当前窗口DPI缩放后的模板（每种DPI只缩放一次）
+        with self.metrics.timer('template_load', template_path):
+            template, template_size = self.load_template(template_path, self.dpi_scale)
         if template is None:
             return None
 
-        # 获取截图
-        if use_last_screenshot and self.last_screenshot:
-            screenshot = self.last_screenshot
-        else:
-            screenshot = self.capture_window()
-            if screenshot is None:
-                return None
-
-        # 调整DPI缩放
-        screenshot_scaled = self._scale_screenshot_to_template_dpi(screenshot, self.dpi_scale)
-
         # 检查截图尺寸是否大于等于模板尺寸
-        screenshot_width, screenshot_height = screenshot_scaled.size
+        screenshot_height, screenshot_width = screenshot_cv.shape[:2]
         template_width, template_height = template_size
 
         if screenshot_width < template_width or screenshot_height < template_height:
@@ -460,21 +747,26 @@ class WindowController:
                 f"⚠️  截图尺寸({screenshot_width}x{screenshot_height})小于模板尺寸({template_width}x{template_height})，无法匹配")
             return None
 
-        # 执行模板匹配
+        # 执行模板匹配（优先在上次匹配位置附近搜索）
         try:
-            match_result = self._match_template(screenshot_scaled, template, confidence)
+            with self.metrics.timer('match', template_path):
+                match_result = self._match_with_region_memory(screenshot_cv, template_path, template, template_size,
+                                                              confidence)
         except cv2.error as e:
             print(f"❌ 模板匹配失败: {e}")
             return None
 
         if match_result[0] is None:
+            self.metrics.increment('misses', template_path)
             return None
+        self.metrics.increment('hits', template_path)
 
         # 计算坐标，传递点击位置比例
-        coordinates = self._calculate_match_coordinates(
-            match_result[0], template_size, self.dpi_scale,
-            self.hwnd, click_position_ratio
-        )
+        with self.metrics.timer('coordinates', template_path):
+            coordinates = self._calculate_match_coordinates(
+                match_result[0], template_size, 1.0,
+                self.hwnd, click_position_ratio
+            )
 
         if coordinates:
             coordinates.update({
@@ -486,20 +778,93 @@ class WindowController:
 
         return coordinates
 
-    @staticmethod
-    def _scale_screenshot_to_template_dpi(screenshot_pil: Image.Image, scale_ratio: float) -> Image.Image:
-        """将截图缩放到模板图像的DPI空间"""
-        if abs(scale_ratio - 1.0) > 0.05:
-            new_width = int(screenshot_pil.width / scale_ratio)
-            new_height = int(screenshot_pil.height / scale_ratio)
-            return screenshot_pil.resize((new_width, new_height), Image.Resampling.LANCZOS)
-        return screenshot_pil
+    def _match_with_region_memory(self, screenshot_cv: np.ndarray, template_path: str, template: Mat,
+                                  template_size: Tuple[int, int], confidence: float) -> Tuple:
+        """
+        先在模板上次匹配位置附近的区域搜索，未命中时回退到全图搜索
+
+        Returns:
+            (匹配位置, 置信度, 结果尺寸)，未匹配时为 (None, None, None)
+        """
+        key = (self.hwnd, template_path)
+        frame_size = (screenshot_cv.shape[1], screenshot_cv.shape[0])
+        region = self.region_memory.get_search_region(key, frame_size, template_size) \
+            if self.use_region_search else None
+
+        if region is not None:
+            start = time.perf_counter()
+            match_result = self._match_template_in_region(screenshot_cv, template, region, confidence)
+            self.region_memory.record_search(key, time.perf_counter() - start, region_search=True,
+                                             hit=match_result[0] is not None)
+            if match_result[0] is not None:
+                self.region_memory.record_hit(key, match_result[0], template_size, frame_size)
+                return match_result
+
+        start = time.perf_counter()
+        match_result = self._match_full_frame(screenshot_cv, template_path, template, confidence)
+        self.region_memory.record_search(key, time.perf_counter() - start, region_search=False,
+                                         hit=match_result[0] is not None, fallback=region is not None)
+        if match_result[0] is not None:
+            self.region_memory.record_hit(key, match_result[0], template_size, frame_size)
+        return match_result
+
+    def set_match_mode(self, mode: str, pyramid_factor: Optional[float] = None):
+        """
+        设置全图匹配模式
+
+        Args:
+            mode: 'full' 全分辨率彩色匹配；'pyramid' 先在降采样灰度图中粗匹配，再在候选位置附近全分辨率精匹配
+            pyramid_factor: 可选，金字塔粗匹配的降采样系数（0-1之间）
+        """
+        if mode not in ('full', 'pyramid'):
+            print(f"❌ 不支持的匹配模式: {mode}")
+            return
+        if pyramid_factor is not None:
+            if not 0 < pyramid_factor < 1:
+                print("❌ 降采样系数必须在0到1之间")
+                return
+            self.pyramid_factor = pyramid_factor
+        self.match_mode = mode
+
+    def _match_full_frame(self, screenshot_cv: np.ndarray, template_path: str, template: Mat,
+                          confidence: float) -> Tuple:
+        """
+        按当前匹配模式在整张截图中匹配模板
+
+        模板已由模板缓存按当前窗口DPI预先缩放，直接在物理像素分辨率的截图中匹配，
+        不缩放整张截图，返回的位置为物理像素坐标，置信度即为该模板在原始截图中的匹配分数
+        """
+        if self.match_mode == 'pyramid':
+            template_small, _ = self.template_store.get_downsampled_gray(template_path, self.dpi_scale,
+                                                                          self.pyramid_factor)
+            if template_small is not None:
+                return self._match_template_pyramid(screenshot_cv, self._get_pyramid_frame(screenshot_cv),
+                                                    template, template_small, confidence,
+                                                    self.pyramid_factor, self.pyramid_candidates)
+        return self._match_template(screenshot_cv, template, confidence)
+
+    def _get_pyramid_frame(self, screenshot_cv: np.ndarray) -> np.ndarray:
+        """获取BGR截图的降采样灰度图，同一张截图只计算一次"""
+        frame, frame_small = self._pyramid_frame
+        if frame is not screenshot_cv:
+            gray = cv2.cvtColor(screenshot_cv, cv2.COLOR_BGR2GRAY)
+            frame_small = cv2.resize(gray, None, fx=self.pyramid_factor, fy=self.pyramid_factor,
+                                     interpolation=cv2.INTER_AREA)
+            self._pyramid_frame = (screenshot_cv, frame_small)
+        return frame_small
+
+    def get_region_stats(self) -> Dict:
+        """获取区域优先搜索的命中率和节省耗时统计"""
+        return self.region_memory.get_stats()
 
     @staticmethod
-    def _match_template(screenshot_pil: Image.Image, template: Mat, confidence: float = 0.7) -> Tuple:
-        """在截图中执行模板匹配"""
+    def _match_template(screenshot: Union[Image.Image, np.ndarray], template: Mat, confidence: float = 0.7) -> Tuple:
+        """在截图中执行模板匹配，截图可以是PIL图像或已转换好的BGR数组"""
         try:
-            screenshot_cv = cv2.cvtColor(np.array(screenshot_pil), cv2.COLOR_RGB2BGR)
+            if isinstance(screenshot, np.ndarray):
+                screenshot_cv = screenshot
+            else:
+                screenshot_cv = cv2.cvtColor(np.array(screenshot), cv2.COLOR_RGB2BGR)
             result = cv2.matchTemplate(screenshot_cv, template, cv2.TM_CCOEFF_NORMED)
             min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
 
@@ -514,8 +879,80 @@ class WindowController:
             print(f"❌ 模板匹配异常: {e}")
             return None, None, None
 
-    @staticmethod
-    def _calculate_match_coordinates(match_loc: Tuple[int, int], template_size: Tuple[int, int],
+    @classmethod
+    def _match_template_in_region(cls, screenshot_cv: np.ndarray, template: Mat,
+                                  region: Tuple[int, int, int, int], confidence: float = 0.7) -> Tuple:
+        """在截图的指定区域 (x, y, 宽度, 高度) 内执行模板匹配，返回的位置为整张截图中的坐标"""
+        x, y, w, h = region
+        match_loc, match_val, result_shape = cls._match_template(screenshot_cv[y:y + h, x:x + w], template,
+                                                                 confidence)
+        if match_loc is None:
+            return None, None, None
+        return (match_loc[0] + x, match_loc[1] + y), match_val, result_shape
+
+    @classmethod
+    def _match_template_pyramid(cls, screenshot_cv: np.ndarray, screenshot_small: np.ndarray, template: Mat,
+                                template_small: np.ndarray, confidence: float = 0.7, factor: float = 0.5,
+                                candidates: int = 3, coarse_margin: float = 0.2) -> Tuple:
+        """
+        由粗到精的金字塔模板匹配
+
+        先在降采样灰度截图中用降采样灰度模板找出若干候选位置，
+        再只在候选位置附近的小区域内执行全分辨率彩色匹配，
+        因此返回的位置与全图匹配的结果一致
+
+        Args:
+            screenshot_cv: 全分辨率BGR截图
+            screenshot_small: 降采样后的灰度截图
+            template: 全分辨率BGR模板
+            template_small: 降采样后的灰度模板
+            confidence: 匹配置信度阈值
+            factor: 降采样系数
+            candidates: 保留的候选位置数量
+            coarse_margin: 粗匹配阈值相对confidence的放宽量
+
+        Returns:
+            (匹配位置, 置信度, 结果尺寸)，未匹配时为 (None, None, None)
+        """
+        small_h, small_w = template_small.shape[:2]
+        # 模板过小或截图过小时粗匹配不可靠，直接全图匹配
+        if (small_w < 8 or small_h < 8 or
+                screenshot_small.shape[0] < small_h or screenshot_small.shape[1] < small_w):
+            return cls._match_template(screenshot_cv, template, confidence)
+
+        coarse = cv2.matchTemplate(screenshot_small, template_small, cv2.TM_CCOEFF_NORMED)
+        template_h, template_w = template.shape[:2]
+        frame_h, frame_w = screenshot_cv.shape[:2]
+        pad = int(np.ceil(1 / factor)) * 2 + 2  # 粗匹配位置映射回全分辨率后的误差范围
+
+        best = (None, None, None)
+        for _ in range(candidates):
+            _, coarse_val, _, coarse_loc = cv2.minMaxLoc(coarse)
+            if coarse_val < confidence - coarse_margin:
+                break
+
+            # 抑制该候选附近的响应，下一轮取次优位置
+            suppress_x, suppress_y = coarse_loc
+            coarse[max(0, suppress_y - small_h // 2):suppress_y + small_h // 2 + 1,
+                   max(0, suppress_x - small_w // 2):suppress_x + small_w // 2 + 1] = -1.0
+
+            left = max(0, int(coarse_loc[0] / factor) - pad)
+            top = max(0, int(coarse_loc[1] / factor) - pad)
+            right = min(frame_w, int(coarse_loc[0] / factor) + template_w + pad)
+            bottom = min(frame_h, int(coarse_loc[1] / factor) + template_h + pad)
+            if right - left < template_w or bottom - top < template_h:
+                continue
+
+            match_result = cls._match_template_in_region(screenshot_cv, template,
+                                                         (left, top, right - left, bottom - top), confidence)
+            if match_result[0] is not None and (best[1] is None or match_result[1] > best[1]):
+                best = match_result
+
+        if best[0] is None:
+            return None, None, None
+        return best[0], best[1], (frame_h - template_h + 1, frame_w - template_w + 1)
+
+    def _calculate_match_coordinates(self, match_loc: Tuple[int, int], template_size: Tuple[int, int],
                                      scale_ratio: float, hwnd: int,
                                      click_position_ratio: tuple = (0.5, 0.5)) -> Optional[Dict]:
         """
@@ -524,7 +961,7 @@ class WindowController:
         Args:
             match_loc: 模板匹配位置 (x, y)
             template_size: 模板大小 (width, height)
-            scale_ratio: DPI缩放比例
+            scale_ratio: 匹配坐标到物理像素的缩放比例（模板已按DPI缩放、在原始截图中匹配时为1.0）
             hwnd: 窗口句柄
             click_position_ratio: 点击位置比例 (x_ratio, y_ratio)
 
@@ -547,14 +984,14 @@ class WindowController:
         click_y_physical = int(click_y_scaled * scale_ratio)
 
         # 窗口矩形信息
-        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        left, top, right, bottom = self.frame_source.get_window_rect(hwnd)
 
         # 转换为屏幕坐标
         screen_x = left + click_x_physical
         screen_y = top + click_y_physical
 
         # 转换为窗口客户区坐标
-        client_x, client_y = win32gui.ScreenToClient(hwnd, (screen_x, screen_y))
+        client_x, client_y = self.frame_source.screen_to_client(hwnd, (screen_x, screen_y))
 
         return {
             'match_position_scaled': (match_x, match_y),
@@ -594,36 +1031,150 @@ class WindowController:
             print("❌ 未提供点击坐标")
             return False
 
-        # 准备点击消息
-        lParam = win32api.MAKELONG(x, y)
-
-        if button == 'left':
-            down_msg = win32con.WM_LBUTTONDOWN
-            up_msg = win32con.WM_LBUTTONUP
-            dbl_msg = win32con.WM_LBUTTONDBLCLK
-        elif button == 'right':
-            down_msg = win32con.WM_RBUTTONDOWN
-            up_msg = win32con.WM_RBUTTONUP
-            dbl_msg = win32con.WM_RBUTTONDBLCLK
-        else:  # middle
-            down_msg = win32con.WM_MBUTTONDOWN
-            up_msg = win32con.WM_MBUTTONUP
-            dbl_msg = win32con.WM_MBUTTONDBLCLK
-
-        # 发送点击消息
-        try:
-            if click_type == 'double':
-                win32gui.SendMessage(self.hwnd, dbl_msg, win32con.MK_LBUTTON, lParam)
-                win32gui.SendMessage(self.hwnd, up_msg, 0, lParam)
-            else:
-                win32gui.SendMessage(self.hwnd, down_msg, win32con.MK_LBUTTON, lParam)
-                time.sleep(0.05)
-                win32gui.SendMessage(self.hwnd, up_msg, 0, lParam)
+        with self.metrics.timer('click', coordinates.get('template_path', '') if coordinates else ''):
+            clicked = self.input_sink.click(self.hwnd, x, y, button, click_type)
+        if clicked:
+            if self.recorder is not None:
+                self.recorder.record_click(self.hwnd, (x, y), button, click_type,
+                                           coordinates.get('template_path') if coordinates else None)
+            self.scheduler.notify_action(self.hwnd)  # 点击后界面即将变化，短间隔轮询
+            self.window_registry.mark_stale()  # 点击后可能弹出新窗口
+        return clicked
+
+    def restore_window(self, hwnd: Optional[int] = None, wait: float = 0.5) -> bool:
+        """
+        如果窗口处于最小化状态，将其恢复为正常显示
 
-            return True
-        except Exception as e:
-            print(f"❌ 点击失败: {e}")
+        Args:
+            hwnd: 窗口句柄，默认为当前窗口
+            wait: 等待窗口重绘（截图不再全黑）的最长时间（秒）
+
+        Returns:
+            窗口是否被恢复
+        """
+        hwnd = hwnd or self.hwnd
+        if not hwnd or not self.frame_source.is_minimized(hwnd):
             return False
+        self.input_sink.restore_window(hwnd)
+        if self.recorder is not None:
+            self.recorder.record_event('restore', hwnd)
+        self.scheduler.notify_action(hwnd)
+        self.window_registry.invalidate(hwnd)  # 最小化时无法分类，恢复后重新分类
+        self._wait(lambda: self._capture_visible(hwnd), wait)
+        return True
+
+    def close_window(self, hwnd: Optional[int] = None):
+        """向窗口（默认为当前窗口）发送关闭消息"""
+        hwnd = hwnd or self.hwnd
+        if hwnd:
+            self.input_sink.close_window(hwnd)
+            if self.recorder is not None:
+                self.recorder.record_event('close', hwnd)
+            self.scheduler.notify_action(hwnd)
+            self.window_registry.mark_stale()
+
+    def wait_for_template(self, templates: Union[List[Union[TemplateSpec, str, tuple, Dict]], TemplateSpec, str],
+                          timeout: float = 5.0, hwnd: Optional[int] = None) -> WaitResult:
+        """
+        等待模板出现在窗口中
+
+        Args:
+            templates: 一个模板或模板列表，任意一个匹配即满足条件
+            timeout: 最长等待时间（秒）
+            hwnd: 窗口句柄，默认为当前窗口
+
+        Returns:
+            WaitResult，value为第一个匹配的模板信息
+        """
+        if isinstance(templates, (str, TemplateSpec)):
+            templates = [templates]
+        if hwnd and hwnd != self.hwnd:
+            self.set_window_handle(hwnd)
+
+        def matched():
+            matches = self.match_all(templates, first_only=True)
+            return matches[0] if matches else None
+
+        return self._wait(matched, timeout)
+
+    def wait_for_frame_change(self, hwnd: Optional[int] = None, timeout: float = 2.0,
+                              reference: Optional[Frame] = None) -> WaitResult:
+        """
+        等待窗口画面发生变化（或窗口被销毁）
+
+        Args:
+            hwnd: 窗口句柄，默认为当前窗口
+            timeout: 最长等待时间（秒）
+            reference: 参考帧，默认为该窗口最近一次匹配时的截图，没有时以调用时的截图为参考
+
+        Returns:
+            WaitResult，value为变化后的Frame，窗口已销毁时为'window_gone'
+        """
+        hwnd = hwnd or self.hwnd
+        if reference is not None:
+            baseline = self.frame_change.fingerprint(reference.data)
+        else:
+            state = self._frame_states.get(hwnd)
+            baseline = state['fingerprint'] if state else None
+            if baseline is None:
+                frame = self._capture_visible(hwnd)
+                baseline = self.frame_change.fingerprint(frame.data) if frame is not None else None
+
+        def changed():
+            if not self.frame_source.is_window(hwnd):
+                return 'window_gone'
+            frame = self._capture_visible(hwnd)
+            if frame is None:
+                return None
+            if self.frame_change.has_changed(baseline, self.frame_change.fingerprint(frame.data)):
+                return frame
+            return None
+
+        return self._wait(changed, timeout)
+
+    def wait_for_window_gone(self, hwnd: Optional[int] = None, timeout: float = 5.0) -> WaitResult:
+        """
+        等待窗口被销毁，销毁后释放该窗口的截图资源和缓存
+
+        Args:
+            hwnd: 窗口句柄，默认为当前窗口
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            WaitResult
+        """
+        hwnd = hwnd or self.hwnd
+        result = self._wait(lambda: not self.frame_source.is_window(hwnd), timeout)
+        if result.satisfied:
+            if self.recorder is not None:
+                self.recorder.record_event('gone', hwnd)
+            self.close_capture_session(hwnd)
+            self._frame_states.pop(hwnd, None)
+            self.scheduler.forget(hwnd)
+            self.window_registry.forget(hwnd)
+            self.scale_selector.forget(hwnd)
+        return result
+
+    def get_wait_stats(self) -> Dict:
+        """获取条件等待统计信息"""
+        return self.wait_stats.get_stats()
+
+    def _wait(self, condition, timeout: float) -> WaitResult:
+        """按wait_interval自适应轮询条件并记录等待统计"""
+        initial_interval, max_interval = self.wait_interval
+        return self.wait_stats.record(poll_until(condition, timeout, initial_interval, max_interval))
+
+    def _capture_visible(self, hwnd: int) -> Optional[Frame]:
+        """静默截图，窗口不存在、最小化或截图全黑时返回None，不更新last_frame"""
+        try:
+            if not self.frame_source.is_window(hwnd) or self.frame_source.is_minimized(hwnd):
+                return None
+            frame = self.frame_source.capture(hwnd)
+        except Exception:
+            return None
+        if frame is None or self._is_image_mostly_black(frame):
+            return None
+        return frame
 
     def click_template(self, template_path: str, confidence: float = 0.7,
                        button: str = 'left', click_type: str = 'single',
@@ -660,16 +1211,15 @@ class WindowController:
             return None
 
         try:
-            title = win32gui.GetWindowText(self.hwnd)
-            class_name = win32gui.GetClassName(self.hwnd)
-            left, top, right, bottom = win32gui.GetWindowRect(self.hwnd)
+            info = self.frame_source.get_window_info(self.hwnd)
+            left, top, right, bottom = self.frame_source.get_window_rect(self.hwnd)
             width = right - left
             height = bottom - top
 
             return {
                 'hwnd': self.hwnd,
-                'title': title,
-                'class_name': class_name,
+                'title': info['title'],
+                'class_name': info['class_name'],
                 'position': (left, top, right, bottom),
                 'size': (width, height),
                 'dpi_scale': self.dpi_scale
@@ -680,112 +1230,22 @@ class WindowController:
 
 # 使用示例
 if __name__ == "__main__":
+    import win32gui
+
+    from src.live_flows import start_live, stop_live, clear_live
+
     # 检查"Chrome_WidgetWin_1", "直播伴侣"的窗口
     Launcher_path = r"C:\Program Files (x86)\webcast_mate\直播伴侣 Launcher.exe"
 
     controller = WindowController(Launcher_path)
 
-
-    def start_live():
-        """开始直播"""
-        start_live_is = False
-        while not start_live_is:
-            controller.find_window("Chrome_WidgetWin_1", "直播伴侣")  # 启动直播伴侣
-            for hwnd in controller._get_windows("Chrome_WidgetWin_1", "直播伴侣"):  # 区分主窗口，副窗口，遮罩窗口
-                controller.set_window_handle(hwnd)
-                placement = win32gui.GetWindowPlacement(hwnd)
-                if placement[1] == win32con.SW_SHOWMINIMIZED:
-                    win32gui.ShowWindow(hwnd, win32con.SW_SHOWNORMAL)  # 正常显示窗口
-                    time.sleep(0.5)
-                if controller.capture_window():
-                    if controller.find_template("main_stop_live.png"):
-                        start_live_is = True
-                        break
-                    if controller.click_template("main_start_live.png"):
-                        continue
-                    if controller.click_template("main_live_stopped_return.png"):
-                        continue
-                    if controller.click_template("sec_restore_live_broadcast_screen.png", 0.85,
-                                                 click_position_ratio=(0.75, 0.875)):
-                        continue
-                    if controller.click_template("sec_failed_resume_live.png", 0.85, click_position_ratio=(0.75, 0.75)):
-                        continue
-                    if controller.click_template("sec_no_sound_reminder.png", 0.85, click_position_ratio=(0.5, 0.875)):
-                        continue
-                    if controller.click_template("sec_confirm_withdrawal.png", 0.85,
-                                                 click_position_ratio=(0.25, 0.875)):
-                        continue
-                    if controller.click_template("sec_confirm_withdrawal_live.png", 0.85,
-                                                 click_position_ratio=(0.25, 0.875)):
-                        continue
-                    if controller.click_template("sec_true_stop_live_is.png", 0.85, click_position_ratio=(0.25, 0.875)):
-                        continue
-
-
-    def stop_live():
-        """关闭直播"""
-        stop_live_is = False
-        while not stop_live_is:
-            controller.find_window("Chrome_WidgetWin_1", "直播伴侣")  # 启动直播伴侣
-            for hwnd in controller._get_windows("Chrome_WidgetWin_1", "直播伴侣"):  # 区分主窗口，副窗口，遮罩窗口
-                controller.set_window_handle(hwnd)
-                placement = win32gui.GetWindowPlacement(hwnd)
-                if placement[1] == win32con.SW_SHOWMINIMIZED:
-                    win32gui.ShowWindow(hwnd, win32con.SW_SHOWNORMAL)  # 正常显示窗口
-                    time.sleep(0.5)
-                if controller.capture_window():
-                    if controller.find_template("main_live_stopped_return.png"):
-                        stop_live_is = True
-                        break
-                    if controller.click_template("main_start_live.png"):
-                        continue
-                    if controller.click_template("main_stop_live.png"):
-                        continue
-                    if controller.click_template("sec_restore_live_broadcast_screen.png", 0.85,
-                                                 click_position_ratio=(0.75, 0.875)):
-                        continue
-                    if controller.click_template("sec_failed_resume_live.png", 0.85, click_position_ratio=(0.75, 0.75)):
-                        continue
-                    if controller.click_template("sec_no_sound_reminder.png", 0.85, click_position_ratio=(0.5, 0.875)):
-                        continue
-                    if controller.click_template("sec_confirm_withdrawal.png", 0.85,
-                                                 click_position_ratio=(0.25, 0.875)):
-                        continue
-                    if controller.click_template("sec_confirm_withdrawal_live.png", 0.85,
-                                                 click_position_ratio=(0.25, 0.875)):
-                        continue
-                    if controller.click_template("sec_true_stop_live_is.png", 0.85, click_position_ratio=(0.75, 0.875)):
-                        time.sleep(2)
-                        continue
-
-
-    def clear_live():
-        """关闭程序"""
-        hwnds = controller._get_windows("Chrome_WidgetWin_1", "直播伴侣")
-        while hwnds:
-            for hwnd in hwnds:
-                controller.set_window_handle(hwnd)
-                placement = win32gui.GetWindowPlacement(hwnd)
-                if placement[1] == win32con.SW_SHOWMINIMIZED:
-                    win32gui.ShowWindow(hwnd, win32con.SW_SHOWNORMAL)  # 正常显示窗口
-                    time.sleep(0.5)
-                if controller.capture_window():
-                    win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)  # 关闭窗口（向窗口发送关闭消息）[citation:10]
-                    time.sleep(3)
-            for hwnd in hwnds:
-                controller.set_window_handle(hwnd)
-                controller.click_template("sec_confirm_withdrawal.png", 0.85, click_position_ratio=(0.75, 0.875))
-                controller.click_template("sec_confirm_withdrawal_live.png", 0.85, click_position_ratio=(0.75, 0.875))
-            time.sleep(5)
-            hwnds = controller._get_windows("Chrome_WidgetWin_1", "直播伴侣")
-
-
     start_time = time.time()
     hwnd = win32gui.GetForegroundWindow()
-    start_live()
-    clear_live()
-    stop_live()
-    clear_live()
+    start_live(controller)
+    clear_live(controller)
+    stop_live(controller)
+    clear_live(controller)
     # 将窗口置于前台[citation:6]
     win32gui.SetForegroundWindow(hwnd)
     print(time.time() - start_time)
+    controller.close()
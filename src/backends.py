@@ -0,0 +1,77 @@
+from typing import Optional, Tuple, Dict, List
+
+from src.frame import Frame
+
+
+class FrameSource:
+    """截图来源接口：负责窗口枚举、窗口几何信息和截图"""
+
+    def find_windows(self, class_name: str, window_name: str) -> List[int]:
+        """通过class和title获取窗口句柄列表"""
+        raise NotImplementedError
+
+    def capture(self, hwnd: int) -> Optional[Frame]:
+        """捕获窗口截图，失败时返回None"""
+        raise NotImplementedError
+
+    def get_window_rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        """获取窗口的屏幕矩形 (left, top, right, bottom)"""
+        raise NotImplementedError
+
+    def screen_to_client(self, hwnd: int, point: Tuple[int, int]) -> Tuple[int, int]:
+        """将屏幕坐标转换为窗口客户区坐标"""
+        raise NotImplementedError
+
+    def get_dpi_scale(self, hwnd: int) -> float:
+        """获取窗口的DPI缩放比例"""
+        return 1.0
+
+    def get_window_info(self, hwnd: int) -> Dict:
+        """获取窗口标题和类名 {'title': ..., 'class_name': ...}"""
+        raise NotImplementedError
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        """获取窗口所属进程ID，用于区分多个程序实例"""
+        return 0
+
+    def is_window(self, hwnd: int) -> bool:
+        """窗口是否仍然存在"""
+        return True
+
+    def is_minimized(self, hwnd: int) -> bool:
+        """窗口是否处于最小化状态"""
+        return False
+
+    def is_transparent(self, hwnd: int) -> bool:
+        """窗口是否为鼠标穿透的透明窗口（遮罩）"""
+        return False
+
+    def release(self, hwnd: int):
+        """释放为窗口保留的截图资源"""
+
+    def get_capture_stats(self) -> Dict:
+        """获取截图资源统计信息"""
+        return {}
+
+    def close(self):
+        """释放全部资源"""
+
+
+class InputSink:
+    """输入接口：负责点击、恢复/关闭窗口和启动程序"""
+
+    def click(self, hwnd: int, x: int, y: int, button: str = 'left', click_type: str = 'single') -> bool:
+        """在窗口客户区坐标 (x, y) 处点击"""
+        raise NotImplementedError
+
+    def restore_window(self, hwnd: int):
+        """将最小化的窗口恢复为正常显示"""
+        raise NotImplementedError
+
+    def close_window(self, hwnd: int):
+        """向窗口发送关闭消息"""
+        raise NotImplementedError
+
+    def start_program(self, launcher_path: str) -> bool:
+        """启动程序"""
+        raise NotImplementedError
@@ -0,0 +1,216 @@
+import bisect
+import os
+import tempfile
+import threading
+from typing import Optional, Dict, List, Tuple
+
+
+class CaptureBuffer:
+    """
+    捕获数据的有界环形缓冲区
+
+    内存中只保留最近capacity条记录，更早的记录按顺序追加写入磁盘溢出文件；
+    每block_size条溢出记录保存一个稀疏索引（记录序号、文件偏移、帧编号），
+    按序号范围或帧编号读取时只定位到所在的块，不需要复制或扫描全部历史
+    """
+
+    def __init__(self, capacity: int = 10000, spill_path: Optional[str] = None, spill: bool = True,
+                 separator: str = ";", block_size: int = 256):
+        """
+        初始化缓冲区
+
+        参数:
+            capacity: 内存中保留的记录数
+            spill_path: 溢出文件路径，默认在第一次溢出时创建临时文件（close时删除）
+            spill: 是否把超出容量的记录写入磁盘，False时直接丢弃
+            separator: 字段分隔符，每行的第一个字段为帧编号（frame.number）
+            block_size: 溢出文件稀疏索引的间隔（记录数）
+        """
+        self.capacity = max(1, capacity)
+        self.spill_path = spill_path
+        self.spill = spill
+        self.separator = separator
+        self.block_size = block_size
+        self._ring: List[Optional[Tuple[int, str]]] = [None] * self.capacity  # (帧编号, 行)
+        self._first = 0  # 内存中最早记录的序号
+        self._count = 0  # 已追加的记录总数（下一条记录的序号）
+        self._spilled = 0  # 已写入溢出文件的记录数
+        self._dropped = 0  # 未开启溢出时丢弃的记录数
+        self._spill_file = None
+        self._owns_spill_file = spill_path is None
+        self._index: List[Tuple[int, int, int]] = []  # 稀疏索引 (序号, 文件偏移, 帧编号)
+        self._index_seqs: List[int] = []  # 稀疏索引中的序号，用于二分查找
+        self._index_frames: List[int] = []  # 稀疏索引中的帧编号，用于二分查找
+        self._lock = threading.RLock()
+
+    def append(self, line: str):
+        """追加一条记录，内存已满时把最早的记录移到溢出文件"""
+        frame_number = self._parse_frame_number(line)
+        with self._lock:
+            slot = self._count % self.capacity
+            if self._count - self._first == self.capacity:
+                self._evict(self._ring[slot])
+                self._first += 1
+            self._ring[slot] = (frame_number, line)
+            self._count += 1
+
+    def __len__(self) -> int:
+        """已追加的记录总数（包括已溢出到磁盘的记录）"""
+        return self._count
+
+    def tail(self, n: int) -> List[str]:
+        """获取最近n条记录"""
+        with self._lock:
+            return self.range(max(self._count - n, self._start()), self._count)
+
+    def range(self, start: int, stop: Optional[int] = None) -> List[str]:
+        """
+        按序号获取记录
+
+        参数:
+            start: 起始序号（从0开始，包含）
+            stop: 结束序号（不包含），默认到最新记录
+
+        返回:
+            记录列表，已丢弃的记录不在结果中
+        """
+        with self._lock:
+            stop = self._count if stop is None else min(stop, self._count)
+            start = max(start, self._start())
+            if start >= stop:
+                return []
+
+            lines = []
+            if start < self._first:
+                lines.extend(self._read_spilled(start, min(stop, self._first)))
+                start = self._first
+            for seq in range(start, stop):
+                lines.append(self._ring[seq % self.capacity][1])
+            return lines
+
+    def since_frame(self, frame_number: int, limit: Optional[int] = None) -> List[str]:
+        """
+        获取帧编号大于frame_number的记录
+
+        参数:
+            frame_number: 帧编号（tshark的frame.number）
+            limit: 最多返回的记录数
+
+        返回:
+            记录列表，按捕获顺序排列
+        """
+        with self._lock:
+            start = self._seq_after_frame(frame_number)
+            stop = self._count if limit is None else min(self._count, start + limit)
+            return self.range(start, stop)
+
+    def clear(self):
+        """清空内存和溢出文件中的全部记录"""
+        with self._lock:
+            self._ring = [None] * self.capacity
+            self._first = self._count = self._spilled = self._dropped = 0
+            self._index.clear()
+            self._index_seqs.clear()
+            self._index_frames.clear()
+            if self._spill_file is not None:
+                self._spill_file.seek(0)
+                self._spill_file.truncate()
+
+    def close(self):
+        """关闭溢出文件，临时溢出文件同时删除"""
+        with self._lock:
+            if self._spill_file is None:
+                return
+            self._spill_file.close()
+            self._spill_file = None
+            if self._owns_spill_file:
+                try:
+                    os.remove(self.spill_path)
+                except OSError:
+                    pass
+                self.spill_path = None
+
+    def get_stats(self) -> Dict:
+        """获取缓冲区统计信息"""
+        with self._lock:
+            return {
+                'total': self._count,
+                'in_memory': self._count - self._first,
+                'spilled': self._spilled,
+                'dropped': self._dropped,
+                'capacity': self.capacity,
+                'spill_path': self.spill_path,
+                'spill_bytes': self._spill_file.tell() if self._spill_file is not None else 0
+            }
+
+    def _start(self) -> int:
+        """仍可读取的最早记录序号"""
+        return self._dropped
+
+    def _evict(self, record: Tuple[int, str]):
+        """把被挤出内存的记录写入溢出文件"""
+        if not self.spill:
+            self._dropped += 1
+            return
+        if self._spill_file is None:
+            if self.spill_path is None:
+                fd, self.spill_path = tempfile.mkstemp(prefix="tshark_capture_", suffix=".log")
+                os.close(fd)
+            self._spill_file = open(self.spill_path, "w+b")
+
+        frame_number, line = record
+        seq = self._first
+        if (seq - self._dropped) % self.block_size == 0:
+            self._index.append((seq, self._spill_file.tell(), frame_number))
+            self._index_seqs.append(seq)
+            self._index_frames.append(frame_number)
+        self._spill_file.write(line.encode("utf-8") + b"\n")
+        self._spilled += 1
+
+    def _read_spilled(self, start: int, stop: int) -> List[str]:
+        """从溢出文件读取序号 [start, stop) 的记录，从所在块的起点开始顺序读"""
+        block = max(0, bisect.bisect_right(self._index_seqs, start) - 1)
+        seq, offset, _ = self._index[block]
+        self._spill_file.flush()
+        position = self._spill_file.tell()
+        try:
+            self._spill_file.seek(offset)
+            lines = []
+            while seq < stop:
+                line = self._spill_file.readline()
+                if not line:
+                    break
+                if seq >= start:
+                    lines.append(line.rstrip(b"\n").decode("utf-8", errors="ignore"))
+                seq += 1
+            return lines
+        finally:
+            self._spill_file.seek(position)
+
+    def _seq_after_frame(self, frame_number: int) -> int:
+        """第一条帧编号大于frame_number的记录序号（帧编号随序号递增）"""
+        low, high = self._first, self._count
+        if low < high and self._ring[low % self.capacity][0] > frame_number and self._spilled:
+            # 内存中最早的记录已在该帧之后，结果落在溢出文件中：定位到所在的块后逐行解析帧编号
+            block = max(0, bisect.bisect_right(self._index_frames, frame_number) - 1)
+            seq = self._index[block][0]
+            stop = self._index[block + 1][0] if block + 1 < len(self._index) else self._first
+            for line in self._read_spilled(seq, stop):
+                if self._parse_frame_number(line) > frame_number:
+                    return seq
+                seq += 1
+            return stop
+
+        # 在内存中二分查找
+        while low < high:
+            middle = (low + high) // 2
+            if self._ring[middle % self.capacity][0] > frame_number:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _parse_frame_number(self, line: str) -> int:
+        """解析行首的帧编号，解析失败时为-1"""
+        head = line.split(self.separator, 1)[0]
+        return int(head) if head.isdigit() else -1
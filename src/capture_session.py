@@ -0,0 +1,136 @@
+from ctypes import windll
+from typing import Optional, Tuple, Dict
+
+import win32gui
+import win32ui
+
+from src.frame import Frame
+
+
+class CaptureSession:
+    """窗口截图会话，在多次截图之间保持窗口DC、内存DC和位图，只在窗口尺寸变化时重新分配"""
+
+    def __init__(self, hwnd: int):
+        """
+        初始化截图会话
+
+        Args:
+            hwnd: 窗口句柄
+        """
+        self.hwnd = hwnd
+        self.size: Optional[Tuple[int, int]] = None  # 当前位图尺寸 (宽度, 高度)
+        self._hwnd_dc = None
+        self._mfc_dc = None
+        self._save_dc = None
+        self._bitmap = None
+        self._bitmap_info = None
+        self.closed = False
+        self.allocations = 0  # 分配DC和位图的次数
+        self.releases = 0  # 释放DC和位图的次数
+        self.captures = 0  # 成功截图次数
+        self.failures = 0  # PrintWindow失败次数
+
+    def __enter__(self) -> 'CaptureSession':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def capture(self) -> Optional[Frame]:
+        """
+        捕获窗口截图
+
+        Returns:
+            Frame对象，PrintWindow失败时返回None
+        """
+        if self.closed:
+            raise RuntimeError("截图会话已关闭")
+
+        left, top, right, bottom = win32gui.GetWindowRect(self.hwnd)
+        size = (right - left, bottom - top)
+        if size[0] <= 0 or size[1] <= 0:
+            return None
+
+        # 窗口尺寸变化时才重新分配位图
+        if size != self.size:
+            self._release()
+            self._allocate(size)
+
+        result = windll.user32.PrintWindow(self.hwnd, self._save_dc.GetSafeHdc(), 3)
+        if not result:
+            self.failures += 1
+            return None
+
+        # 直接以BGRA数组包装位图数据
+        bmpinfo = self._bitmap_info
+        frame = Frame.from_bitmap_bits(self._bitmap.GetBitmapBits(True), bmpinfo['bmWidth'], bmpinfo['bmHeight'],
+                                       bmpinfo['bmWidthBytes'])
+        self.captures += 1
+        return frame
+
+    def close(self):
+        """释放DC和位图"""
+        if not self.closed:
+            self._release()
+            self.closed = True
+
+    def get_stats(self) -> Dict:
+        """获取资源分配和截图统计信息"""
+        return {
+            'hwnd': self.hwnd,
+            'size': self.size,
+            'allocations': self.allocations,
+            'releases': self.releases,
+            'captures': self.captures,
+            'failures': self.failures,
+            'closed': self.closed
+        }
+
+    def _allocate(self, size: Tuple[int, int]):
+        """创建窗口DC、内存DC和兼容位图"""
+        width, height = size
+        self._hwnd_dc = win32gui.GetWindowDC(self.hwnd)
+        self.allocations += 1
+        try:
+            self._mfc_dc = win32ui.CreateDCFromHandle(self._hwnd_dc)
+            self._save_dc = self._mfc_dc.CreateCompatibleDC()
+
+            self._bitmap = win32ui.CreateBitmap()
+            self._bitmap.CreateCompatibleBitmap(self._mfc_dc, width, height)
+            self._save_dc.SelectObject(self._bitmap)
+            self._bitmap_info = self._bitmap.GetInfo()
+        except Exception:
+            # 分配到一半失败时释放已创建的部分
+            self._release()
+            raise
+
+        self.size = size
+
+    def _release(self):
+        """释放已分配的资源（窗口已销毁时忽略释放错误）"""
+        if self._hwnd_dc is None:
+            return
+
+        if self._bitmap is not None:
+            try:
+                win32gui.DeleteObject(self._bitmap.GetHandle())
+            except Exception:
+                pass
+        for dc in (self._save_dc, self._mfc_dc):
+            if dc is not None:
+                try:
+                    dc.DeleteDC()
+                except Exception:
+                    pass
+        try:
+            win32gui.ReleaseDC(self.hwnd, self._hwnd_dc)
+        except Exception:
+            pass
+
+        self._hwnd_dc = None
+        self._mfc_dc = None
+        self._save_dc = None
+        self._bitmap = None
+        self._bitmap_info = None
+        self.size = None
+        self.releases += 1
@@ -0,0 +1,241 @@
+import subprocess
+import threading
+import time
+from typing import List, Optional, Dict
+
+from src.rtmp_decoder import RtmpDecoder, RtmpCommand, CaptureStats, STREAM_COMMANDS, read_packets
+from src.stream_search import TsharkCapturer
+
+
+def format_frame_time(timestamp: float) -> str:
+    """按tshark的frame.time格式输出时间，如 Nov 14, 2023 22:13:20.000500000 CST"""
+    local_time = time.localtime(timestamp)
+    nanoseconds = int(round(timestamp % 1 * 1e6)) % 1000000 * 1000  # 浮点时间戳只能精确到微秒
+    return f"{time.strftime('%b %d, %Y %H:%M:%S', local_time)}.{nanoseconds:09d} {time.strftime('%Z', local_time)}"
+
+
+def format_command_line(command: RtmpCommand, fields: List[str], separator: str = ";") -> str:
+    """
+    把解码出的命令格式化为与 tshark -T fields 相同的一行
+
+    参数:
+        command: 解码出的RTMP命令
+        fields: 字段列表（与TsharkCapturer的字段相同），不支持的字段输出为空
+        separator: 字段分隔符
+
+    返回:
+        一行捕获数据，CaptureBuffer和StreamInfoExtractor可以直接使用
+    """
+    ipv6 = ':' in command.src
+    values: Dict[str, str] = {
+        'frame.number': str(command.frame_number),
+        'frame.time': format_frame_time(command.timestamp),
+        'frame.time_epoch': f"{command.timestamp:.9f}",
+        '_ws.col.protocol': 'RTMP',
+        '_ws.col.info': command.info,
+        'ipv6.src' if ipv6 else 'ip.src': command.src,
+        'ipv6.dst' if ipv6 else 'ip.dst': command.dst,
+        'tcp.srcport': str(command.sport),
+        'tcp.dstport': str(command.dport),
+        'amf.string': ','.join(command.strings),
+    }
+    return separator.join(values.get(field, '') for field in fields)
+
+
+class DumpcapCapturer(TsharkCapturer):
+    """
+    dumpcap管道捕获器
+
+    dumpcap只负责抓包，把pcapng数据块写到标准输出管道，在进程内用RtmpDecoder解码推流命令，
+    不需要tshark对接口上的每个数据包做完整解析；解码结果按tshark的字段格式输出为行，
+    与TsharkCapturer使用相同的start/stop/set_output_callback接口、捕获缓冲区和推流信息提取
+    """
+
+    def __init__(self, dumpcap_path: str = r'C:\Program Files\Wireshark\dumpcap.exe',
+                 buffer_capacity: int = 10000, spill_path: Optional[str] = None,
+                 commands: tuple = STREAM_COMMANDS):
+        """
+        初始化dumpcap捕获器
+
+        参数:
+            dumpcap_path: dumpcap可执行文件路径（dumpcap -D 与 tshark -D 输出格式相同，接口列表直接复用）
+            buffer_capacity: 内存中保留的捕获行数，更早的行写入磁盘溢出文件
+            spill_path: 溢出文件路径，默认使用临时文件
+            commands: 需要输出的RTMP命令，代替tshark的显示过滤器
+        """
+        super().__init__(dumpcap_path, buffer_capacity, spill_path)
+        self.dumpcap_path = dumpcap_path
+        self.commands = commands
+        self.input_file = None  # 设置后从pcap/pcapng文件读取，代替dumpcap管道
+        self.realtime = False
+        self.decoder: Optional[RtmpDecoder] = None
+        self.interface_stats: List[CaptureStats] = []  # pcapng接口统计块（dumpcap退出时写入）
+
+    def set_input_file(self, path: Optional[str], realtime: bool = False):
+        """
+        从捕获文件读取数据包，代替实时抓包（不需要网卡，用于离线分析和基准测试）
+
+        参数:
+            path: pcap/pcapng文件路径，None时恢复为dumpcap实时捕获
+            realtime: 是否按数据包时间戳的间隔回放
+        """
+        self.input_file = path
+        self.realtime = realtime
+
+    def _capture_thread(self):
+        """捕获线程函数"""
+        fields_to_use = self.fields if self.fields else self.default_fields
+        self.decoder = RtmpDecoder(self.commands)
+        self.interface_stats = []
+        self.kernel_stats = {}
+        self.active_capture_filter = None
+
+        if self.input_file:
+            print(f"开始读取捕获文件: {self.input_file}")
+        else:
+            if not self.interface:
+                print("错误: 未设置网络接口")
+                return
+            # -w - 把pcapng数据块写到标准输出，-q 不在标准错误输出中刷新包计数
+            command = [self.dumpcap_path, '-i', self.interface, '-w', '-', '-q']
+            self.active_capture_filter = self._resolve_capture_filter()
+            if self.active_capture_filter:
+                command.extend(['-f', self.active_capture_filter])
+            print(f"开始捕获数据包...")
+            print(f"接口: {self.interface}")
+            print(f"捕获过滤器: {self.active_capture_filter or '无'}")
+            print(f"命令: {', '.join(self.commands)}")
+            print(f"字段: {', '.join(fields_to_use)}")
+
+        stream = None
+        try:
+            if self.input_file:
+                stream = open(self.input_file, 'rb')
+            else:
+                self.process = subprocess.Popen(
+                    command,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    creationflags=self._creation_flags()
+                )
+                self._start_stderr_reader()
+                stream = self.process.stdout
+
+            first_timestamp = None
+            start_time = time.perf_counter()
+            for packet in read_packets(stream, self.interface_stats):
+                if not self.capturing:
+                    if self.input_file:
+                        break
+                    # 停止后继续读到dumpcap退出（管道结束）：丢弃数据包，但仍解析末尾的接口统计块；
+                    # stop()中断dumpcap后超时会强制结束进程，管道随之关闭，读取不会无限等待
+                    continue
+
+                if self.realtime and packet.timestamp:
+                    if first_timestamp is None:
+                        first_timestamp = packet.timestamp
+                    delay = packet.timestamp - first_timestamp - (time.perf_counter() - start_time)
+                    if delay > 0:
+                        time.sleep(delay)
+
+                for rtmp_command in self.decoder.feed_packet(packet):
+                    self._handle_line(format_command_line(rtmp_command, fields_to_use, self.separator))
+
+            if self.process:
+                self.process.wait()
+                self._finish_stderr_reader()
+
+        except Exception as e:
+            print(f"捕获过程中出错: {e}")
+
+        finally:
+            self.capturing = False
+            if self.input_file and stream is not None:
+                stream.close()
+            if self.process and self.process.poll() is None:
+                self.process.terminate()
+
+    def start(self) -> bool:
+        """
+        开始捕获数据包（非阻塞方式），设置了输入文件时不需要网络接口
+
+        返回:
+            是否成功启动
+        """
+        if self.input_file is None or self.capturing:
+            return super().start()
+
+        self.process = None
+        self.capturing = True
+        self.thread = threading.Thread(target=self._capture_thread)
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待捕获线程结束（读取文件时用于等待读完）
+
+        返回:
+            捕获线程是否已结束
+        """
+        if self.thread:
+            self.thread.join(timeout)
+        return not self.capturing
+
+    def get_capture_stats(self) -> dict:
+        """
+        获取内核丢包与解码数据包的对比
+
+        内核统计优先取dumpcap在pcapng末尾写入的接口统计块（isb_ifrecv/isb_ifdrop），
+        其次取dumpcap退出时在标准错误输出的统计
+
+        返回:
+            {'capture_filter': 捕获过滤器, 'display_filter': 输出的命令,
+             'kernel_received': 通过捕获过滤器的数据包数, 'kernel_dropped': 内核/驱动丢弃的数据包数,
+             'dissected': 进程内解码的数据包数, 'dissected_source': 'decoder', 'displayed': 输出的行数, 'drop_ratio': 丢弃比例}
+        """
+        received = self.kernel_stats.get('received')
+        dropped = self.kernel_stats.get('dropped')
+        interface_stats = {}
+        for stats in self.interface_stats:
+            interface_stats[stats.interface_id] = stats  # 同一接口取最后一个统计块
+        if interface_stats:
+            received_values = [stats.received for stats in interface_stats.values() if stats.received is not None]
+            dropped_values = [stats.dropped for stats in interface_stats.values() if stats.dropped is not None]
+            received = sum(received_values) if received_values else received
+            dropped = sum(dropped_values) if dropped_values else dropped
+        return {
+            'capture_filter': self.active_capture_filter,
+            'display_filter': ', '.join(self.commands),
+            'kernel_received': received,
+            'kernel_dropped': dropped,
+            'dissected': self.decoder.packets if self.decoder else None,
+            'dissected_source': 'decoder' if self.decoder else None,
+            'displayed': self.get_captured_count(),
+            'drop_ratio': self._drop_ratio(received, dropped)
+        }
+
+    def get_decoder_stats(self) -> dict:
+        """获取解码统计信息（数据包数、TCP数据包数、负载字节数、解析中的连接数等）"""
+        return self.decoder.get_stats() if self.decoder else {}
+
+
+# 使用示例：读取捕获文件（不需要网卡），输出推流信息
+if __name__ == "__main__":
+    import sys
+
+    capturer = DumpcapCapturer()
+    if len(sys.argv) < 2:
+        print("用法: python -m src.dumpcap_capture <捕获文件>")
+        sys.exit(1)
+
+    capturer.set_input_file(sys.argv[1])
+    capturer.set_output_callback(lambda packet_data: print(f"捕获到数据包: {packet_data}"))
+    if capturer.start():
+        capturer.wait()
+        print(f"已捕获数据包数: {capturer.get_captured_count()}")
+        print(f"解码统计: {capturer.get_decoder_stats()}")
+        capturer.print_capture_report()
+        for stream_info in capturer.stream_info.get_results():
+            print(stream_info['command'], stream_info['stream_code'], stream_info['server'])
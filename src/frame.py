@@ -0,0 +1,129 @@
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class Frame:
+    """窗口截图帧，直接包装位图缓冲区（BGRA/BGR），按需转换为BGR、灰度或PIL图像"""
+
+    def __init__(self, data: np.ndarray, timestamp: Optional[float] = None):
+        """
+        初始化截图帧
+
+        Args:
+            data: HxWx4 的BGRA数组或 HxWx3 的BGR数组，不会被复制
+            timestamp: 截图时间（time.monotonic()），默认为当前时间
+        """
+        if data.ndim != 3 or data.shape[2] not in (3, 4):
+            raise ValueError(f"不支持的帧数据形状: {data.shape}")
+        self.data = data
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+        self._bgr: Optional[np.ndarray] = None
+        self._gray: Optional[np.ndarray] = None
+        self._pil: Optional[Image.Image] = None
+
+    @classmethod
+    def from_bitmap_bits(cls, bits: bytes, width: int, height: int, width_bytes: Optional[int] = None) -> 'Frame':
+        """
+        直接包装GetBitmapBits返回的32位位图数据，不复制像素
+
+        Args:
+            bits: 位图数据（每像素4字节，BGRX顺序，自上而下）
+            width: 位图宽度
+            height: 位图高度
+            width_bytes: 每行字节数，默认为 width * 4
+        """
+        width_bytes = width_bytes or width * 4
+        buffer = np.frombuffer(bits, dtype=np.uint8, count=width_bytes * height).reshape(height, width_bytes)
+        return cls(buffer[:, :width * 4].reshape(height, width, 4))
+
+    @classmethod
+    def from_bgr(cls, image: np.ndarray) -> 'Frame':
+        """包装OpenCV的BGR/BGRA数组"""
+        return cls(image)
+
+    @classmethod
+    def from_pil(cls, image: Image.Image) -> 'Frame':
+        """从PIL图像创建截图帧"""
+        frame = cls(cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2BGR))
+        frame._pil = image
+        return frame
+
+    @property
+    def width(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.data.shape[0]
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """帧尺寸 (宽度, 高度)"""
+        return self.data.shape[1], self.data.shape[0]
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """连续的BGR数组，可直接传给cv2.matchTemplate（BGRA数据只转换一次）"""
+        if self._bgr is None:
+            if self.data.shape[2] == 4:
+                self._bgr = cv2.cvtColor(self.data, cv2.COLOR_BGRA2BGR)
+            else:
+                self._bgr = np.ascontiguousarray(self.data)
+        return self._bgr
+
+    @property
+    def gray(self) -> np.ndarray:
+        """灰度数组（只计算一次）"""
+        if self._gray is None:
+            code = cv2.COLOR_BGRA2GRAY if self.data.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            self._gray = cv2.cvtColor(self.data, code)
+        return self._gray
+
+    def is_mostly_black(self, threshold: float = 0.99, grid: Tuple[int, int] = (32, 32),
+                        black_level: int = 10) -> bool:
+        """检测帧是否大部分为黑色，见 is_mostly_black"""
+        return is_mostly_black(self.data, threshold, grid, black_level)
+
+    def to_pil(self) -> Image.Image:
+        """转换为RGB模式的PIL图像（只在调用时转换一次）"""
+        if self._pil is None:
+            raw_mode = 'BGRX' if self.data.shape[2] == 4 else 'BGR'
+            self._pil = Image.frombuffer('RGB', self.size, np.ascontiguousarray(self.data), 'raw', raw_mode, 0, 1)
+        return self._pil
+
+    def save(self, path: str):
+        """保存截图到文件"""
+        self.to_pil().save(path)
+
+
+def is_mostly_black(data: np.ndarray, threshold: float = 0.99, grid: Tuple[int, int] = (32, 32),
+                    black_level: int = 10) -> bool:
+    """
+    在原始缓冲区上按网格采样，检测图像是否大部分为黑色
+
+    通过步长视图直接读取采样点，不复制整帧数据，也不做缩放或颜色转换
+
+    Args:
+        data: HxWx3 的BGR数组或 HxWx4 的BGRA数组
+        threshold: 黑色采样点比例阈值，默认为0.99（99%）
+        grid: 采样网格 (列数, 行数)
+        black_level: 三通道平均亮度低于该值的像素视为黑色
+
+    Returns:
+        如果大部分为黑色返回True，否则返回False
+    """
+    height, width = data.shape[:2]
+    if width == 0 or height == 0:
+        return True
+
+    step_x = max(1, width // max(1, grid[0]))
+    step_y = max(1, height // max(1, grid[1]))
+    samples = data[step_y // 2::step_y, step_x // 2::step_x, :3]
+
+    # 三通道之和小于 3 * black_level 即平均亮度低于 black_level
+    dark = samples.sum(axis=2, dtype=np.uint16) < 3 * black_level
+    return dark.mean() >= threshold
@@ -0,0 +1,143 @@
+import threading
+from typing import Optional, Tuple, Dict
+
+import numpy as np
+
+
+class FrameChangeDetector:
+    """
+    帧变化检测器
+
+    把截图划分为若干图块，每个图块在原始缓冲区上取固定网格的采样点作为指纹，
+    对比前后两帧的指纹得到发生变化的图块（脏图块）
+    """
+
+    def __init__(self, tiles: Tuple[int, int] = (16, 9), samples_per_tile: Tuple[int, int] = (16, 16),
+                 tolerance: int = 8, min_changed_samples: int = 2):
+        """
+        初始化帧变化检测器
+
+        Args:
+            tiles: 图块划分 (列数, 行数)
+            samples_per_tile: 每个图块内的采样网格 (列数, 行数)
+            tolerance: 采样点三通道平均亮度的变化超过该值才视为变化，用于忽略噪声
+            min_changed_samples: 图块内至少有多少个采样点变化才视为脏图块
+        """
+        self.tiles = tiles
+        self.samples_per_tile = samples_per_tile
+        self.tolerance = tolerance
+        self.min_changed_samples = min_changed_samples
+        self._index_cache: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重置统计计数"""
+        self.frames = 0  # 参与比较的帧数
+        self.unchanged_frames = 0  # 完全未变化的帧数
+        self.partial_frames = 0  # 部分图块变化的帧数
+        self.changed_frames = 0  # 全部失效（首帧、尺寸变化或全部图块变化）的帧数
+
+    def fingerprint(self, data: np.ndarray) -> np.ndarray:
+        """
+        计算帧指纹
+
+        Args:
+            data: HxWx3 的BGR数组或 HxWx4 的BGRA数组
+
+        Returns:
+            形状为 (行数, 列数, 每图块采样点数) 的三通道亮度和数组
+        """
+        height, width = data.shape[:2]
+        ys, xs = self._sample_indices(width, height)
+        samples = data[ys[:, None], xs[None, :], :3].sum(axis=2, dtype=np.uint16)
+
+        tiles_x, tiles_y = self.tiles
+        samples_x, samples_y = self.samples_per_tile
+        return (samples.reshape(tiles_y, samples_y, tiles_x, samples_x)
+                .transpose(0, 2, 1, 3)
+                .reshape(tiles_y, tiles_x, samples_y * samples_x))
+
+    def compare(self, previous: Optional[np.ndarray], current: np.ndarray) -> Optional[np.ndarray]:
+        """
+        对比两帧指纹
+
+        Args:
+            previous: 上一帧指纹，为None时视为全部变化
+            current: 当前帧指纹
+
+        Returns:
+            形状为 (行数, 列数) 的脏图块布尔数组；无法比较（首帧或尺寸变化）时返回None
+        """
+        with self._lock:
+            self.frames += 1
+            if previous is None or previous.shape != current.shape:
+                self.changed_frames += 1
+                return None
+
+            dirty = self._dirty_tiles(previous, current)
+            if not dirty.any():
+                self.unchanged_frames += 1
+            elif dirty.all():
+                self.changed_frames += 1
+            else:
+                self.partial_frames += 1
+            return dirty
+
+    def has_changed(self, previous: Optional[np.ndarray], current: np.ndarray) -> bool:
+        """
+        判断两帧指纹是否有变化，不计入统计
+
+        Args:
+            previous: 上一帧指纹，为None或尺寸不同时视为变化
+            current: 当前帧指纹
+        """
+        if previous is None or previous.shape != current.shape:
+            return True
+        return bool(self._dirty_tiles(previous, current).any())
+
+    def region_overlaps(self, region: Tuple[int, int, int, int], dirty: np.ndarray,
+                        frame_size: Tuple[int, int]) -> bool:
+        """
+        判断区域是否与脏图块重叠
+
+        Args:
+            region: 物理像素区域 (x, y, 宽度, 高度)
+            dirty: compare返回的脏图块数组
+            frame_size: 帧尺寸 (宽度, 高度)
+        """
+        width, height = frame_size
+        tiles_x, tiles_y = self.tiles
+        x, y, w, h = region
+        col_start = max(0, min(tiles_x - 1, x * tiles_x // width))
+        col_end = max(0, min(tiles_x - 1, (x + w - 1) * tiles_x // width))
+        row_start = max(0, min(tiles_y - 1, y * tiles_y // height))
+        row_end = max(0, min(tiles_y - 1, (y + h - 1) * tiles_y // height))
+        return bool(dirty[row_start:row_end + 1, col_start:col_end + 1].any())
+
+    def get_stats(self) -> Dict:
+        """获取帧变化统计信息"""
+        with self._lock:
+            return {
+                'frames': self.frames,
+                'unchanged_frames': self.unchanged_frames,
+                'partial_frames': self.partial_frames,
+                'changed_frames': self.changed_frames
+            }
+
+    def _dirty_tiles(self, previous: np.ndarray, current: np.ndarray) -> np.ndarray:
+        """计算脏图块布尔数组"""
+        diff = np.abs(current.astype(np.int32) - previous.astype(np.int32)) > 3 * self.tolerance
+        return diff.sum(axis=2) >= self.min_changed_samples
+
+    def _sample_indices(self, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+        """计算采样点的行列索引，同一尺寸只计算一次"""
+        indices = self._index_cache.get((width, height))
+        if indices is None:
+            columns = self.tiles[0] * self.samples_per_tile[0]
+            rows = self.tiles[1] * self.samples_per_tile[1]
+            xs = ((np.arange(columns) + 0.5) * width / columns).astype(np.intp)
+            ys = ((np.arange(rows) + 0.5) * height / rows).astype(np.intp)
+            indices = (ys, xs)
+            self._index_cache[(width, height)] = indices
+        return indices
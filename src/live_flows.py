@@ -0,0 +1,88 @@
+from typing import Optional, Dict
+
+from src.application_operation import WindowController, TemplateSpec
+from src.live_state_machine import LiveState, LiveStateMachine
+
+# 直播伴侣窗口的类名和标题
+WINDOW_CLASS = "Chrome_WidgetWin_1"
+WINDOW_TITLE = "直播伴侣"
+
+# 直播伴侣的界面状态：main_开头的模板出现在主窗口，sec_开头的模板出现在弹出的副窗口
+MAIN_START_LIVE = TemplateSpec("main_start_live.png")
+MAIN_STOP_LIVE = TemplateSpec("main_stop_live.png")
+MAIN_LIVE_STOPPED_RETURN = TemplateSpec("main_live_stopped_return.png")
+SEC_RESTORE_LIVE_BROADCAST_SCREEN = TemplateSpec("sec_restore_live_broadcast_screen.png", 0.85, (0.75, 0.875))
+SEC_FAILED_RESUME_LIVE = TemplateSpec("sec_failed_resume_live.png", 0.85, (0.75, 0.75))
+SEC_NO_SOUND_REMINDER = TemplateSpec("sec_no_sound_reminder.png", 0.85, (0.5, 0.875))
+SEC_CONFIRM_WITHDRAWAL = TemplateSpec("sec_confirm_withdrawal.png", 0.85, (0.25, 0.875))
+SEC_CONFIRM_WITHDRAWAL_LIVE = TemplateSpec("sec_confirm_withdrawal_live.png", 0.85, (0.25, 0.875))
+
+# 弹窗状态：点击后回到主窗口的某个状态
+_DIALOG_STATES = [
+    LiveState("restore_live_broadcast_screen", (SEC_RESTORE_LIVE_BROADCAST_SCREEN,),
+              next_states=("start_live", "stop_live")),
+    LiveState("failed_resume_live", (SEC_FAILED_RESUME_LIVE,), next_states=("start_live",)),
+    LiveState("no_sound_reminder", (SEC_NO_SOUND_REMINDER,), next_states=("stop_live",)),
+    LiveState("confirm_withdrawal", (SEC_CONFIRM_WITHDRAWAL, SEC_CONFIRM_WITHDRAWAL_LIVE),
+              next_states=("start_live", "stop_live")),
+]
+
+# 开始直播：直到出现“关闭直播”按钮
+START_LIVE_STATES = [
+    LiveState("stop_live", (MAIN_STOP_LIVE,), action='none', terminal=True),
+    LiveState("start_live", (MAIN_START_LIVE,),
+              next_states=("no_sound_reminder", "failed_resume_live", "stop_live")),
+    LiveState("live_stopped_return", (MAIN_LIVE_STOPPED_RETURN,), next_states=("start_live",)),
+    *_DIALOG_STATES,
+    # 误触关闭直播时取消
+    LiveState("true_stop_live", (TemplateSpec("sec_true_stop_live_is.png", 0.85, (0.25, 0.875)),),
+              next_states=("stop_live",)),
+]
+
+# 关闭直播：直到出现直播结束后的“返回”按钮
+STOP_LIVE_STATES = [
+    LiveState("live_stopped_return", (MAIN_LIVE_STOPPED_RETURN,), action='none', terminal=True),
+    LiveState("start_live", (MAIN_START_LIVE,),
+              next_states=("no_sound_reminder", "failed_resume_live", "stop_live")),
+    LiveState("stop_live", (MAIN_STOP_LIVE,), next_states=("true_stop_live",)),
+    *_DIALOG_STATES,
+    # 确认关闭直播，最多等待2秒让直播结束页面出现
+    LiveState("true_stop_live", (TemplateSpec("sec_true_stop_live_is.png", 0.85, (0.75, 0.875)),),
+              next_states=("live_stopped_return",), settle=2),
+]
+
+# 关闭程序：没有弹窗的窗口发送关闭消息，弹出的退出确认框点击确认，直到所有窗口关闭
+CLEAR_LIVE_STATES = [
+    LiveState("confirm_withdrawal", (SEC_CONFIRM_WITHDRAWAL._replace(click_position_ratio=(0.75, 0.875)),
+                                     SEC_CONFIRM_WITHDRAWAL_LIVE._replace(click_position_ratio=(0.75, 0.875))),
+              next_states=("confirm_withdrawal",)),
+]
+
+
+def _run(controller: WindowController, machine: LiveStateMachine, title: str, timeout: Optional[float]) -> Dict:
+    """运行状态机并打印各状态的停留时间"""
+    finished = machine.run(controller, timeout) is not None
+    stats = machine.get_stats()
+    stats['finished'] = finished
+    print(f"{title}{'完成' if finished else f'超时（{timeout}秒）'}: 轮询 {stats['polls']} 次，平均每次匹配 {stats['templates_per_poll']:.1f} 个模板，"
+          f"停留时间: {machine.format_dwell_times()}")
+    return stats
+
+
+def start_live(controller: WindowController, timeout: Optional[float] = None) -> Dict:
+    """开始直播，timeout为超时时间（秒），None表示不限"""
+    machine = LiveStateMachine(START_LIVE_STATES, WINDOW_CLASS, WINDOW_TITLE)
+    return _run(controller, machine, "开始直播", timeout)
+
+
+def stop_live(controller: WindowController, timeout: Optional[float] = None) -> Dict:
+    """关闭直播，timeout为超时时间（秒），None表示不限"""
+    machine = LiveStateMachine(STOP_LIVE_STATES, WINDOW_CLASS, WINDOW_TITLE)
+    return _run(controller, machine, "关闭直播", timeout)
+
+
+def clear_live(controller: WindowController, timeout: Optional[float] = None) -> Dict:
+    """关闭程序，timeout为超时时间（秒），None表示不限"""
+    machine = LiveStateMachine(CLEAR_LIVE_STATES, WINDOW_CLASS, WINDOW_TITLE, start_program=False,
+                               finish_when_windows_gone=True, close_unmatched=True)
+    return _run(controller, machine, "关闭程序", timeout)
@@ -0,0 +1,235 @@
+import time
+from typing import Optional, Tuple, Dict, List, NamedTuple
+
+from src.application_operation import WindowController, TemplateSpec
+from src.window_registry import WindowRegistry
+
+
+class LiveState(NamedTuple):
+    """
+    直播伴侣界面的一个状态
+
+    templates: 识别该状态的模板，任意一个匹配即处于该状态，匹配到的模板同时作为点击目标
+    action: 进入该状态（或停留在该状态）时执行的操作：'click' 点击匹配位置，'close' 关闭窗口，'none' 不操作
+    next_states: 执行操作后可能出现的后续状态，轮询时只检查这些状态和当前状态的模板
+    terminal: 是否为终止状态，检测到后流程结束
+    settle: 执行操作后等待界面响应（画面变化或窗口关闭）的最长时间（秒），响应后立即继续
+    """
+    name: str
+    templates: Tuple[TemplateSpec, ...]
+    action: str = 'click'
+    next_states: Tuple[str, ...] = ()
+    terminal: bool = False
+    settle: float = 0.5
+
+
+class LiveStateMachine:
+    """
+    声明式直播控制状态机
+
+    当前状态已知时每次轮询只匹配后续状态和当前状态的模板；当前状态未知，
+    或某个窗口连续多次没有匹配到任何候选模板（界面出现意料之外的变化）时，该窗口按声明顺序匹配全部状态的模板
+    """
+
+    UNKNOWN = 'unknown'  # 尚未识别出任何状态
+    WINDOWS_GONE = 'windows_gone'  # 所有窗口都已关闭
+
+    def __init__(self, states: List[LiveState], window_class: str, window_title: str,
+                 start_program: bool = True, finish_when_windows_gone: bool = False,
+                 close_unmatched: bool = False, close_wait: float = 1.0, full_scan_after: int = 3):
+        """
+        初始化状态机
+
+        Args:
+            states: 状态列表，声明顺序即同一截图中多个状态同时匹配时的优先级
+            window_class: 窗口类名
+            window_title: 窗口标题
+            start_program: 每次轮询前是否查找窗口（找不到时启动程序）
+            finish_when_windows_gone: 所有窗口关闭后是否结束流程
+            close_unmatched: 截图成功但没有匹配任何候选模板的窗口是否发送关闭消息
+            close_wait: 发送关闭消息后等待窗口关闭的最长时间（秒）
+            full_scan_after: 窗口连续多少次没有匹配时退回到全部状态匹配
+        """
+        self.states: Dict[str, LiveState] = {}
+        for state in states:
+            if state.action not in ('click', 'close', 'none'):
+                raise ValueError(f"不支持的状态操作: {state.action}")
+            self.states[state.name] = state
+        for state in states:
+            for name in state.next_states:
+                if name not in self.states:
+                    raise ValueError(f"状态 {state.name} 的后续状态不存在: {name}")
+
+        self.window_class = window_class
+        self.window_title = window_title
+        self.start_program = start_program
+        self.finish_when_windows_gone = finish_when_windows_gone
+        self.close_unmatched = close_unmatched
+        self.close_wait = close_wait
+        self.full_scan_after = full_scan_after
+
+        # 模板文件名 -> 状态，用于从匹配结果反查状态
+        self._state_by_template = {spec.template_path: state for state in states for spec in state.templates}
+        self.reset()
+
+    def reset(self):
+        """重置当前状态和统计信息"""
+        self.current: Optional[LiveState] = None
+        self.misses: Dict[int, int] = {}  # 窗口句柄 -> 连续没有匹配到候选模板的次数
+        self.polls = 0
+        self.full_scans = 0
+        self.templates_checked = 0  # 所有轮询中提交匹配的模板数量
+        self.waited = 0.0  # 执行操作后等待界面响应的累计时间（秒）
+        self.dwell_times: Dict[str, float] = {}  # 状态名 -> 累计停留时间（秒）
+        self.visits: Dict[str, int] = {}  # 状态名 -> 进入次数
+        self.transitions: List[Tuple[str, str, float]] = []  # (原状态, 新状态, 时间)
+        self._entered_at = time.monotonic()
+        self._hwnds: List[int] = []  # 最近一次轮询时的窗口列表
+
+    @property
+    def state_name(self) -> str:
+        """当前状态名"""
+        return self.current.name if self.current else self.UNKNOWN
+
+    def candidates(self, hwnd: Optional[int] = None) -> List[TemplateSpec]:
+        """
+        获取本次轮询需要匹配的模板
+
+        Args:
+            hwnd: 窗口句柄，用于判断该窗口是否需要全部状态匹配
+
+        Returns:
+            按状态声明顺序排列的模板列表
+        """
+        if self._needs_full_scan(hwnd):
+            names = set(self.states)
+        else:
+            names = {self.current.name, *self.current.next_states}
+        return [spec for state in self.states.values() if state.name in names for spec in state.templates]
+
+    def run(self, controller: WindowController, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        运行状态机直到进入终止状态，两次轮询之间的间隔由controller.scheduler按窗口调度
+
+        Args:
+            controller: 窗口控制器
+            timeout: 超时时间（秒），None表示不限
+
+        Returns:
+            结束时的状态名，超时返回None
+        """
+        self.reset()
+        start_time = time.monotonic()
+
+        while timeout is None or time.monotonic() - start_time < timeout:
+            finished = self.poll(controller)
+            if finished:
+                self._leave_state(self.state_name)
+                return self.state_name
+            controller.scheduler.wait(self._hwnds)
+
+        self._leave_state(self.state_name)
+        return None
+
+    def poll(self, controller: WindowController) -> bool:
+        """
+        轮询一次所有到期的窗口
+
+        Returns:
+            是否进入终止状态
+        """
+        self.polls += 1
+        if self.start_program:
+            controller.find_window(self.window_class, self.window_title)  # 启动直播伴侣
+
+        hwnds = controller._get_windows(self.window_class, self.window_title)
+        self._hwnds = hwnds
+        if not hwnds and self.finish_when_windows_gone:
+            self._enter(LiveState(self.WINDOWS_GONE, (), action='none', terminal=True))
+            return True
+
+        due = [hwnd for hwnd in hwnds if controller.scheduler.is_due(hwnd)]
+        if not due:
+            return False
+        for hwnd in due:  # 区分主窗口，副窗口，遮罩窗口
+            controller.set_window_handle(hwnd)
+            controller.restore_window(hwnd)  # 最小化时恢复正常显示
+            if controller.get_window_role(hwnd) == WindowRegistry.OVERLAY:
+                # 遮罩窗口截图全黑，不需要匹配；仍按画面没有变化记录轮询，推迟下次到期时间，
+                # 否则遮罩窗口一直到期，run()中的scheduler.wait()不会休眠
+                controller.scheduler.record_poll(hwnd, 0.0, False)
+                continue
+            poll_start = time.monotonic()
+            if controller.capture_frame() is None:
+                controller.scheduler.record_poll(hwnd, time.monotonic() - poll_start, False)
+                continue
+
+            if self._needs_full_scan(hwnd):
+                self.full_scans += 1
+            candidates = self.candidates(hwnd)
+            self.templates_checked += len(candidates)
+            matches = controller.match_all(candidates, first_only=True, use_last_screenshot=True)
+            controller.scheduler.record_poll(hwnd, time.monotonic() - poll_start, controller.last_frame_changed(hwnd))
+            if not matches:
+                self.misses[hwnd] = self.misses.get(hwnd, 0) + 1
+                if self.close_unmatched:
+                    controller.close_window(hwnd)  # 关闭窗口（向窗口发送关闭消息）
+                    self.waited += controller.wait_for_window_gone(hwnd, self.close_wait).waited
+                continue
+
+            self.misses[hwnd] = 0
+            state = self._state_by_template[matches[0]['template_path']]
+            self._enter(state)
+            if state.terminal:
+                return True
+            self._act(controller, hwnd, state, matches[0])
+
+        return False
+
+    def _needs_full_scan(self, hwnd: Optional[int]) -> bool:
+        return self.current is None or self.misses.get(hwnd, 0) >= self.full_scan_after
+
+    def get_stats(self) -> Dict:
+        """获取轮询和各状态停留时间统计"""
+        return {
+            'state': self.state_name,
+            'polls': self.polls,
+            'full_scans': self.full_scans,
+            'templates_checked': self.templates_checked,
+            'templates_per_poll': self.templates_checked / self.polls if self.polls else 0.0,
+            'waited': self.waited,
+            'transitions': len(self.transitions),
+            'visits': dict(self.visits),
+            'dwell_times': dict(self.dwell_times)
+        }
+
+    def format_dwell_times(self) -> str:
+        """按停留时间从长到短格式化各状态的停留时间"""
+        items = sorted(self.dwell_times.items(), key=lambda item: item[1], reverse=True)
+        return ', '.join(f"{name} {seconds:.2f}s" for name, seconds in items)
+
+    def _enter(self, state: LiveState):
+        """切换到新状态并记录上一个状态的停留时间"""
+        previous = self.state_name
+        if previous == state.name:
+            return
+        self._leave_state(previous)
+        self.transitions.append((previous, state.name, time.monotonic()))
+        self.visits[state.name] = self.visits.get(state.name, 0) + 1
+        self.current = state
+
+    def _leave_state(self, name: str):
+        """累计状态的停留时间"""
+        now = time.monotonic()
+        self.dwell_times[name] = self.dwell_times.get(name, 0.0) + now - self._entered_at
+        self._entered_at = now
+
+    def _act(self, controller: WindowController, hwnd: int, state: LiveState, match: Dict):
+        """执行状态的操作，并等待界面响应"""
+        if state.action == 'click':
+            if controller.click(coordinates=match) and state.settle:
+                self.waited += controller.wait_for_frame_change(hwnd, state.settle).waited
+        elif state.action == 'close':
+            controller.close_window(hwnd)
+            if state.settle:
+                self.waited += controller.wait_for_window_gone(hwnd, state.settle).waited
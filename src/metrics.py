@@ -0,0 +1,215 @@
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Optional, Tuple, Dict, List
+
+# 默认直方图桶上限（秒）：0.1毫秒到10秒，覆盖从坐标计算到整个流程的耗时
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """固定桶的耗时直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个桶为 +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        """记录一次耗时（秒）"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        按桶估算分位数（取所在桶的上限）
+
+        Args:
+            q: 分位数，范围0-100
+        """
+        if not self.count:
+            return None
+        target = q / 100 * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target and count:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'buckets': {('+Inf' if index == len(self.buckets) else repr(self.buckets[index])): count
+                        for index, count in enumerate(self.counts)}
+        }
+
+
+class _NullTimer:
+    """关闭统计时使用的空计时器"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """记录with代码块耗时的计时器"""
+
+    __slots__ = ('metrics', 'stage', 'label', 'start')
+
+    def __init__(self, metrics: 'Metrics', stage: str, label: str):
+        self.metrics = metrics
+        self.stage = stage
+        self.label = label
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start, self.label)
+        return False
+
+
+class Metrics:
+    """
+    分阶段耗时统计
+
+    每个 (阶段, 标签) 一个直方图，标签通常为模板文件名；关闭时timer()返回共享的空计时器，几乎没有开销
+    """
+
+    def __init__(self, enabled: bool = False, prefix: str = "window_controller",
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        初始化耗时统计
+
+        Args:
+            enabled: 是否启用
+            prefix: 导出Prometheus指标时的名称前缀
+            buckets: 直方图桶上限（秒）
+        """
+        self.enabled = enabled
+        self.prefix = prefix
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, stage: str, label: str = ""):
+        """
+        获取阶段计时器，用法: with metrics.timer('match', template_path): ...
+
+        Args:
+            stage: 阶段名
+            label: 标签，如模板文件名
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage, label)
+
+    def observe(self, stage: str, seconds: float, label: str = ""):
+        """记录一次阶段耗时"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get((stage, label))
+            if histogram is None:
+                histogram = self._histograms[(stage, label)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name: str, label: str = "", value: int = 1):
+        """计数器加一（如匹配成功次数、缓存命中次数）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, label)] = self._counters.get((name, label), 0) + value
+
+    def reset(self):
+        """清空所有统计"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict:
+        """
+        获取统计快照
+
+        Returns:
+            {'stages': {阶段: {标签: 直方图}}, 'counters': {计数器: {标签: 值}}}
+        """
+        with self._lock:
+            stages: Dict[str, Dict] = {}
+            for (stage, label), histogram in sorted(self._histograms.items()):
+                stages.setdefault(stage, {})[label] = histogram.to_dict()
+            counters: Dict[str, Dict] = {}
+            for (name, label), value in sorted(self._counters.items()):
+                counters.setdefault(name, {})[label] = value
+        return {'time': time.time(), 'stages': stages, 'counters': counters}
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """导出JSON快照，提供path时同时写入文件"""
+        text = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        return text
+
+    def to_prometheus(self, path: Optional[str] = None) -> str:
+        """导出Prometheus文本格式，提供path时同时写入文件（可供node_exporter的textfile收集器读取）"""
+        name = f"{self.prefix}_stage_seconds"
+        lines: List[str] = [f"# HELP {name} WindowController stage latency in seconds",
+                            f"# TYPE {name} histogram"]
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        for (stage, label), histogram in histograms:
+            labels = f'stage="{_escape(stage)}",template="{_escape(label)}"'
+            cumulative = 0
+            for index, count in enumerate(histogram.counts):
+                cumulative += count
+                le = '+Inf' if index == len(histogram.buckets) else repr(histogram.buckets[index])
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        for counter in sorted({counter for (counter, _), _ in counters}):
+            lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+            for (name_, label), value in counters:
+                if name_ == counter:
+                    lines.append(f'{self.prefix}_{counter}_total{{template="{_escape(label)}"}} {value}')
+
+        text = "\n".join(lines) + "\n"
+        if path:
+            # 先写临时文件再替换，避免收集器读到写了一半的文件
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(path + ".tmp", path)
+        return text
+
+
+def _escape(value: str) -> str:
+    """转义Prometheus标签值"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,212 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Callable, Dict, List, Any
+
+from src.application_operation import WindowController
+from src.backends import FrameSource, InputSink
+from src.template_store import TemplateStore
+from src.window_registry import WindowRegistry
+
+
+class LiveSession:
+    """
+    一个直播伴侣实例（一个直播账号）的控制会话
+
+    WindowController的当前窗口、截图、帧缓存和DPI都是实例状态，不是线程安全的，
+    因此同一会话中的流程总是逐个运行；不同会话使用各自的控制器，可以并行
+    """
+
+    def __init__(self, process_id: int, controller: WindowController, max_concurrency: int = 1):
+        """
+        初始化会话
+
+        Args:
+            process_id: 直播伴侣实例的进程ID
+            controller: 只操作该进程窗口的窗口控制器，拥有独立的DPI、截图和匹配位置记录
+            max_concurrency: 兼容旧参数，大于1时限制为1（多个流程不能共享同一个控制器）
+        """
+        if max_concurrency > 1:
+            print(f"⚠️ 会话 {process_id} 的流程共享同一个窗口控制器，并发数限制为1（请求 {max_concurrency}）")
+        self.process_id = process_id
+        self.controller = controller
+        self.max_concurrency = 1
+        self._semaphore = threading.Semaphore(self.max_concurrency)
+        self.runs = 0  # 已完成的流程数
+        self.failures = 0  # 抛出异常的流程数
+        self.busy_time = 0.0  # 流程累计运行时间（秒）
+        self.queued_time = 0.0  # 等待会话空闲的累计时间（秒）
+        self._stats_lock = threading.Lock()
+
+    def run(self, flow: Callable[[WindowController], Any]) -> Any:
+        """
+        运行流程，同一会话的流程排队逐个运行
+
+        Args:
+            flow: 接收窗口控制器的流程函数，如 start_live
+
+        Returns:
+            流程的返回值
+        """
+        queued_at = time.monotonic()
+        with self._semaphore:
+            start_time = time.monotonic()
+            try:
+                return flow(self.controller)
+            except Exception:
+                with self._stats_lock:
+                    self.failures += 1
+                raise
+            finally:
+                end_time = time.monotonic()
+                with self._stats_lock:
+                    self.runs += 1
+                    self.busy_time += end_time - start_time
+                    self.queued_time += start_time - queued_at
+
+    def get_stats(self) -> Dict:
+        """获取会话的运行统计信息"""
+        with self._stats_lock:
+            return {
+                'process_id': self.process_id,
+                'runs': self.runs,
+                'failures': self.failures,
+                'busy_time': self.busy_time,
+                'queued_time': self.queued_time
+            }
+
+
+class MultiSessionController:
+    """
+    多实例控制器
+
+    按进程区分多个直播伴侣实例，每个实例一个会话和一个独立的WindowController；
+    所有会话共享同一个后端、模板缓存和窗口注册表，不同会话的流程在线程池中并行运行，
+    同一会话的流程排队逐个运行
+    """
+
+    def __init__(self, img_tmp_dir: str = "../img_tmp", frame_source: Optional[FrameSource] = None,
+                 input_sink: Optional[InputSink] = None, max_workers: int = 4, session_concurrency: int = 1):
+        """
+        初始化多实例控制器
+
+        Args:
+            img_tmp_dir: 模板目录
+            frame_source: 截图来源，默认使用Win32后端
+            input_sink: 输入接口，默认与frame_source相同
+            max_workers: 同时运行流程的线程数
+            session_concurrency: 兼容旧参数，每个会话的流程总是逐个运行（见LiveSession）
+        """
+        self._owns_backend = frame_source is None
+        if frame_source is None:
+            from src.win32_backend import Win32Backend  # 只在Windows上导入win32模块
+            frame_source = Win32Backend()
+        self.frame_source = frame_source
+        self.input_sink = input_sink
+        self.template_store = TemplateStore(img_tmp_dir)
+        self.template_store.preload()
+        self.window_registry = WindowRegistry(frame_source)
+        self.session_concurrency = session_concurrency
+        self.sessions: Dict[int, LiveSession] = {}  # 进程ID -> 会话
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="live_session")
+        self._lock = threading.Lock()
+
+    def discover_sessions(self, class_name: str, window_name: str) -> List[LiveSession]:
+        """
+        按进程ID为每个直播伴侣实例创建会话，已存在的会话保持不变
+
+        Args:
+            class_name: 窗口类名
+            window_name: 窗口标题
+
+        Returns:
+            当前所有会话
+        """
+        hwnds = self.window_registry.find(class_name, window_name)
+        with self._lock:
+            for hwnd in hwnds:
+                process_id = self.window_registry.get_process_id(hwnd)
+                if process_id not in self.sessions:
+                    self.sessions[process_id] = LiveSession(process_id, self._create_controller(process_id),
+                                                            self.session_concurrency)
+            return list(self.sessions.values())
+
+    def submit(self, session: LiveSession, flow: Callable[[WindowController], Any]) -> Future:
+        """在线程池中运行一个会话的流程"""
+        return self._executor.submit(session.run, flow)
+
+    def run_all(self, flow: Callable[[WindowController], Any],
+                sessions: Optional[List[LiveSession]] = None) -> Dict[int, Any]:
+        """
+        在所有会话上并行运行同一个流程，等待全部完成
+
+        Args:
+            flow: 接收窗口控制器的流程函数，如 start_live
+            sessions: 要运行的会话，默认全部会话
+
+        Returns:
+            进程ID -> 流程返回值（流程抛出异常时为异常对象）
+        """
+        sessions = list(self.sessions.values()) if sessions is None else sessions
+        futures = {session.process_id: self.submit(session, flow) for session in sessions}
+
+        results = {}
+        for process_id, future in futures.items():
+            try:
+                results[process_id] = future.result()
+            except Exception as e:
+                print(f"❌ 会话 {process_id} 流程失败: {e}")
+                results[process_id] = e
+        return results
+
+    def get_stats(self) -> Dict:
+        """获取所有会话和共享缓存的统计信息"""
+        with self._lock:
+            sessions = list(self.sessions.values())
+        return {
+            'sessions': [session.get_stats() for session in sessions],
+            'template_cache': self.template_store.get_stats(),
+            'window_registry': self.window_registry.get_stats()
+        }
+
+    def close(self):
+        """停止线程池并释放所有会话的资源"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for session in self.sessions.values():
+                session.controller.close()
+        if self._owns_backend:
+            self.frame_source.close()
+
+    def __enter__(self) -> 'MultiSessionController':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _create_controller(self, process_id: int) -> WindowController:
+        """创建只操作指定进程窗口的控制器，不自动启动程序"""
+        return WindowController(launcher_path="", frame_source=self.frame_source, input_sink=self.input_sink,
+                                template_store=self.template_store, window_registry=self.window_registry,
+                                process_id=process_id)
+
+
+# 使用示例：用回放后端模拟三个直播账号并行开始直播
+if __name__ == "__main__":
+    from src.live_flows import start_live, WINDOW_CLASS, WINDOW_TITLE
+    from src.replay_backend import ReplayBackend
+
+    backend = ReplayBackend(advance='click')
+    for account in range(3):
+        backend.add_composite_window("img_tmp", [
+            ["main_start_live.png"],  # 未开播，点击开始直播
+            ["main_stop_live.png"],  # 已开播
+        ], seed=account, process_id=1000 + account)
+
+    with MultiSessionController("img_tmp", frame_source=backend, max_workers=3) as multi:
+        sessions = multi.discover_sessions(WINDOW_CLASS, WINDOW_TITLE)
+        start_time = time.time()
+        multi.run_all(start_live)
+        print(f"{len(sessions)} 个账号开始直播完成，耗时 {time.time() - start_time:.3f} 秒")
+        for stats in multi.get_stats()['sessions']:
+            print(stats)
@@ -0,0 +1,143 @@
+import threading
+from typing import Optional, Tuple, Dict, Hashable
+
+
+class RegionMemory:
+    """记录每个模板上次匹配到的位置，下次优先在该位置附近搜索"""
+
+    def __init__(self, padding: int = 24, padding_ratio: float = 0.5, ema_alpha: float = 0.2):
+        """
+        初始化区域记忆
+
+        Args:
+            padding: 搜索区域在模板四周额外扩展的固定像素
+            padding_ratio: 搜索区域按模板尺寸比例额外扩展的大小
+            ema_alpha: 全图搜索耗时滑动平均的平滑系数
+        """
+        self.padding = padding
+        self.padding_ratio = padding_ratio
+        self.ema_alpha = ema_alpha
+        self._regions: Dict[Hashable, Dict] = {}  # key -> {'rect': (x, y, w, h), 'frame_size': (w, h)}
+        self._full_time_ema: Dict[Hashable, float] = {}  # key -> 全图搜索平均耗时
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """重置统计计数"""
+        self.region_searches = 0  # 区域搜索次数
+        self.region_hits = 0  # 区域搜索命中次数
+        self.full_searches = 0  # 全图搜索次数
+        self.fallback_searches = 0  # 区域未命中后回退到全图的次数
+        self.region_time = 0.0  # 区域搜索累计耗时（秒）
+        self.full_time = 0.0  # 全图搜索累计耗时（秒）
+        self.time_saved = 0.0  # 区域命中相对全图搜索估算节省的耗时（秒）
+
+    def get_search_region(self, key: Hashable, frame_size: Tuple[int, int],
+                          template_size: Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        """
+        获取模板的优先搜索区域
+
+        Args:
+            key: 模板标识，如 (hwnd, 模板文件名)
+            frame_size: 截图尺寸 (宽度, 高度)
+            template_size: 模板尺寸 (宽度, 高度)
+
+        Returns:
+            扩展后的搜索区域 (x, y, 宽度, 高度)，没有记录或区域无效时返回None
+        """
+        with self._lock:
+            region = self._regions.get(key)
+        if region is None or region['frame_size'] != frame_size:
+            return None
+
+        frame_w, frame_h = frame_size
+        template_w, template_h = template_size
+        x, y, w, h = region['rect']
+        pad_x = self.padding + int(template_w * self.padding_ratio)
+        pad_y = self.padding + int(template_h * self.padding_ratio)
+
+        left = max(0, x - pad_x)
+        top = max(0, y - pad_y)
+        right = min(frame_w, x + w + pad_x)
+        bottom = min(frame_h, y + h + pad_y)
+
+        # 区域小于模板或已覆盖整张截图时，区域搜索没有意义
+        if right - left < template_w or bottom - top < template_h:
+            return None
+        if right - left >= frame_w and bottom - top >= frame_h:
+            return None
+
+        return left, top, right - left, bottom - top
+
+    def get_region(self, key: Hashable) -> Optional[Tuple[int, int, int, int]]:
+        """获取模板上次匹配到的位置 (x, y, 宽度, 高度)"""
+        with self._lock:
+            region = self._regions.get(key)
+        return region['rect'] if region else None
+
+    def record_hit(self, key: Hashable, match_loc: Tuple[int, int], template_size: Tuple[int, int],
+                   frame_size: Tuple[int, int]):
+        """记录模板的匹配位置"""
+        with self._lock:
+            self._regions[key] = {
+                'rect': (match_loc[0], match_loc[1], template_size[0], template_size[1]),
+                'frame_size': frame_size
+            }
+
+    def record_search(self, key: Hashable, elapsed: float, region_search: bool, hit: bool,
+                      fallback: bool = False):
+        """
+        记录一次搜索的耗时
+
+        Args:
+            key: 模板标识
+            elapsed: 本次搜索耗时（秒）
+            region_search: 是否为区域搜索
+            hit: 是否匹配成功
+            fallback: 全图搜索是否由区域未命中触发
+        """
+        with self._lock:
+            if region_search:
+                self.region_searches += 1
+                self.region_time += elapsed
+                if hit:
+                    self.region_hits += 1
+                    full_time = self._full_time_ema.get(key)
+                    if full_time is not None:
+                        self.time_saved += max(0.0, full_time - elapsed)
+                return
+
+            self.full_searches += 1
+            self.full_time += elapsed
+            if fallback:
+                self.fallback_searches += 1
+            previous = self._full_time_ema.get(key)
+            if previous is None:
+                self._full_time_ema[key] = elapsed
+            else:
+                self._full_time_ema[key] = previous + self.ema_alpha * (elapsed - previous)
+
+    def forget(self, key: Optional[Hashable] = None):
+        """清除指定模板（或全部模板）的位置记录"""
+        with self._lock:
+            if key is None:
+                self._regions.clear()
+                self._full_time_ema.clear()
+            else:
+                self._regions.pop(key, None)
+                self._full_time_ema.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """获取区域搜索统计信息"""
+        with self._lock:
+            return {
+                'regions': len(self._regions),
+                'region_searches': self.region_searches,
+                'region_hits': self.region_hits,
+                'region_hit_rate': self.region_hits / self.region_searches if self.region_searches else 0.0,
+                'full_searches': self.full_searches,
+                'fallback_searches': self.fallback_searches,
+                'region_time': self.region_time,
+                'full_time': self.full_time,
+                'time_saved': self.time_saved
+            }
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from typing import Optional, Tuple, Dict, List, Union
+
+import cv2
+import numpy as np
+
+from src.backends import FrameSource, InputSink
+from src.frame import Frame
+from src.synthetic_frames import load_templates, make_background, random_placements, scale_template
+
+
+class ReplayWindow:
+    """回放后端中的一个窗口：按顺序提供预先录制的截图帧"""
+
+    def __init__(self, hwnd: int, frames: List[Frame], class_name: str, title: str,
+                 position: Tuple[int, int] = (0, 0), dpi_scale: float = 1.0, loop: bool = False,
+                 transparent: bool = False, process_id: int = 0):
+        self.hwnd = hwnd
+        self.frames = frames
+        self.class_name = class_name
+        self.title = title
+        self.position = position  # 窗口左上角的屏幕坐标
+        self.dpi_scale = dpi_scale
+        self.loop = loop  # 播放到最后一帧后是否从头开始
+        self.transparent = transparent  # 是否为鼠标穿透的遮罩窗口
+        self.process_id = process_id  # 所属进程ID，同一程序实例的窗口相同
+        self.index = 0  # 当前帧序号
+        self.minimized = False
+        self.closed = False
+
+    @property
+    def frame(self) -> Frame:
+        return self.frames[self.index]
+
+    def advance(self, steps: int = 1):
+        """切换到后面的帧，到达最后一帧后停留（loop时从头开始）"""
+        if self.loop:
+            self.index = (self.index + steps) % len(self.frames)
+        else:
+            self.index = min(len(self.frames) - 1, self.index + steps)
+
+
+class ReplayBackend(FrameSource, InputSink):
+    """
+    回放后端：用录制或合成的PNG帧代替真实窗口，并记录收到的点击
+
+    不依赖win32模块，可以在Linux上无界面地运行匹配基准测试和开始/关闭直播流程
+    """
+
+    def __init__(self, advance: str = 'click'):
+        """
+        初始化回放后端
+
+        Args:
+            advance: 切换到下一帧的时机：'click' 每次点击后，'capture' 每次截图后，'manual' 只通过advance()切换
+        """
+        if advance not in ('click', 'capture', 'manual'):
+            raise ValueError(f"不支持的切换方式: {advance}")
+        self.advance_mode = advance
+        self.windows: Dict[int, ReplayWindow] = {}
+        self.clicks: List[Dict] = []  # 收到的点击记录
+        self.events: List[Dict] = []  # 其他操作记录（恢复窗口、关闭窗口、启动程序）
+        self.captures = 0
+        self._next_hwnd = 0x10000
+        self._lock = threading.RLock()
+
+    def add_window(self, frames: List[Union[Frame, np.ndarray, str]], class_name: str = "Chrome_WidgetWin_1",
+                   title: str = "直播伴侣", position: Tuple[int, int] = (0, 0), dpi_scale: float = 1.0,
+                   loop: bool = False, transparent: bool = False, process_id: int = 0,
+                   hwnd: Optional[int] = None) -> int:
+        """
+        添加一个回放窗口
+
+        Args:
+            frames: 截图帧列表，元素可以是Frame、BGR数组或PNG文件路径
+            class_name: 窗口类名
+            title: 窗口标题
+            position: 窗口左上角的屏幕坐标
+            dpi_scale: 窗口的DPI缩放比例
+            loop: 播放到最后一帧后是否从头开始
+            transparent: 是否为鼠标穿透的遮罩窗口
+            process_id: 所属进程ID，模拟多个程序实例时为每个实例使用不同的值
+            hwnd: 可选，指定窗口句柄
+
+        Returns:
+            窗口句柄
+        """
+        loaded = [self._to_frame(frame) for frame in frames]
+        if not loaded:
+            raise ValueError("回放窗口至少需要一帧")
+
+        with self._lock:
+            if hwnd is None:
+                hwnd = self._next_hwnd
+                self._next_hwnd += 0x10
+            self.windows[hwnd] = ReplayWindow(hwnd, loaded, class_name, title, position, dpi_scale, loop,
+                                              transparent, process_id)
+        return hwnd
+
+    def add_window_from_directory(self, directory: str, **kwargs) -> int:
+        """把目录中的PNG文件按文件名顺序作为一个窗口的帧序列"""
+        paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                 if name.lower().endswith('.png')]
+        return self.add_window(paths, **kwargs)
+
+    def add_composite_window(self, img_tmp_dir: str, screens: List[List[str]], size: Tuple[int, int] = (1280, 800),
+                             scale: float = 1.0, seed: int = 0, **kwargs) -> int:
+        """
+        用模板合成帧序列并添加为一个窗口
+
+        每个模板在所有帧中位置固定，背景相同，模拟界面在不同状态之间切换
+
+        Args:
+            img_tmp_dir: 模板目录
+            screens: 每一帧中需要显示的模板文件名列表
+            size: 窗口物理像素尺寸 (宽度, 高度)
+            scale: DPI缩放比例
+            seed: 随机种子
+
+        Returns:
+            窗口句柄
+        """
+        names = sorted({name for screen in screens for name in screen})
+        templates = {name: scale_template(template, scale)
+                     for name, template in load_templates(img_tmp_dir, names).items()}
+        placements = random_placements(templates, size, seed)
+        background = make_background(size, seed)
+
+        frames = []
+        for screen in screens:
+            frame = background.copy()
+            for name in screen:
+                if name not in placements:
+                    continue
+                x, y = placements[name]
+                template = templates[name]
+                frame[y:y + template.shape[0], x:x + template.shape[1]] = template
+            frames.append(frame)
+
+        kwargs.setdefault('dpi_scale', scale)
+        return self.add_window(frames, **kwargs)
+
+    def advance(self, hwnd: int, steps: int = 1):
+        """手动切换窗口到后面的帧"""
+        with self._lock:
+            self.windows[hwnd].advance(steps)
+
+    def find_windows(self, class_name: str, window_name: str) -> List[int]:
+        with self._lock:
+            return [hwnd for hwnd, window in self.windows.items()
+                    if not window.closed and (window.class_name, window.title) == (class_name, window_name)]
+
+    def capture(self, hwnd: int) -> Optional[Frame]:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            if window is None or window.closed:
+                return None
+            self.captures += 1
+            # 每次截图返回新的Frame对象，与真实截图一样不共享转换缓存
+            frame = Frame(window.frame.data)
+            if self.advance_mode == 'capture':
+                window.advance()
+            return frame
+
+    def get_window_rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        with self._lock:
+            window = self.windows[hwnd]
+            left, top = window.position
+            width, height = window.frame.size
+            return left, top, left + width, top + height
+
+    def screen_to_client(self, hwnd: int, point: Tuple[int, int]) -> Tuple[int, int]:
+        with self._lock:
+            left, top = self.windows[hwnd].position
+        return point[0] - left, point[1] - top
+
+    def get_dpi_scale(self, hwnd: int) -> float:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            return window.dpi_scale if window else 1.0
+
+    def get_window_info(self, hwnd: int) -> Dict:
+        with self._lock:
+            window = self.windows[hwnd]
+            return {'title': window.title, 'class_name': window.class_name}
+
+    def is_window(self, hwnd: int) -> bool:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            return window is not None and not window.closed
+
+    def is_minimized(self, hwnd: int) -> bool:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            return bool(window and window.minimized)
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            return window.process_id if window else 0
+
+    def is_transparent(self, hwnd: int) -> bool:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            return bool(window and window.transparent)
+
+    def get_capture_stats(self) -> Dict:
+        return {'captures': self.captures, 'clicks': len(self.clicks)}
+
+    def click(self, hwnd: int, x: int, y: int, button: str = 'left', click_type: str = 'single') -> bool:
+        with self._lock:
+            window = self.windows.get(hwnd)
+            if window is None or window.closed:
+                return False
+            self.clicks.append({
+                'hwnd': hwnd,
+                'position': (x, y),
+                'button': button,
+                'click_type': click_type,
+                'frame_index': window.index,
+                'time': time.monotonic()
+            })
+            if self.advance_mode == 'click':
+                window.advance()
+            return True
+
+    def restore_window(self, hwnd: int):
+        with self._lock:
+            self.windows[hwnd].minimized = False
+            self.events.append({'event': 'restore', 'hwnd': hwnd, 'time': time.monotonic()})
+
+    def close_window(self, hwnd: int):
+        with self._lock:
+            self.windows[hwnd].closed = True
+            self.events.append({'event': 'close', 'hwnd': hwnd, 'time': time.monotonic()})
+
+    def start_program(self, launcher_path: str) -> bool:
+        with self._lock:
+            self.events.append({'event': 'start_program', 'path': launcher_path, 'time': time.monotonic()})
+        return False
+
+    @staticmethod
+    def _to_frame(frame: Union[Frame, np.ndarray, str]) -> Frame:
+        """把Frame、BGR数组或PNG文件路径统一转换为Frame"""
+        if isinstance(frame, Frame):
+            return frame
+        if isinstance(frame, np.ndarray):
+            return Frame.from_bgr(frame)
+        # 使用imdecode读取，支持中文路径
+        image = cv2.imdecode(np.fromfile(frame, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"无法加载回放帧: {frame}")
+        return Frame.from_bgr(image)
+
+
+# 使用示例：在Linux上无界面地运行开始直播流程
+if __name__ == "__main__":
+    from src.application_operation import WindowController
+    from src.live_flows import start_live
+
+    backend = ReplayBackend(advance='click')
+    backend.add_composite_window("img_tmp", [
+        ["main_start_live.png"],  # 未开播，点击开始直播
+        ["sec_no_sound_reminder.png"],  # 弹出无声音提醒
+        ["main_stop_live.png"],  # 已开播
+    ])
+
+    controller = WindowController(frame_source=backend)
+    controller.set_img_tmp_dir("img_tmp")
+
+    start_time = time.time()
+    start_live(controller)
+    print(f"开始直播流程完成，耗时 {time.time() - start_time:.3f} 秒")
+    for click in backend.clicks:
+        print(f"点击: 帧{click['frame_index']} {click['position']}")
+    controller.close()
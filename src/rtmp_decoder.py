@@ -0,0 +1,744 @@
+"""
+RTMP/AMF0 解码器
+
+直接读取pcap/pcapng捕获文件（或管道中的pcapng数据流），重组TCP流，解析RTMP分块流，
+解码AMF0命令消息（connect、releaseStream、FCPublish、publish），不依赖tshark
+
+用法（在项目根目录下运行）:
+    python -m src.rtmp_decoder capture.pcapng
+"""
+import socket
+import struct
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, List, NamedTuple, Iterator, BinaryIO, Any
+
+from src.stream_info import StreamRecord
+
+# 链路层类型
+LINKTYPE_NULL = 0  # BSD回环（Windows的NPF_Loopback）
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+
+# pcap文件头魔数 -> (字节序, 时间戳精度)
+PCAP_MAGICS = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+PCAPNG_SECTION_HEADER = b'\x0a\x0d\x0d\x0a'
+
+# 需要解码的RTMP消息类型
+MSG_SET_CHUNK_SIZE = 1
+MSG_ABORT = 2
+MSG_AMF3_COMMAND = 17
+MSG_AMF0_COMMAND = 20
+_DECODED_TYPES = (MSG_SET_CHUNK_SIZE, MSG_ABORT, MSG_AMF3_COMMAND, MSG_AMF0_COMMAND)
+
+HANDSHAKE_SIZE = 1 + 1536 + 1536  # C0+C1+C2（服务器方向为S0+S1+S2）
+MAX_MESSAGE_LENGTH = 16 * 1024 * 1024
+
+# 推流相关的命令
+STREAM_COMMANDS = ('connect', 'releaseStream', 'FCPublish', 'publish')
+
+
+class Packet(NamedTuple):
+    """捕获文件中的一个数据包"""
+    frame_number: int  # 帧编号，从1开始，与tshark的frame.number一致
+    timestamp: float  # 捕获时间（Unix时间戳）
+    linktype: int  # 链路层类型
+    data: bytes  # 链路层数据
+
+
+class CaptureStats(NamedTuple):
+    """pcapng接口统计块（ISB）中的计数"""
+    interface_id: int
+    received: Optional[int]  # isb_ifrecv：接口收到的包数
+    dropped: Optional[int]  # isb_ifdrop：接口（内核）丢弃的包数
+
+
+class RtmpCommand(NamedTuple):
+    """一条解码后的RTMP命令消息"""
+    frame_number: int  # 消息最后一个分块所在的帧编号
+    timestamp: float
+    src: str
+    sport: int
+    dst: str
+    dport: int
+    name: str  # 命令名
+    transaction_id: Optional[float]
+    command_object: Any  # 命令对象，connect时为包含app、tcUrl等的字典
+    arguments: List[Any]  # 其余参数
+    strings: List[str]  # 消息中的全部AMF字符串（包括属性名），顺序与tshark的amf.string字段相同
+    server: Optional[str]  # 同一连接上connect命令中的服务器地址（tcUrl）
+
+    @property
+    def stream_code(self) -> Optional[str]:
+        """connect为应用名，releaseStream/FCPublish/publish为推流码"""
+        if self.name == 'connect':
+            return self.command_object.get('app') if isinstance(self.command_object, dict) else None
+        for argument in self.arguments:
+            if isinstance(argument, str):
+                return argument
+        return None
+
+    @property
+    def info(self) -> str:
+        """与tshark信息列相同的格式，如 publish('stream-key')"""
+        stream_code = self.stream_code
+        return f"{self.name}('{stream_code}')" if stream_code is not None else f"{self.name}()"
+
+
+def read_packets(stream: BinaryIO, stats: Optional[List[CaptureStats]] = None) -> Iterator[Packet]:
+    """
+    从pcap或pcapng数据流中逐个读取数据包（可以是文件，也可以是dumpcap的输出管道）
+
+    参数:
+        stream: 二进制数据流
+        stats: 可选，pcapng接口统计块（ISB）追加到该列表
+
+    返回:
+        数据包迭代器
+    """
+    magic = _read_exact(stream, 4)
+    if magic is None:
+        return
+    if magic == PCAPNG_SECTION_HEADER:
+        yield from _read_pcapng(stream, magic, stats)
+    elif magic in PCAP_MAGICS:
+        yield from _read_pcap(stream, magic)
+    else:
+        raise ValueError(f"不支持的捕获文件格式: {magic.hex()}")
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    """读取size字节，数据流结束时返回None"""
+    data = stream.read(size)
+    while data and len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data if len(data) == size else None
+
+
+def _read_pcap(stream: BinaryIO, magic: bytes) -> Iterator[Packet]:
+    endian, resolution = PCAP_MAGICS[magic]
+    header = _read_exact(stream, 20)
+    if header is None:
+        return
+    linktype = struct.unpack(endian + 'HHiIII', header)[5] & 0x0FFFFFFF
+    record_header = struct.Struct(endian + 'IIII')
+    frame_number = 0
+    while True:
+        header = _read_exact(stream, 16)
+        if header is None:
+            return
+        seconds, fraction, captured_length, _ = record_header.unpack(header)
+        data = _read_exact(stream, captured_length)
+        if data is None:
+            return
+        frame_number += 1
+        yield Packet(frame_number, seconds + fraction * resolution, linktype, data)
+
+
+def _read_pcapng(stream: BinaryIO, magic: bytes, stats: Optional[List[CaptureStats]]) -> Iterator[Packet]:
+    endian = '<'
+    interfaces: List[Tuple[int, float]] = []  # 接口序号 -> (链路层类型, 时间戳精度)
+    frame_number = 0
+    block_type_bytes = magic
+    while True:
+        length_bytes = _read_exact(stream, 4)
+        if length_bytes is None:
+            return
+        if block_type_bytes == PCAPNG_SECTION_HEADER:
+            # 节头块：根据字节序魔数确定本节的字节序，接口列表重新开始
+            byte_order = _read_exact(stream, 4)
+            if byte_order is None:
+                return
+            endian = '<' if byte_order == b'\x4d\x3c\x2b\x1a' else '>'
+            total_length = struct.unpack(endian + 'I', length_bytes)[0]
+            if _read_exact(stream, total_length - 12) is None:
+                return
+            interfaces = []
+        else:
+            block_type = struct.unpack(endian + 'I', block_type_bytes)[0]
+            total_length = struct.unpack(endian + 'I', length_bytes)[0]
+            if total_length < 12:
+                raise ValueError(f"pcapng块长度错误: {total_length}")
+            body = _read_exact(stream, total_length - 8)
+            if body is None:
+                return
+            body = body[:-4]  # 去掉末尾重复的块长度
+
+            if block_type == 1:  # 接口描述块
+                linktype = struct.unpack(endian + 'H', body[:2])[0]
+                interfaces.append((linktype, _interface_resolution(body[8:], endian)))
+            elif block_type == 6:  # 增强数据包块
+                interface_id, high, low, captured_length = struct.unpack(endian + 'IIII', body[:16])
+                linktype, resolution = interfaces[interface_id] if interface_id < len(interfaces) \
+                    else (LINKTYPE_ETHERNET, 1e-6)
+                frame_number += 1
+                yield Packet(frame_number, ((high << 32) | low) * resolution, linktype,
+                             body[20:20 + captured_length])
+            elif block_type == 3:  # 简单数据包块
+                linktype = interfaces[0][0] if interfaces else LINKTYPE_ETHERNET
+                frame_number += 1
+                yield Packet(frame_number, 0.0, linktype, body[4:])
+            elif block_type == 2:  # 旧版数据包块
+                interface_id, _, high, low, captured_length = struct.unpack(endian + 'HHIII', body[:16])
+                linktype, resolution = interfaces[interface_id] if interface_id < len(interfaces) \
+                    else (LINKTYPE_ETHERNET, 1e-6)
+                frame_number += 1
+                yield Packet(frame_number, ((high << 32) | low) * resolution, linktype,
+                             body[20:20 + captured_length])
+            elif block_type == 5 and stats is not None:  # 接口统计块
+                interface_id = struct.unpack(endian + 'I', body[:4])[0]
+                options = _parse_options(body[12:], endian)
+                received = options.get(4)
+                dropped = options.get(5)
+                stats.append(CaptureStats(
+                    interface_id,
+                    struct.unpack(endian + 'Q', received)[0] if received and len(received) == 8 else None,
+                    struct.unpack(endian + 'Q', dropped)[0] if dropped and len(dropped) == 8 else None))
+
+        block_type_bytes = _read_exact(stream, 4)
+        if block_type_bytes is None:
+            return
+
+
+def _parse_options(data: bytes, endian: str) -> Dict[int, bytes]:
+    """解析pcapng块的选项 {选项代码: 值}"""
+    options = {}
+    position = 0
+    while position + 4 <= len(data):
+        code, length = struct.unpack(endian + 'HH', data[position:position + 4])
+        if code == 0:
+            break
+        options[code] = data[position + 4:position + 4 + length]
+        position += 4 + (length + 3) // 4 * 4
+    return options
+
+
+def _interface_resolution(options_data: bytes, endian: str) -> float:
+    """接口的时间戳精度（if_tsresol选项），默认微秒"""
+    value = _parse_options(options_data, endian).get(9)
+    if not value:
+        return 1e-6
+    exponent = value[0] & 0x7F
+    return 2.0 ** -exponent if value[0] & 0x80 else 10.0 ** -exponent
+
+
+def parse_tcp(linktype: int, data: bytes) -> Optional[Tuple[str, int, str, int, int, int, bytes]]:
+    """
+    解析链路层数据中的TCP段
+
+    返回:
+        (源地址, 源端口, 目的地址, 目的端口, 序号, 标志位, 负载)，不是TCP时返回None
+    """
+    try:
+        if linktype == LINKTYPE_ETHERNET:
+            ethertype = (data[12] << 8) | data[13]
+            offset = 14
+            while ethertype in (0x8100, 0x88A8):  # VLAN标签
+                ethertype = (data[offset + 2] << 8) | data[offset + 3]
+                offset += 4
+            version = 4 if ethertype == 0x0800 else 6 if ethertype == 0x86DD else 0
+        elif linktype == LINKTYPE_LINUX_SLL:
+            ethertype = (data[14] << 8) | data[15]
+            offset = 16
+            version = 4 if ethertype == 0x0800 else 6 if ethertype == 0x86DD else 0
+        elif linktype in (LINKTYPE_NULL, LINKTYPE_LOOP):
+            offset = 4
+            version = data[4] >> 4
+        elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+            offset = 0
+            version = data[0] >> 4
+        else:
+            return None
+
+        if version == 4:
+            header_length = (data[offset] & 0x0F) * 4
+            if data[offset + 9] != 6:
+                return None
+            if ((data[offset + 6] & 0x3F) << 8) | data[offset + 7] or data[offset + 6] & 0x20:
+                return None  # IP分片
+            total_length = (data[offset + 2] << 8) | data[offset + 3]
+            src = socket.inet_ntoa(data[offset + 12:offset + 16])
+            dst = socket.inet_ntoa(data[offset + 16:offset + 20])
+            end = offset + total_length if total_length else len(data)  # 网卡分段卸载时总长度可能为0
+            offset += header_length
+        elif version == 6:
+            next_header = data[offset + 6]
+            end = offset + 40 + ((data[offset + 4] << 8) | data[offset + 5])
+            src = socket.inet_ntop(socket.AF_INET6, data[offset + 8:offset + 24])
+            dst = socket.inet_ntop(socket.AF_INET6, data[offset + 24:offset + 40])
+            offset += 40
+            while next_header in (0, 43, 60):  # 逐跳选项、路由、目的选项扩展头
+                next_header = data[offset]
+                offset += (data[offset + 1] + 1) * 8
+            if next_header != 6:
+                return None
+        else:
+            return None
+
+        sport, dport, seq = struct.unpack_from('!HHI', data, offset)
+        data_offset = (data[offset + 12] >> 4) * 4
+        flags = data[offset + 13]
+        return src, sport, dst, dport, seq, flags, data[offset + data_offset:end]
+    except (IndexError, struct.error, OSError, ValueError):
+        return None
+
+
+class _Amf0Reader:
+    """AMF0解码，同时按顺序收集全部字符串（包括对象属性名）"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+        self.strings: List[str] = []
+        self.references: List[Any] = []
+
+    def read_all(self) -> List[Any]:
+        values = []
+        while self.position < len(self.data):
+            values.append(self.read_value())
+        return values
+
+    def read_value(self) -> Any:
+        marker = self.data[self.position]
+        self.position += 1
+        if marker == 0x00:  # number
+            value = struct.unpack_from('>d', self.data, self.position)[0]
+            self.position += 8
+            return value
+        if marker == 0x01:  # boolean
+            self.position += 1
+            return self.data[self.position - 1] != 0
+        if marker == 0x02:  # string
+            return self._read_string(2)
+        if marker == 0x0C:  # long string
+            return self._read_string(4)
+        if marker in (0x03, 0x08, 0x10):  # object / ECMA array / typed object
+            if marker == 0x08:
+                self.position += 4  # 元素数量（不可靠，以对象结束标记为准）
+            elif marker == 0x10:
+                self._read_string(2)  # 类名
+            value: Dict[str, Any] = {}
+            self.references.append(value)
+            while True:
+                key = self._read_string(2, collect=False)
+                if key == '' and self.data[self.position] == 0x09:
+                    self.position += 1
+                    return value
+                self.strings.append(key)
+                value[key] = self.read_value()
+        if marker == 0x0A:  # strict array
+            count = struct.unpack_from('>I', self.data, self.position)[0]
+            self.position += 4
+            value = []
+            self.references.append(value)
+            for _ in range(count):
+                value.append(self.read_value())
+            return value
+        if marker == 0x0B:  # date
+            value = struct.unpack_from('>d', self.data, self.position)[0]
+            self.position += 10
+            return value
+        if marker == 0x07:  # reference
+            index = struct.unpack_from('>H', self.data, self.position)[0]
+            self.position += 2
+            return self.references[index] if index < len(self.references) else None
+        if marker == 0x0F:  # XML document
+            return self._read_string(4, collect=False)
+        if marker in (0x05, 0x06, 0x0D):  # null / undefined / unsupported
+            return None
+        raise ValueError(f"不支持的AMF0类型: {marker:#x}")
+
+    def _read_string(self, length_size: int, collect: bool = True) -> str:
+        length = int.from_bytes(self.data[self.position:self.position + length_size], 'big')
+        self.position += length_size
+        value = self.data[self.position:self.position + length].decode('utf-8', errors='replace')
+        self.position += length
+        if collect:
+            self.strings.append(value)
+        return value
+
+
+def decode_amf0(data: bytes) -> Tuple[List[Any], List[str]]:
+    """
+    解码AMF0数据
+
+    返回:
+        (值列表, 全部字符串列表)
+    """
+    reader = _Amf0Reader(data)
+    return reader.read_all(), reader.strings
+
+
+class RtmpChunkParser:
+    """单个方向的RTMP字节流解析：跳过握手，按分块流重组消息，只保留命令和控制消息的负载"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.handshake_remaining: Optional[int] = None  # None表示还没有收到数据
+        self.chunk_size = 128
+        self.streams: Dict[int, Dict] = {}  # 分块流ID -> 消息头状态
+        self.failed = False  # 数据流无法解析（捕获从连接中间开始或数据丢失）
+
+    def feed(self, data: bytes) -> List[Tuple[int, int, bytes]]:
+        """
+        输入按顺序重组后的TCP负载
+
+        返回:
+            本次完成的消息 [(消息类型, 消息流ID, 负载), ...]，只包含命令和控制消息
+        """
+        if self.failed or not data:
+            return []
+        if self.handshake_remaining is None:
+            if data[0] != 0x03:  # C0/S0 版本号
+                self.failed = True
+                return []
+            self.handshake_remaining = HANDSHAKE_SIZE
+        if self.handshake_remaining:
+            skipped = min(self.handshake_remaining, len(data))
+            self.handshake_remaining -= skipped
+            data = data[skipped:]
+            if not data:
+                return []
+
+        self.buffer += data
+        try:
+            return self._parse_chunks()
+        except (IndexError, ValueError):
+            self.failed = True
+            return []
+
+    def _parse_chunks(self) -> List[Tuple[int, int, bytes]]:
+        buffer = self.buffer
+        messages = []
+        position = 0
+        size = len(buffer)
+        while position < size:
+            first = buffer[position]
+            fmt = first >> 6
+            csid = first & 0x3F
+            header_length = 1
+            if csid == 0:
+                if position + 2 > size:
+                    break
+                csid = buffer[position + 1] + 64
+                header_length = 2
+            elif csid == 1:
+                if position + 3 > size:
+                    break
+                csid = buffer[position + 1] + buffer[position + 2] * 256 + 64
+                header_length = 3
+
+            state = self.streams.get(csid)
+            if state is None:
+                if fmt != 0:
+                    raise ValueError("分块流以非完整消息头开始")
+                state = self.streams[csid] = {'length': 0, 'type': 0, 'stream_id': 0, 'extended': False,
+                                              'remaining': 0, 'payload': None}
+
+            start = position + header_length
+            message_header_length = (11, 7, 3, 0)[fmt]
+            if start + message_header_length > size:
+                break
+            extended = state['extended']
+            length, message_type, stream_id = state['length'], state['type'], state['stream_id']
+            if fmt < 3:
+                extended = buffer[start:start + 3] == b'\xff\xff\xff'
+                if fmt < 2:
+                    length = int.from_bytes(buffer[start + 3:start + 6], 'big')
+                    message_type = buffer[start + 6]
+                    if fmt == 0:
+                        stream_id = int.from_bytes(buffer[start + 7:start + 11], 'little')
+            header_end = start + message_header_length + (4 if extended else 0)
+
+            remaining = state['remaining']
+            if remaining == 0:
+                if length > MAX_MESSAGE_LENGTH:
+                    raise ValueError(f"消息长度错误: {length}")
+                remaining = length
+            chunk_length = min(self.chunk_size, remaining)
+            if header_end + chunk_length > size:
+                break
+
+            # 头部完整，更新分块流状态
+            if state['remaining'] == 0:
+                state['payload'] = bytearray() if message_type in _DECODED_TYPES else None
+            state.update(length=length, type=message_type, stream_id=stream_id, extended=extended)
+            if state['payload'] is not None:
+                state['payload'] += buffer[header_end:header_end + chunk_length]
+            remaining -= chunk_length
+            state['remaining'] = remaining
+            position = header_end + chunk_length
+
+            if remaining == 0 and state['payload'] is not None:
+                payload = bytes(state['payload'])
+                state['payload'] = None
+                if message_type == MSG_SET_CHUNK_SIZE and len(payload) >= 4:
+                    self.chunk_size = max(1, struct.unpack('>I', payload[:4])[0] & 0x7FFFFFFF)
+                elif message_type == MSG_ABORT and len(payload) >= 4:
+                    aborted = self.streams.get(struct.unpack('>I', payload[:4])[0])
+                    if aborted is not None:
+                        aborted.update(remaining=0, payload=None)
+                else:
+                    messages.append((message_type, stream_id, payload))
+
+        del buffer[:position]
+        return messages
+
+
+class RtmpDecoder:
+    """
+    从数据包中解码RTMP推流命令
+
+    按连接和方向重组TCP流（处理乱序和重传），每个方向一个分块流解析器；
+    默认在连接的publish命令解码后停止解析该连接，后续的音视频数据只做连接查找就被丢弃
+    """
+
+    def __init__(self, commands: Tuple[str, ...] = STREAM_COMMANDS, stop_after_publish: bool = True,
+                 max_pending: int = 1024 * 1024, idle_timeout: float = 300.0, max_flows: int = 4096):
+        """
+        初始化解码器
+
+        参数:
+            commands: 需要返回的命令名
+            stop_after_publish: publish之后是否停止解析该连接
+            max_pending: 每个方向等待缺失数据时最多缓存的乱序字节数，超过后放弃该方向（数据已丢失）
+            idle_timeout: 方向超过该时间（按数据包时间戳，秒）没有数据包时释放其状态，处理没有FIN的连接
+            max_flows: 最多保留的方向数，超过后释放最久没有数据包的方向
+        """
+        self.commands = commands
+        self.stop_after_publish = stop_after_publish
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self.max_flows = max_flows
+        # 方向 -> 重组状态，None表示已停止；按最近一次收到数据包的顺序排列，最久未活动的在前
+        self._flows: 'OrderedDict[Tuple[str, int, str, int], Optional[Dict]]' = OrderedDict()
+        self._last_seen: Dict[Tuple[str, int, str, int], float] = {}  # 方向 -> 最近一次数据包的时间戳
+        self._servers: Dict[Tuple, str] = {}  # 连接 -> connect命令中的服务器地址
+        self.packets = 0
+        self.tcp_packets = 0
+        self.payload_bytes = 0
+        self.desynchronized = 0  # 因数据丢失或无法解析而放弃的方向数
+        self.non_rtmp = 0  # 不是以RTMP握手开始的方向数（其他协议或捕获开始前已建立的连接）
+        self.finished = 0  # publish后停止解析的连接数
+        self.expired = 0  # 因空闲超时或数量上限释放的方向数
+        self.decoded_commands = 0
+
+    def feed_packet(self, packet: Packet) -> List[RtmpCommand]:
+        """
+        输入一个数据包
+
+        返回:
+            该数据包中完成解码的命令
+        """
+        self.packets += 1
+        tcp = parse_tcp(packet.linktype, packet.data)
+        if tcp is None:
+            return []
+        self.tcp_packets += 1
+        src, sport, dst, dport, seq, flags, payload = tcp
+        key = (src, sport, dst, dport)
+        self._expire(packet.timestamp)
+        flow = self._flows.get(key, False)
+
+        if flags & 0x05:  # FIN/RST：连接结束，释放状态（包括已停止解析的方向）
+            commands = self._deliver(flow, key, seq, payload, packet) if flow and payload else []
+            self._release(key)
+            self._servers.pop(_connection(key), None)
+            return commands
+
+        if flow is False:
+            flow = self._flows[key] = {'next_seq': None, 'pending': {}, 'pending_bytes': 0,
+                                       'parser': RtmpChunkParser()}
+        else:
+            self._flows.move_to_end(key)
+        self._last_seen[key] = packet.timestamp
+        if flow is None:
+            return []  # 已停止解析的方向
+        if flags & 0x02:  # SYN
+            flow['next_seq'] = (seq + 1) & 0xFFFFFFFF
+            return []
+        if not payload:
+            return []
+        return self._deliver(flow, key, seq, payload, packet)
+
+    def decode(self, stream: BinaryIO) -> Iterator[RtmpCommand]:
+        """解码pcap/pcapng数据流中的全部命令"""
+        for packet in read_packets(stream):
+            yield from self.feed_packet(packet)
+
+    @staticmethod
+    def records(commands: List[RtmpCommand]) -> List[StreamRecord]:
+        """把命令转换为与StreamInfoExtractor相同的推流命令记录"""
+        return [StreamRecord(command.name, command.stream_code, command.server, command.frame_number)
+                for command in commands]
+
+    def get_stats(self) -> Dict:
+        """获取解码统计信息"""
+        return {
+            'packets': self.packets,
+            'tcp_packets': self.tcp_packets,
+            'payload_bytes': self.payload_bytes,
+            'flows': sum(1 for flow in self._flows.values() if flow is not None),
+            'tracked': len(self._flows),
+            'finished': self.finished,
+            'expired': self.expired,
+            'desynchronized': self.desynchronized,
+            'non_rtmp': self.non_rtmp,
+            'commands': self.decoded_commands
+        }
+
+    def _deliver(self, flow: Dict, key: Tuple, seq: int, payload: bytes, packet: Packet) -> List[RtmpCommand]:
+        """按序号把TCP负载交给分块流解析器，乱序的数据先缓存"""
+        self.payload_bytes += len(payload)
+        next_seq = flow['next_seq']
+        if next_seq is None:
+            next_seq = seq
+        offset = (seq - next_seq) & 0xFFFFFFFF
+        if offset >= 0x80000000:  # 重传或重叠：去掉已收到的部分
+            overlap = (next_seq - seq) & 0xFFFFFFFF
+            if overlap >= len(payload):
+                return []
+            payload = payload[overlap:]
+        elif offset:  # 中间有数据缺失，先缓存
+            if seq not in flow['pending']:
+                flow['pending'][seq] = payload
+                flow['pending_bytes'] += len(payload)
+                if flow['pending_bytes'] > self.max_pending:
+                    self._stop(key, desynchronized=True)
+            return []
+
+        parser = flow['parser']
+        messages = parser.feed(payload)
+        next_seq = (next_seq + len(payload)) & 0xFFFFFFFF
+        pending = flow['pending']
+        while pending:
+            # 取出已经可以接上的缓存数据
+            ready = [pending_seq for pending_seq in pending
+                     if (pending_seq - next_seq) & 0xFFFFFFFF == 0
+                     or (pending_seq - next_seq) & 0xFFFFFFFF >= 0x80000000]
+            if not ready:
+                break
+            for pending_seq in ready:
+                data = pending.pop(pending_seq)
+                flow['pending_bytes'] -= len(data)
+                overlap = (next_seq - pending_seq) & 0xFFFFFFFF
+                if overlap < len(data):
+                    messages.extend(parser.feed(data[overlap:]))
+                    next_seq = (next_seq + len(data) - overlap) & 0xFFFFFFFF
+        flow['next_seq'] = next_seq
+
+        if parser.failed:
+            if parser.handshake_remaining is None:
+                self.non_rtmp += 1
+                self._stop(key)
+            else:
+                self._stop(key, desynchronized=True)
+        return self._commands(messages, key, packet)
+
+    def _commands(self, messages: List[Tuple[int, int, bytes]], key: Tuple, packet: Packet) -> List[RtmpCommand]:
+        """解码命令消息"""
+        commands = []
+        for message_type, _, payload in messages:
+            if message_type == MSG_AMF3_COMMAND:
+                payload = payload[1:]  # AMF3命令消息的第一个字节为0，其后按AMF0编码
+            elif message_type != MSG_AMF0_COMMAND:
+                continue
+            try:
+                values, strings = decode_amf0(payload)
+            except (IndexError, ValueError, struct.error):
+                continue
+            if not values or not isinstance(values[0], str):
+                continue
+            name = values[0]
+            if name not in self.commands:
+                continue
+            command_object = values[2] if len(values) > 2 else None
+            connection = _connection(key)
+            if name == 'connect' and isinstance(command_object, dict):
+                server = command_object.get('tcUrl') or command_object.get('swfUrl')
+                if server:
+                    self._servers[connection] = server
+            command = RtmpCommand(packet.frame_number, packet.timestamp, key[0], key[1], key[2], key[3], name,
+                                  values[1] if len(values) > 1 else None, command_object, values[3:], strings,
+                                  self._servers.get(connection))
+            commands.append(command)
+            self.decoded_commands += 1
+            if name == 'publish' and self.stop_after_publish:
+                self._stop(key)
+                self.finished += 1
+        return commands
+
+    def _stop(self, key: Tuple, desynchronized: bool = False):
+        """停止解析该方向，之后该方向的数据包直接丢弃，直到FIN/RST或空闲超时释放"""
+        if self._flows.get(key) is not None:
+            self._flows[key] = None
+            if desynchronized:
+                self.desynchronized += 1
+
+    def _release(self, key: Tuple):
+        """释放一个方向的状态"""
+        self._flows.pop(key, None)
+        self._last_seen.pop(key, None)
+
+    def _expire(self, now: float):
+        """释放空闲超时或超出数量上限的方向（从最久未活动的开始检查）"""
+        while self._flows:
+            key = next(iter(self._flows))
+            idle = now and now - self._last_seen.get(key, now) > self.idle_timeout
+            if not idle and len(self._flows) <= self.max_flows:
+                return
+            self._release(key)
+            self.expired += 1
+            reverse = (key[2], key[3], key[0], key[1])
+            if reverse not in self._flows:
+                self._servers.pop(_connection(key), None)
+
+
+def _connection(key: Tuple[str, int, str, int]) -> Tuple:
+    """与方向无关的连接标识"""
+    return tuple(sorted(((key[0], key[1]), (key[2], key[3]))))
+
+
+def decode_file(path: str) -> List[StreamRecord]:
+    """
+    解码捕获文件中的推流命令
+
+    参数:
+        path: pcap/pcapng文件路径
+
+    返回:
+        推流命令记录列表，与StreamInfoExtractor的记录格式相同
+    """
+    decoder = RtmpDecoder()
+    with open(path, 'rb') as f:
+        return decoder.records(list(decoder.decode(f)))
+
+
+# 使用示例：解码捕获文件并按旧版extract_stream_info的格式输出
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from src.stream_info import StreamInfoExtractor
+
+    if len(sys.argv) < 2:
+        print("用法: python -m src.rtmp_decoder <捕获文件>")
+        sys.exit(1)
+
+    start_time = time.perf_counter()
+    extractor = StreamInfoExtractor()
+    extractor.add_records(decode_file(sys.argv[1]))
+    print(f"解码耗时 {time.perf_counter() - start_time:.3f} 秒")
+    for stream_info in extractor.get_results():
+        print(stream_info['command'], stream_info['stream_code'], stream_info['server'])
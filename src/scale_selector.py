@@ -0,0 +1,117 @@
+import threading
+from typing import Tuple, Dict, List
+
+# 常见的Windows显示缩放比例
+DEFAULT_SCALES = (1.0, 1.25, 1.5, 1.75, 2.0)
+
+
+class ScaleSelector:
+    """
+    多尺度匹配的缩放比例选择
+
+    窗口报告的DPI缩放比例不准确时（如通过边框宽度估算），所有模板都会匹配失败。
+    每个窗口连续多次全部未匹配后，在几个候选缩放比例中搜索一次（先粗略排序，只完整匹配最可能的几个），
+    并锁定匹配最好的比例；
+    搜索没有结果时（画面中本来就没有要找的模板）加倍下次搜索前的未匹配次数，避免反复搜索
+    """
+
+    def __init__(self, scales: Tuple[float, ...] = DEFAULT_SCALES, miss_threshold: int = 3,
+                 max_miss_threshold: int = 48, evaluate_top: int = 2):
+        """
+        初始化缩放比例选择
+
+        Args:
+            scales: 候选缩放比例
+            miss_threshold: 连续全部未匹配多少次后搜索缩放比例
+            max_miss_threshold: 搜索失败后未匹配次数阈值加倍的上限
+            evaluate_top: 粗略排序后完整匹配的候选比例数量
+        """
+        self.scales = tuple(scales)
+        self.miss_threshold = miss_threshold
+        self.max_miss_threshold = max_miss_threshold
+        self.evaluate_top = evaluate_top
+        self._windows: Dict[int, Dict] = {}  # 窗口句柄 -> {'scale', 'misses', 'threshold'}
+        self._lock = threading.Lock()
+        self.searches = 0  # 搜索次数
+        self.failed_searches = 0  # 没有找到任何匹配的搜索次数
+        self.scale_changes = 0  # 锁定的缩放比例与之前不同的次数
+
+    def get_scale(self, hwnd: int, reported: float) -> float:
+        """
+        获取窗口的匹配缩放比例
+
+        Args:
+            hwnd: 窗口句柄
+            reported: 窗口报告的DPI缩放比例
+
+        Returns:
+            已锁定的缩放比例，没有锁定时为reported
+        """
+        with self._lock:
+            window = self._windows.get(hwnd)
+            return window['scale'] if window and window['scale'] is not None else reported
+
+    def record(self, hwnd: int, hit: bool) -> bool:
+        """
+        记录一轮匹配的结果
+
+        Args:
+            hwnd: 窗口句柄
+            hit: 本轮是否有模板匹配成功
+
+        Returns:
+            是否需要搜索缩放比例
+        """
+        with self._lock:
+            window = self._get(hwnd)
+            if hit:
+                window['misses'] = 0
+                window['threshold'] = self.miss_threshold
+                return False
+            window['misses'] += 1
+            return window['misses'] >= window['threshold']
+
+    def candidates(self, current: float) -> List[float]:
+        """按与当前缩放比例的差距排序的候选缩放比例（不含当前比例）"""
+        return sorted((scale for scale in self.scales if abs(scale - current) > 0.05),
+                      key=lambda scale: abs(scale - current))
+
+    def lock(self, hwnd: int, scale: float):
+        """锁定窗口的匹配缩放比例"""
+        with self._lock:
+            window = self._get(hwnd)
+            self.searches += 1
+            if window['scale'] is None or abs(window['scale'] - scale) > 0.05:
+                self.scale_changes += 1
+            window.update({'scale': scale, 'misses': 0, 'threshold': self.miss_threshold})
+
+    def search_failed(self, hwnd: int):
+        """搜索没有找到匹配，保持原比例并推迟下次搜索"""
+        with self._lock:
+            window = self._get(hwnd)
+            self.searches += 1
+            self.failed_searches += 1
+            window['misses'] = 0
+            window['threshold'] = min(window['threshold'] * 2, self.max_miss_threshold)
+
+    def forget(self, hwnd: int):
+        """删除窗口的记录（窗口关闭后调用）"""
+        with self._lock:
+            self._windows.pop(hwnd, None)
+
+    def get_stats(self) -> Dict:
+        """获取搜索统计信息和每个窗口锁定的缩放比例"""
+        with self._lock:
+            return {
+                'searches': self.searches,
+                'failed_searches': self.failed_searches,
+                'scale_changes': self.scale_changes,
+                'locked_scales': {hwnd: window['scale'] for hwnd, window in self._windows.items()
+                                  if window['scale'] is not None}
+            }
+
+    def _get(self, hwnd: int) -> Dict:
+        window = self._windows.get(hwnd)
+        if window is None:
+            window = self._windows[hwnd] = {'scale': None, 'misses': 0, 'threshold': self.miss_threshold}
+        return window
@@ -0,0 +1,140 @@
+import threading
+import time
+from typing import Dict, Hashable, Iterable, Optional
+
+
+class PollScheduler:
+    """
+    自适应轮询调度器
+
+    每个窗口单独调度：执行操作后进入突发模式，在burst_duration内以最短间隔轮询；
+    画面没有变化时轮询间隔按backoff指数增长到max_interval，画面变化后恢复为最短间隔；
+    同时限制每个窗口的CPU占用：轮询耗时 / (轮询耗时 + 间隔) 不超过cpu_cap
+    """
+
+    def __init__(self, min_interval: float = 0.02, max_interval: float = 1.0, backoff: float = 2.0,
+                 burst_duration: float = 1.0, cpu_cap: float = 0.5):
+        """
+        初始化调度器
+
+        Args:
+            min_interval: 最短轮询间隔（秒），用于突发模式和画面刚变化时
+            max_interval: 画面长时间不变时的最长轮询间隔（秒）
+            backoff: 画面没有变化时轮询间隔的放大倍数
+            burst_duration: 执行操作后保持最短间隔轮询的时间（秒）
+            cpu_cap: 每个窗口轮询耗时占用的最大时间比例，范围 (0, 1]
+        """
+        if not 0 < cpu_cap <= 1:
+            raise ValueError(f"cpu_cap必须在(0, 1]之间: {cpu_cap}")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.burst_duration = burst_duration
+        self.cpu_cap = cpu_cap
+        self._windows: Dict[Hashable, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _window(self, key: Hashable) -> Dict:
+        window = self._windows.get(key)
+        if window is None:
+            window = {
+                'interval': self.min_interval,  # 当前空闲间隔
+                'burst_until': 0.0,  # 突发模式结束时间
+                'due': 0.0,  # 下次轮询时间
+                'polls': 0,
+                'idle_polls': 0,
+                'bursts': 0,
+                'busy': 0.0,  # 累计轮询耗时
+                'first_poll': None
+            }
+            self._windows[key] = window
+        return window
+
+    def notify_action(self, key: Hashable):
+        """窗口执行了操作（点击、关闭、恢复），立即进入突发模式"""
+        now = time.monotonic()
+        with self._lock:
+            window = self._window(key)
+            window['bursts'] += 1
+            window['burst_until'] = now + self.burst_duration
+            window['interval'] = self.min_interval
+            window['due'] = min(window['due'], now)
+
+    def is_due(self, key: Hashable) -> bool:
+        """窗口是否到了轮询时间"""
+        with self._lock:
+            return time.monotonic() >= self._window(key)['due']
+
+    def record_poll(self, key: Hashable, busy: float, changed: bool):
+        """
+        记录一次轮询并计算下次轮询时间
+
+        Args:
+            key: 窗口键（通常为窗口句柄）
+            busy: 本次轮询耗时（秒）
+            changed: 画面是否变化
+        """
+        now = time.monotonic()
+        with self._lock:
+            window = self._window(key)
+            window['polls'] += 1
+            window['busy'] += busy
+            if window['first_poll'] is None:
+                window['first_poll'] = now - busy
+
+            if changed:
+                window['interval'] = self.min_interval
+            else:
+                window['idle_polls'] += 1
+                window['interval'] = min(self.max_interval, window['interval'] * self.backoff)
+
+            interval = self.min_interval if now < window['burst_until'] else window['interval']
+            # CPU占用上限：busy / (busy + delay) <= cpu_cap
+            cap_delay = busy * (1.0 / self.cpu_cap - 1.0)
+            window['due'] = now + max(interval, cap_delay)
+
+    def time_until_due(self, keys: Optional[Iterable[Hashable]] = None) -> float:
+        """
+        距离最早需要轮询的窗口还有多久
+
+        Args:
+            keys: 只考虑这些窗口，默认全部窗口
+
+        Returns:
+            秒数，已经到期时为0
+        """
+        now = time.monotonic()
+        with self._lock:
+            keys = list(self._windows) if keys is None else list(keys)
+            if not keys:
+                return 0.0
+            return max(0.0, min(self._window(key)['due'] for key in keys) - now)
+
+    def wait(self, keys: Optional[Iterable[Hashable]] = None) -> float:
+        """休眠到最早需要轮询的窗口到期，返回休眠时间"""
+        delay = self.time_until_due(keys)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def forget(self, key: Hashable):
+        """移除窗口的调度状态（窗口已销毁时调用）"""
+        with self._lock:
+            self._windows.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        """获取每个窗口的轮询统计信息"""
+        now = time.monotonic()
+        with self._lock:
+            stats = {}
+            for key, window in self._windows.items():
+                elapsed = now - window['first_poll'] if window['first_poll'] is not None else 0.0
+                stats[key] = {
+                    'polls': window['polls'],
+                    'idle_polls': window['idle_polls'],
+                    'bursts': window['bursts'],
+                    'interval': window['interval'],
+                    'busy': window['busy'],
+                    'cpu_share': window['busy'] / elapsed if elapsed > 0 else 0.0
+                }
+            return stats
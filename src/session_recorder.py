@@ -0,0 +1,160 @@
+import hashlib
+import json
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, List
+
+import cv2
+import numpy as np
+
+from src.frame import Frame
+
+ARCHIVE_VERSION = 1
+
+
+class SessionRecorder:
+    """
+    会话录制器
+
+    把截图帧、匹配结果、点击和窗口操作写入一个zip会话存档：
+    frames/<哈希>.png 为去重后的截图（内容相同的帧只保存一次，PNG编码在后台线程中进行），
+    events.jsonl 为按时间顺序排列的事件，meta.json 为存档信息
+    """
+
+    def __init__(self, path: str, compression_level: int = 3):
+        """
+        初始化录制器
+
+        Args:
+            path: 存档文件路径（.zip）
+            compression_level: PNG压缩级别 0-9，越大文件越小但编码越慢
+        """
+        self.path = path
+        self.compression_level = compression_level
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)  # PNG已压缩，zip内不再压缩
+        self._zip_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session_recorder")
+        self._events: List[Dict] = []
+        self._frame_hashes = set()
+        self._last_frame: Dict[int, str] = {}  # 窗口句柄 -> 最近一帧的哈希
+        self._windows: Dict[int, Dict] = {}  # 窗口句柄 -> 已记录的窗口信息
+        self.start_time = time.time()
+        self._start = time.monotonic()
+        self.frames = 0  # 记录的帧数
+        self.unique_frames = 0  # 去重后保存的帧数
+        self.closed = False
+
+    def record_window(self, hwnd: int, info: Dict):
+        """
+        记录窗口信息（类名、标题、进程ID、窗口矩形、客户区偏移、DPI），信息变化时才写入事件
+        """
+        with self._lock:
+            if self._windows.get(hwnd) == info:
+                return
+            self._windows[hwnd] = dict(info)
+            self._append({'type': 'window', 'hwnd': hwnd, **info})
+
+    def record_frame(self, hwnd: int, frame: Frame) -> str:
+        """
+        记录一帧截图
+
+        Returns:
+            帧哈希
+        """
+        data = np.ascontiguousarray(frame.data[:, :, :3])
+        frame_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            self.frames += 1
+            self._last_frame[hwnd] = frame_hash
+            if frame_hash not in self._frame_hashes:
+                self._frame_hashes.add(frame_hash)
+                self.unique_frames += 1
+                self._encoder.submit(self._write_frame, frame_hash, data)
+            self._append({'type': 'frame', 'hwnd': hwnd, 'frame': frame_hash, 'size': list(frame.size)})
+        return frame_hash
+
+    def record_match(self, hwnd: int, template_path: str, confidence: float, click_position_ratio: tuple,
+                     result: Optional[Dict]):
+        """记录一次模板匹配的结果（result为None表示未匹配）"""
+        with self._lock:
+            self._append({
+                'type': 'match',
+                'hwnd': hwnd,
+                'frame': self._last_frame.get(hwnd),
+                'template_path': template_path,
+                'confidence': confidence,
+                'click_position_ratio': list(click_position_ratio),
+                'result': _to_json(result) if result else None
+            })
+
+    def record_click(self, hwnd: int, position: Tuple[int, int], button: str, click_type: str,
+                     template_path: Optional[str] = None):
+        """记录一次点击（窗口客户区坐标）"""
+        with self._lock:
+            self._append({'type': 'click', 'hwnd': hwnd, 'frame': self._last_frame.get(hwnd),
+                          'position': list(position), 'button': button, 'click_type': click_type,
+                          'template_path': template_path})
+
+    def record_event(self, event: str, hwnd: Optional[int] = None, **fields):
+        """记录其他窗口操作，如 restore、close"""
+        with self._lock:
+            self._append({'type': event, 'hwnd': hwnd, **_to_json(fields)})
+
+    def get_stats(self) -> Dict:
+        """获取录制统计信息"""
+        with self._lock:
+            return {'frames': self.frames, 'unique_frames': self.unique_frames, 'events': len(self._events)}
+
+    def close(self):
+        """等待帧编码完成，写入事件和存档信息并关闭存档"""
+        if self.closed:
+            return
+        self.closed = True
+        self._encoder.shutdown(wait=True)
+        with self._lock:
+            events = "\n".join(json.dumps(event, ensure_ascii=False) for event in self._events)
+            meta = {
+                'version': ARCHIVE_VERSION,
+                'created': self.start_time,
+                'duration': time.monotonic() - self._start,
+                'frames': self.frames,
+                'unique_frames': self.unique_frames,
+                'events': len(self._events)
+            }
+        with self._zip_lock:
+            self._zip.writestr("events.jsonl", events)
+            self._zip.writestr("meta.json", json.dumps(meta, ensure_ascii=False, indent=2))
+            self._zip.close()
+
+    def __enter__(self) -> 'SessionRecorder':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _append(self, event: Dict):
+        event['t'] = time.monotonic() - self._start
+        self._events.append(event)
+
+    def _write_frame(self, frame_hash: str, data: np.ndarray):
+        """编码PNG并写入存档（后台线程）"""
+        ok, encoded = cv2.imencode(".png", data, [cv2.IMWRITE_PNG_COMPRESSION, self.compression_level])
+        if not ok:
+            print(f"❌ 帧编码失败: {frame_hash}")
+            return
+        with self._zip_lock:
+            self._zip.writestr(f"frames/{frame_hash}.png", encoded.tobytes())
+
+
+def _to_json(value):
+    """把匹配结果中的元组和numpy数值转换为JSON可序列化的类型"""
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
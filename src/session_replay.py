@@ -0,0 +1,290 @@
+"""
+会话存档离线回放：在没有Windows的环境中，用录制的截图重新运行开始/关闭直播的决策逻辑，
+比较不同匹配策略的耗时和决策是否与录制时一致
+
+录制: controller.start_recording("session.zip") 之后正常运行流程，结束时 controller.stop_recording()
+回放（在项目根目录下运行）:
+    python -m src.session_replay session.zip --flow start_live --mode pyramid
+    python -m src.session_replay session.zip --check-matches --mode full
+"""
+import argparse
+import json
+import threading
+import time
+import zipfile
+from typing import Optional, Tuple, Dict, List
+
+import cv2
+import numpy as np
+
+from src.backends import FrameSource, InputSink
+from src.frame import Frame
+
+# 视为相同点击的最大坐标偏差（像素）
+CLICK_TOLERANCE = 5
+
+
+class SessionArchive:
+    """读取SessionRecorder写入的会话存档"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._zip = zipfile.ZipFile(path, "r")
+        self.meta = json.loads(self._zip.read("meta.json"))
+        self.events: List[Dict] = [json.loads(line) for line in
+                                   self._zip.read("events.jsonl").decode("utf-8").splitlines() if line]
+        self._frames: Dict[str, Frame] = {}
+        self._lock = threading.Lock()
+
+    def frame(self, frame_hash: str) -> Frame:
+        """解码帧（同一帧只解码一次）"""
+        with self._lock:
+            frame = self._frames.get(frame_hash)
+            if frame is None:
+                data = np.frombuffer(self._zip.read(f"frames/{frame_hash}.png"), dtype=np.uint8)
+                frame = Frame.from_bgr(cv2.imdecode(data, cv2.IMREAD_COLOR))
+                self._frames[frame_hash] = frame
+            return frame
+
+    def actions(self) -> List[Dict]:
+        """录制时执行的操作（点击和关闭窗口），按时间顺序"""
+        return [event for event in self.events if event['type'] in ('click', 'close')]
+
+    def matches(self) -> List[Dict]:
+        """录制时的匹配结果"""
+        return [event for event in self.events if event['type'] == 'match' and event.get('frame')]
+
+    def close(self):
+        self._zip.close()
+
+
+class ArchiveBackend(FrameSource, InputSink):
+    """
+    用会话存档模拟窗口的后端
+
+    录制的事件按操作（点击、关闭窗口）分段：回放中执行第k次操作前，截图返回录制时第k段内该窗口的截图，
+    依次前进并停留在该段最后一帧；每次回放操作都与录制时的第k次操作对比
+    """
+
+    def __init__(self, archive: SessionArchive):
+        self.archive = archive
+        self.step = 0  # 回放中已执行的操作数
+        self.windows: Dict[int, Dict] = {}  # 窗口句柄 -> 窗口信息
+        self.first_step: Dict[int, int] = {}  # 窗口句柄 -> 首次出现的段
+        self.gone_step: Dict[int, int] = {}  # 窗口句柄 -> 销毁时所在的段
+        self.segments: Dict[Tuple[int, int], List[str]] = {}  # (窗口句柄, 段) -> 帧哈希列表
+        self.recorded_actions = archive.actions()
+        self.decisions: List[Dict] = []  # 回放操作与录制操作的对比
+        self.captures = 0
+        self._cursor: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.RLock()
+
+        step = 0
+        for event in archive.events:
+            hwnd = event.get('hwnd')
+            if event['type'] == 'window':
+                self.windows[hwnd] = event
+                self.first_step.setdefault(hwnd, step)
+            elif event['type'] == 'frame':
+                self.first_step.setdefault(hwnd, step)
+                self.segments.setdefault((hwnd, step), []).append(event['frame'])
+            elif event['type'] == 'gone':
+                self.gone_step[hwnd] = step
+            elif event['type'] in ('click', 'close'):
+                step += 1
+
+    def _alive(self, hwnd: int) -> bool:
+        first = self.first_step.get(hwnd)
+        if first is None or first > self.step or hwnd not in self.windows:
+            return False
+        gone = self.gone_step.get(hwnd)
+        return gone is None or self.step < gone or self.step == gone and not self._gone_reached(hwnd)
+
+    def _gone_reached(self, hwnd: int) -> bool:
+        """销毁所在的段已经回放到最后一帧"""
+        frames = self.segments.get((hwnd, self.step), [])
+        return self._cursor.get((hwnd, self.step), 0) >= len(frames)
+
+    def find_windows(self, class_name: str, window_name: str) -> List[int]:
+        with self._lock:
+            return [hwnd for hwnd, info in self.windows.items()
+                    if (info['class_name'], info['title']) == (class_name, window_name) and self._alive(hwnd)]
+
+    def capture(self, hwnd: int) -> Optional[Frame]:
+        with self._lock:
+            if not self._alive(hwnd):
+                return None
+            self.captures += 1
+            frames = self.segments.get((hwnd, self.step))
+            if frames:
+                index = self._cursor.get((hwnd, self.step), 0)
+                self._cursor[(hwnd, self.step)] = index + 1
+                return self.archive.frame(frames[min(index, len(frames) - 1)])
+            # 本段没有截图时使用之前最近的一帧
+            for step in range(self.step - 1, -1, -1):
+                frames = self.segments.get((hwnd, step))
+                if frames:
+                    return self.archive.frame(frames[-1])
+            return None
+
+    def get_window_rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        return tuple(self.windows[hwnd]['rect'])
+
+    def screen_to_client(self, hwnd: int, point: Tuple[int, int]) -> Tuple[int, int]:
+        info = self.windows[hwnd]
+        left, top = info['rect'][:2]
+        offset_x, offset_y = info['client_offset']
+        return point[0] - left + offset_x, point[1] - top + offset_y
+
+    def get_dpi_scale(self, hwnd: int) -> float:
+        return self.windows[hwnd]['dpi_scale']
+
+    def get_window_info(self, hwnd: int) -> Dict:
+        info = self.windows[hwnd]
+        return {'title': info['title'], 'class_name': info['class_name']}
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        return self.windows[hwnd].get('process_id', 0)
+
+    def is_window(self, hwnd: int) -> bool:
+        with self._lock:
+            return self._alive(hwnd)
+
+    def get_capture_stats(self) -> Dict:
+        return {'captures': self.captures, 'step': self.step}
+
+    def click(self, hwnd: int, x: int, y: int, button: str = 'left', click_type: str = 'single') -> bool:
+        self._record_action({'type': 'click', 'hwnd': hwnd, 'position': [x, y], 'button': button})
+        return True
+
+    def restore_window(self, hwnd: int):
+        pass
+
+    def close_window(self, hwnd: int):
+        self._record_action({'type': 'close', 'hwnd': hwnd})
+
+    def start_program(self, launcher_path: str) -> bool:
+        return False
+
+    def _record_action(self, action: Dict):
+        """与录制时的同序号操作对比，并前进到下一段"""
+        with self._lock:
+            recorded = self.recorded_actions[self.step] if self.step < len(self.recorded_actions) else None
+            self.decisions.append({'step': self.step, 'replayed': action, 'recorded': recorded,
+                                   'agree': _same_action(action, recorded)})
+            self.step += 1
+
+    def get_decision_stats(self) -> Dict:
+        """回放决策与录制决策的一致性"""
+        agreed = sum(1 for decision in self.decisions if decision['agree'])
+        return {
+            'recorded_actions': len(self.recorded_actions),
+            'replayed_actions': len(self.decisions),
+            'agreed': agreed,
+            'agreement': agreed / max(len(self.decisions), len(self.recorded_actions), 1),
+            'divergences': [decision for decision in self.decisions if not decision['agree']]
+        }
+
+
+def _same_action(replayed: Dict, recorded: Optional[Dict]) -> bool:
+    if recorded is None or replayed['type'] != recorded['type'] or replayed['hwnd'] != recorded['hwnd']:
+        return False
+    if replayed['type'] == 'click':
+        return (abs(replayed['position'][0] - recorded['position'][0]) <= CLICK_TOLERANCE and
+                abs(replayed['position'][1] - recorded['position'][1]) <= CLICK_TOLERANCE)
+    return True
+
+
+def check_matches(archive: SessionArchive, controller, tolerance: int = 3) -> Dict:
+    """
+    用当前匹配策略重新匹配录制的每一次模板匹配，与录制结果对比
+
+    Returns:
+        一致率、命中/未命中差异和平均匹配耗时
+    """
+    controller.use_frame_cache = False
+    agreed = 0
+    differences = []
+    elapsed = 0.0
+    matches = archive.matches()
+    for event in matches:
+        controller.set_window_handle(event['hwnd'])
+        controller.last_frame = archive.frame(event['frame'])
+        start = time.perf_counter()
+        result = controller.find_template(event['template_path'], event['confidence'], use_last_screenshot=True,
+                                          click_position_ratio=tuple(event['click_position_ratio']))
+        elapsed += time.perf_counter() - start
+
+        recorded = event['result']
+        if result is None and recorded is None:
+            agreed += 1
+        elif result is not None and recorded is not None and all(
+                abs(a - b) <= tolerance for a, b in zip(result['client_position'], recorded['client_position'])):
+            agreed += 1
+        else:
+            differences.append({'t': event['t'], 'hwnd': event['hwnd'], 'template_path': event['template_path'],
+                                'recorded': recorded and recorded['client_position'],
+                                'replayed': result and list(result['client_position'])})
+    return {
+        'matches': len(matches),
+        'agreed': agreed,
+        'agreement': agreed / len(matches) if matches else 1.0,
+        'average_ms': elapsed / len(matches) * 1000 if matches else 0.0,
+        'differences': differences
+    }
+
+
+def main():
+    from src.application_operation import WindowController
+    from src.live_flows import start_live, stop_live, clear_live
+
+    flows = {'start_live': start_live, 'stop_live': stop_live, 'clear_live': clear_live}
+
+    parser = argparse.ArgumentParser(description="会话存档离线回放")
+    parser.add_argument("archive", help="SessionRecorder写入的会话存档")
+    parser.add_argument("--img-tmp-dir", default="img_tmp", help="模板目录")
+    parser.add_argument("--flow", choices=sorted(flows), default="start_live", help="回放的流程")
+    parser.add_argument("--mode", choices=("full", "pyramid"), default="full", help="全图匹配模式")
+    parser.add_argument("--no-region", action="store_true", help="不使用区域优先搜索")
+    parser.add_argument("--timeout", type=float, default=60.0, help="流程超时时间（秒）")
+    parser.add_argument("--check-matches", action="store_true", help="逐个重新匹配录制的匹配结果，而不是回放流程")
+    parser.add_argument("--metrics", help="可选，把分阶段耗时统计写入该JSON文件")
+    args = parser.parse_args()
+
+    archive = SessionArchive(args.archive)
+    backend = ArchiveBackend(archive)
+    controller = WindowController(launcher_path="", frame_source=backend)
+    controller.set_img_tmp_dir(args.img_tmp_dir)
+    controller.set_match_mode(args.mode)
+    controller.use_region_search = not args.no_region
+    controller.enable_metrics()
+    print(f"存档: {args.archive}，{archive.meta['frames']} 帧（去重后 {archive.meta['unique_frames']} 帧），"
+          f"{len(backend.recorded_actions)} 次操作")
+
+    if args.check_matches:
+        report = check_matches(archive, controller)
+        print(f"重新匹配 {report['matches']} 次，一致 {report['agreed']} 次（{report['agreement']:.1%}），"
+              f"平均 {report['average_ms']:.2f} ms")
+        for difference in report['differences']:
+            print(f"  ⚠️  {difference}")
+    else:
+        start_time = time.perf_counter()
+        flows[args.flow](controller, timeout=args.timeout)
+        elapsed = time.perf_counter() - start_time
+        report = backend.get_decision_stats()
+        match_time = sum(histogram['sum'] for histogram in
+                         controller.metrics.snapshot()['stages'].get('match', {}).values())
+        print(f"回放耗时 {elapsed:.3f} 秒（其中模板匹配 {match_time:.3f} 秒），"
+              f"操作 {report['replayed_actions']}/{report['recorded_actions']}，"
+              f"与录制一致 {report['agreed']} 次（{report['agreement']:.1%}）")
+        for divergence in report['divergences']:
+            print(f"  ⚠️  第{divergence['step'] + 1}次操作: 回放 {divergence['replayed']}，录制 {divergence['recorded']}")
+
+    if args.metrics:
+        controller.export_metrics(args.metrics)
+    controller.close()
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
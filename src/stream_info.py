@@ -0,0 +1,148 @@
+import re
+import threading
+from typing import Optional, Dict, List, NamedTuple
+
+# 匹配格式：command('stream-key?params')，一次扫描同时匹配四种命令
+COMMAND_PATTERN = re.compile(r"(releaseStream|FCPublish|publish|connect)\('([^']+)'\)")
+# 匹配 tcUrl,rtmp://... 或 swfUrl,rtmp://... 格式（amf.string字段中的相邻字符串以逗号分隔）
+SERVER_PATTERN = re.compile(r"(tcUrl|swfUrl),(rtmp://[^,;]+)")
+
+# 旧版extract_stream_info返回结果时的命令顺序
+LEGACY_COMMAND_ORDER = ('releaseStream', 'FCPublish', 'publish', 'connect')
+
+
+class StreamRecord(NamedTuple):
+    """一条推流命令记录"""
+    command: str  # connect/releaseStream/FCPublish/publish
+    stream_code: str  # 命令参数：connect为应用名，其余为推流码
+    server: Optional[str]  # 收到命令时最近一次connect的服务器地址
+    frame_number: int  # 所在数据包的帧编号，无法解析时为-1
+
+
+class StreamInfoExtractor:
+    """
+    推流信息增量提取器
+
+    捕获到每一行数据时调用feed()解析，只扫描这一行，随时可以获取当前的服务器地址和推流码，
+    不需要在退出时拼接并重新扫描全部捕获历史
+    """
+
+    def __init__(self, separator: str = ";"):
+        """
+        初始化提取器
+
+        参数:
+            separator: 字段分隔符，每行的第一个字段为帧编号（frame.number）
+        """
+        self.separator = separator
+        self.records: List[StreamRecord] = []
+        self.server: Optional[str] = None  # 最近一次connect的服务器地址
+        self._first_servers: Dict[str, str] = {}  # 'tcUrl'/'swfUrl' -> 第一次出现的服务器地址
+        self._latest: Dict[str, StreamRecord] = {}  # 命令 -> 最近一条记录
+        self.lines = 0  # 已解析的行数
+        self._lock = threading.Lock()
+
+    def feed(self, line: str) -> List[StreamRecord]:
+        """
+        解析一行捕获数据
+
+        参数:
+            line: tshark输出的一行
+
+        返回:
+            该行中解析出的推流命令记录
+        """
+        # 绝大多数行不包含命令或服务器地址，先用子串判断跳过正则匹配
+        if "('" not in line and "Url," not in line:
+            with self._lock:
+                self.lines += 1
+            return []
+
+        head = line.split(self.separator, 1)[0]
+        frame_number = int(head) if head.isdigit() else -1
+        with self._lock:
+            self.lines += 1
+            for name, server in SERVER_PATTERN.findall(line):
+                self._first_servers.setdefault(name, server)
+                if name == 'tcUrl' or self.server is None:
+                    self.server = server
+
+            records = [StreamRecord(command, stream_code, self.server, frame_number)
+                       for command, stream_code in COMMAND_PATTERN.findall(line)]
+            self._add(records)
+        return records
+
+    def add_records(self, records: List[StreamRecord]):
+        """
+        添加已解析好的推流命令记录（如RtmpDecoder直接从数据包解码的结果）
+
+        参数:
+            records: 推流命令记录，记录中的服务器地址视为tcUrl
+        """
+        with self._lock:
+            for record in records:
+                if record.server:
+                    self._first_servers.setdefault('tcUrl', record.server)
+                    self.server = record.server
+            self._add(records)
+
+    def _add(self, records: List[StreamRecord]):
+        """保存记录（调用方持有锁）"""
+        for record in records:
+            self.records.append(record)
+            self._latest[record.command] = record
+
+    @property
+    def stream_key(self) -> Optional[str]:
+        """当前推流码（优先取最近的publish，其次FCPublish、releaseStream）"""
+        with self._lock:
+            for command in ('publish', 'FCPublish', 'releaseStream'):
+                record = self._latest.get(command)
+                if record is not None:
+                    return record.stream_code
+        return None
+
+    def get_current(self) -> Dict:
+        """获取当前的服务器地址和推流码 {'server': ..., 'stream_code': ...}"""
+        return {'server': self.server, 'stream_code': self.stream_key}
+
+    def get_results(self) -> List[Dict]:
+        """
+        按旧版extract_stream_info的格式返回全部结果
+
+        返回:
+            [{'command': 命令, 'stream_code': 推流码, 'server': 服务器}, ...]，按命令分组；
+            没有任何命令但有服务器地址时返回一条 'server_only' 记录
+        """
+        with self._lock:
+            server = self._first_servers.get('tcUrl') or self._first_servers.get('swfUrl')
+            results = [{'command': command, 'stream_code': record.stream_code, 'server': server}
+                       for command in LEGACY_COMMAND_ORDER
+                       for record in self.records if record.command == command]
+        if not results and server:
+            results.append({'command': 'server_only', 'stream_code': None, 'server': server})
+        return results
+
+    def reset(self):
+        """清空全部记录"""
+        with self._lock:
+            self.records.clear()
+            self.server = None
+            self._first_servers.clear()
+            self._latest.clear()
+            self.lines = 0
+
+
+def extract_stream_info(raw_string: str) -> List[Dict]:
+    """
+    从原始字符串中提取推流命令、推流码和服务器地址（兼容旧接口，新代码使用StreamInfoExtractor逐行解析）
+
+    参数:
+        raw_string: 包含RTMP信息的原始字符串
+
+    返回:
+        一个列表，元素为字典，格式：[{'command': 命令, 'stream_code': 推流码, 'server': 服务器}, ...]
+    """
+    extractor = StreamInfoExtractor()
+    extractor.feed(raw_string)
+    return extractor.get_results()
@@ -1,19 +1,36 @@
 import re
+import signal
 import subprocess
+import sys
 import threading
 import time
-from typing import List, Optional, Callable, Any, Union
+from typing import List, Optional, Callable, Any, Union, Dict, Set, Tuple
+from urllib.parse import urlparse
+
+from src.capture_buffer import CaptureBuffer
+from src.stream_info import StreamInfoExtractor, extract_stream_info  # extract_stream_info 保留旧的导入位置
+
+# RTMP默认端口，tshark按该端口识别RTMP
+RTMP_PORTS = (1935,)
+
+# tshark/dumpcap退出时在标准错误输出的统计信息
+CAPTURED_PATTERN = re.compile(r"(\d+) packets? captured")
+DROPPED_PATTERN = re.compile(r"(\d+) packets? dropped")
+DUMPCAP_STATS_PATTERN = re.compile(r"Packets received/dropped on interface .*?: (\d+)/(\d+)")
 
 
 class TsharkCapturer:
     """RTMPT数据包捕获器类"""
 
-    def __init__(self, tshark_path: str = r'C:\Program Files\Wireshark\tshark.exe'):
+    def __init__(self, tshark_path: str = r'C:\Program Files\Wireshark\tshark.exe',
+                 buffer_capacity: int = 10000, spill_path: Optional[str] = None):
         """
         初始化Tshark捕获器
 
         参数:
             tshark_path: tshark可执行文件路径
+            buffer_capacity: 内存中保留的捕获行数，更早的行写入磁盘溢出文件
+            spill_path: 溢出文件路径，默认使用临时文件
         """
         self.tshark_path = tshark_path
         self.process = None
@@ -21,9 +38,20 @@ class TsharkCapturer:
         self.thread = None
         self.output_callback = None
         self.interface = None
-        self.filter_expression = None
+        self.filter_expression = None  # 显示过滤器（-Y），tshark解析数据包后再过滤
+        self.capture_filter = None  # 捕获过滤器（-f，BPF），在内核中过滤，None时自动生成
+        self.auto_capture_filter = True
+        self.rtmp_ports = list(RTMP_PORTS)
+        self.learned_servers: Set[Tuple[str, int]] = set()  # 捕获到connect命令的服务器 (地址, 端口)
+        self.active_capture_filter = None  # 本次捕获实际使用的捕获过滤器
+        self.kernel_stats: Dict[str, Optional[int]] = {}  # 捕获进程退出时报告的统计
+        self._stderr_lines: List[str] = []
+        self._stderr_thread = None
+        self.last_frame_number = 0  # 输出行中最大的帧编号：tshark已读取并解析的数据包数（下限）
         self.fields = []
-        self.captured_data = []
+        self.separator = ";"
+        self.captured_data = CaptureBuffer(buffer_capacity, spill_path, separator=self.separator)
+        self.stream_info = StreamInfoExtractor(self.separator)  # 逐行提取推流服务器和推流码
         self.default_fields = [
             'frame.number',
             'frame.time',
@@ -35,7 +63,6 @@ class TsharkCapturer:
             'tcp.dstport',
             'amf.string'
         ]
-        self.separator = ";"
 
     @staticmethod
     def parse_interfaces_to_dict_list(interface_list):
@@ -229,6 +256,50 @@ class TsharkCapturer:
         """
         self.filter_expression = filter_expression
 
+    def set_capture_filter(self, capture_filter: Optional[str] = None, auto: bool = True):
+        """
+        设置捕获过滤器（BPF语法，在内核中丢弃无关数据包，tshark只解析通过的数据包）
+
+        参数:
+            capture_filter: 捕获过滤器表达式，如 "tcp port 1935"；空字符串表示不使用捕获过滤器
+            auto: capture_filter为None时是否根据RTMP端口和已发现的服务器地址自动生成
+        """
+        self.capture_filter = capture_filter
+        self.auto_capture_filter = auto
+
+    def derive_capture_filter(self) -> Optional[str]:
+        """
+        根据RTMP端口、推流地址中的端口和已发现的服务器地址生成捕获过滤器
+
+        返回:
+            BPF表达式，如 "tcp port 1935 or (host 36.155.99.16 and tcp port 1936)"
+        """
+        ports = self._rtmp_ports()
+        clauses = [f"tcp port {port}" for port in ports]
+        for address, port in sorted(self.learned_servers):
+            if port not in ports:
+                clauses.append(f"(host {address} and tcp port {port})")
+        return " or ".join(clauses) if clauses else None
+
+    def _resolve_capture_filter(self) -> Optional[str]:
+        """本次捕获使用的捕获过滤器"""
+        if self.capture_filter is not None:
+            return self.capture_filter or None
+        return self.derive_capture_filter() if self.auto_capture_filter else None
+
+    def _rtmp_ports(self) -> List[int]:
+        """RTMP端口，加上当前推流地址中指定的端口"""
+        ports = list(self.rtmp_ports)
+        server = self.stream_info.server
+        if server:
+            try:
+                port = urlparse(server).port
+            except ValueError:
+                port = None
+            if port and port not in ports:
+                ports.append(port)
+        return ports
+
     def set_fields(self, fields: List[str]):
         """
         设置要捕获的字段
@@ -279,6 +350,17 @@ class TsharkCapturer:
             '-T', 'fields'
         ]
 
+        self.last_frame_number = 0
+
+        # 捕获过滤器：无关数据包在内核中丢弃，不再由tshark逐个解析
+        self.active_capture_filter = self._resolve_capture_filter()
+        if self.active_capture_filter:
+            command.extend(['-f', self.active_capture_filter])
+        # 非默认端口需要告诉tshark按RTMP解析
+        for port in sorted(set(self._rtmp_ports()) | {port for _, port in self.learned_servers}):
+            if port not in RTMP_PORTS:
+                command.extend(['-d', f'tcp.port=={port},rtmpt'])
+
         # 添加字段
         for field in fields_to_use:
             command.extend(['-e', field])
@@ -288,6 +370,7 @@ class TsharkCapturer:
 
         print(f"开始捕获数据包...")
         print(f"接口: {self.interface}")
+        print(f"捕获过滤器: {self.active_capture_filter or '无'}")
         print(f"过滤器: {self.filter_expression}")
         print(f"字段: {', '.join(fields_to_use)}")
 
@@ -299,8 +382,10 @@ class TsharkCapturer:
                 text=True,
                 encoding='utf-8',
                 errors='ignore',
-                bufsize=1
+                bufsize=1,
+                creationflags=self._creation_flags()
             )
+            self._start_stderr_reader()
 
             # 读取输出
             for line in self.process.stdout:
@@ -308,17 +393,11 @@ class TsharkCapturer:
                     break
 
                 if line.strip():
-                    self.captured_data.append(line.strip())
-
-                    # 如果有回调函数，调用它
-                    if self.output_callback:
-                        self.output_callback(line.strip())
-
-                    # 实时打印输出（可选）
-                    # print(line.strip())
+                    self._handle_line(line.strip())
 
             # 等待进程结束
             self.process.wait()
+            self._finish_stderr_reader()
 
         except Exception as e:
             print(f"捕获过程中出错: {e}")
@@ -328,6 +407,157 @@ class TsharkCapturer:
             if self.process and self.process.poll() is None:
                 self.process.terminate()
 
+    def _handle_line(self, line: str):
+        """保存一行捕获数据，提取推流信息并调用回调函数"""
+        self.captured_data.append(line)
+        self.stream_info.feed(line)
+        if "connect('" in line:
+            self._learn_server(line)
+        self._note_frame_number(line)
+
+        # 如果有回调函数，调用它
+        if self.output_callback:
+            self.output_callback(line)
+
+        # 实时打印输出（可选）
+        # print(line)
+
+    def _note_frame_number(self, line: str):
+        """记录输出行中的帧编号（tshark对读取的每个数据包编号，不论是否通过显示过滤器）"""
+        fields = self.fields if self.fields else self.default_fields
+        if 'frame.number' not in fields:
+            return
+        values = line.split(self.separator)
+        index = fields.index('frame.number')
+        if index < len(values) and values[index].isdigit():
+            self.last_frame_number = max(self.last_frame_number, int(values[index]))
+
+    def _learn_server(self, line: str):
+        """记录connect命令的目的地址和端口，下次捕获时加入捕获过滤器"""
+        fields = self.fields if self.fields else self.default_fields
+        values = line.split(self.separator)
+        try:
+            address = values[fields.index('ip.dst')]
+            port = values[fields.index('tcp.dstport')]
+        except (ValueError, IndexError):
+            return
+        if address and port.isdigit():
+            self.learned_servers.add((address, int(port)))
+
+    @staticmethod
+    def _creation_flags() -> int:
+        """Windows上在新进程组中启动捕获进程，停止时可以发送CTRL_BREAK让其正常退出并输出统计"""
+        return subprocess.CREATE_NEW_PROCESS_GROUP if sys.platform == 'win32' else 0
+
+    def _start_stderr_reader(self):
+        """在后台线程中读取捕获进程的标准错误输出（避免管道写满阻塞），退出时解析统计信息"""
+        self.kernel_stats = {}
+        self._stderr_lines = []
+        self._stderr_thread = threading.Thread(target=self._read_stderr, args=(self.process.stderr,))
+        self._stderr_thread.daemon = True
+        self._stderr_thread.start()
+
+    def _read_stderr(self, stream):
+        for line in stream:
+            if isinstance(line, bytes):
+                line = line.decode('utf-8', errors='ignore')
+            self._stderr_lines.append(line.strip())
+
+    def _finish_stderr_reader(self):
+        """等待标准错误输出读完，解析捕获和丢弃的数据包数"""
+        self._stderr_thread.join(timeout=2)
+        self.kernel_stats = self.parse_capture_stats(self._stderr_lines)
+
+    @staticmethod
+    def parse_capture_stats(lines: List[str]) -> Dict[str, Optional[int]]:
+        """
+        解析tshark/dumpcap退出时输出的统计信息
+
+        参数:
+            lines: 标准错误输出的行，如 "1234 packets captured"、"5 packets dropped from eth0"、
+                   "Packets received/dropped on interface 'eth0': 1234/5 (...)"
+
+        返回:
+            {'received': 通过捕获过滤器的数据包数, 'dropped': 内核/驱动丢弃的数据包数}，没有输出时为None
+        """
+        received = dropped = None
+        for line in lines:
+            match = DUMPCAP_STATS_PATTERN.search(line)
+            if match:
+                received = (received or 0) + int(match.group(1))
+                dropped = (dropped or 0) + int(match.group(2))
+                continue
+            match = CAPTURED_PATTERN.search(line)
+            if match:
+                received = (received or 0) + int(match.group(1))
+            match = DROPPED_PATTERN.search(line)
+            if match:
+                dropped = (dropped or 0) + int(match.group(1))
+        return {'received': received, 'dropped': dropped}
+
+    def get_capture_stats(self) -> dict:
+        """
+        获取内核丢包与解析数据包的对比
+
+        解析数是tshark自己统计的数据包数：进程正常退出时取其报告的 "N packets captured"（tshark读取并解析的帧数），
+        捕获过程中或没有报告时取输出行的最大帧编号（之后未通过显示过滤器的数据包不在其中，是下限）；
+        tshark不报告内核接收的数据包数，kernel_received为None
+
+        返回:
+            {'capture_filter': 捕获过滤器, 'display_filter': 显示过滤器,
+             'kernel_received': None, 'kernel_dropped': 内核/驱动丢弃的数据包数（退出后才有）,
+             'dissected': tshark解析的数据包数, 'dissected_source': 'tshark'/'frame.number'/None,
+             'displayed': 通过显示过滤器输出的行数, 'drop_ratio': 丢弃比例}
+        """
+        dropped = self.kernel_stats.get('dropped')
+        dissected = self.kernel_stats.get('received')
+        source = 'tshark' if dissected is not None else None
+        if self.last_frame_number > (dissected or 0):
+            dissected, source = self.last_frame_number, 'frame.number'
+        return {
+            'capture_filter': self.active_capture_filter,
+            'display_filter': self.filter_expression,
+            'kernel_received': None,
+            'kernel_dropped': dropped,
+            'dissected': dissected,
+            'dissected_source': source,
+            'displayed': self.get_captured_count(),
+            'drop_ratio': self._drop_ratio(dissected, dropped)
+        }
+
+    @staticmethod
+    def _drop_ratio(received: Optional[int], dropped: Optional[int]) -> Optional[float]:
+        if received is None or dropped is None or received + dropped == 0:
+            return None
+        return dropped / (received + dropped)
+
+    def print_capture_report(self):
+        """输出内核丢包与解析数据包的对比"""
+        stats = self.get_capture_stats()
+        if stats['kernel_dropped'] is None and stats['dissected'] is None:
+            print("📊 捕获进程未报告统计信息")
+            return
+
+        def count(value: Optional[int]) -> str:
+            return f"{value} 个" if value is not None else "未报告"
+
+        ratio = stats['drop_ratio']
+        dissected = count(stats['dissected'])
+        if stats.get('dissected_source') == 'frame.number':
+            dissected = f"至少 {dissected}（按输出行的帧编号）"
+        print(f"📊 内核接收 {count(stats['kernel_received'])}，内核丢弃 {count(stats['kernel_dropped'])}"
+              f"{f'（{ratio:.2%}）' if ratio is not None else ''}，解析 {dissected}，"
+              f"输出 {stats['displayed']} 行")
+        if stats['kernel_dropped']:
+            print("⚠️ 内核有丢包，可能漏掉推流命令，可以收紧捕获过滤器")
+
+    def _interrupt_process(self):
+        """请求捕获进程正常退出（tshark/dumpcap收到中断后会输出统计信息）"""
+        if sys.platform == 'win32':
+            self.process.send_signal(signal.CTRL_BREAK_EVENT)
+        else:
+            self.process.send_signal(signal.SIGINT)
+
     def start(self) -> bool:
         """
         开始捕获数据包（非阻塞方式）
@@ -359,18 +589,23 @@ class TsharkCapturer:
         print("正在停止捕获...")
         self.capturing = False
 
-        # 终止进程
+        # 终止进程：先中断让其输出统计信息，超时后再强制结束
         if self.process and self.process.poll() is None:
             try:
-                self.process.terminate()
-                # 等待进程结束
-                for _ in range(10):
+                self._interrupt_process()
+                for _ in range(20):
                     if self.process.poll() is not None:
                         break
                     time.sleep(0.1)
                 else:
-                    if self.process.poll() is None:
-                        self.process.kill()
+                    self.process.terminate()
+                    for _ in range(10):
+                        if self.process.poll() is not None:
+                            break
+                        time.sleep(0.1)
+                    else:
+                        if self.process.poll() is None:
+                            self.process.kill()
             except Exception as e:
                 print(f"停止进程时出错: {e}")
 
@@ -379,23 +614,57 @@ class TsharkCapturer:
             self.thread.join(timeout=2)
 
         print("捕获已停止")
+        self.print_capture_report()
+
+    def close(self):
+        """停止捕获并释放捕获缓冲区（删除临时溢出文件），程序退出前调用"""
+        if self.capturing:
+            self.stop()
+        self.captured_data.close()
 
     def is_capturing(self) -> bool:
         """检查是否正在捕获"""
         return self.capturing
 
     def get_captured_data(self) -> List[str]:
-        """获取已捕获的数据"""
-        return self.captured_data.copy()
+        """获取已捕获的全部数据（包括已溢出到磁盘的部分），只需要部分数据时使用下面的窗口读取方法"""
+        return self.captured_data.range(0)
+
+    def get_captured_tail(self, n: int) -> List[str]:
+        """获取最近捕获的n行数据"""
+        return self.captured_data.tail(n)
+
+    def get_captured_range(self, start: int, stop: Optional[int] = None) -> List[str]:
+        """
+        按序号获取捕获的数据
+
+        参数:
+            start: 起始序号（从0开始，包含）
+            stop: 结束序号（不包含），默认到最新数据
+        """
+        return self.captured_data.range(start, stop)
+
+    def get_captured_since(self, frame_number: int, limit: Optional[int] = None) -> List[str]:
+        """获取帧编号（frame.number）大于frame_number的捕获数据，最多limit行"""
+        return self.captured_data.since_frame(frame_number, limit)
 
     def clear_captured_data(self):
-        """清空已捕获的数据"""
+        """清空已捕获的数据和提取的推流信息"""
         self.captured_data.clear()
+        self.stream_info.reset()
+
+    def get_stream_info(self) -> dict:
+        """获取当前的推流服务器地址和推流码 {'server': ..., 'stream_code': ...}"""
+        return self.stream_info.get_current()
 
     def get_captured_count(self) -> int:
         """获取已捕获的数据包数量"""
         return len(self.captured_data)
 
+    def get_buffer_stats(self) -> dict:
+        """获取捕获缓冲区统计信息（内存中的行数、溢出到磁盘的行数和文件大小）"""
+        return self.captured_data.get_stats()
+
 
 # 使用示例
 if __name__ == "__main__":
@@ -455,6 +724,8 @@ if __name__ == "__main__":
                 elif cmd == 'status':
                     print(f"正在捕获: {capturer.is_capturing()}")
                     print(f"已捕获数据包数: {capturer.get_captured_count()}")
+                    print(f"当前推流信息: {capturer.get_stream_info()}")
+                    print(f"捕获统计: {capturer.get_capture_stats()}")
 
                 elif cmd == 'count':
                     print(f"已捕获数据包数: {capturer.get_captured_count()}")
@@ -469,9 +740,11 @@ if __name__ == "__main__":
                     break
 
                 elif cmd == 'data':
-                    data = capturer.get_captured_data()
+                    # 只显示最近的数据，避免复制全部历史
+                    data = capturer.get_captured_tail(50)
+                    first = capturer.get_captured_count() - len(data)
                     for i, packet in enumerate(data):
-                        print(f"{i + 1}: {packet}")
+                        print(f"{first + i + 1}: {packet}")
 
                 else:
                     print("未知命令")
@@ -481,70 +754,14 @@ if __name__ == "__main__":
             if capturer.is_capturing():
                 capturer.stop()
 
+        finally:
+            capturer.close()
+
     else:
         print("启动捕获失败")
 
 
-    def extract_stream_info(raw_string):
-        """
-        从原始字符串中提取推流命令、推流码和服务器地址。
-
-        参数:
-            raw_string: 包含RTMP信息的原始字符串
-
-        返回:
-            一个列表，元素为字典，格式：[{'command': 命令, 'stream_code': 推流码, 'server': 服务器}, ...]
-        """
-        results = []
-
-        # 1. 首先提取所有可能的服务器地址
-        # 修改服务器地址的正则表达式，使其匹配完整的rtmp://地址
-        # 现在支持匹配到逗号或行尾结束
-        server_patterns = [
-            r"tcUrl,(rtmp://[^,]+)",  # 匹配 tcUrl,rtmp://... 格式
-            r"swfUrl,(rtmp://[^,]+)",  # 匹配 swfUrl,rtmp://... 格式
-            # r"rtmp://[^,)'\"]+",  # 通用匹配 rtmp:// 地址
-        ]
-
-        server = None
-        for pattern in server_patterns:
-            server_match = re.search(pattern, raw_string)
-            if server_match:
-                server = server_match.group(1) if 'group' in dir(server_match) else server_match.group(0)
-                break
-
-        # 2. 定义匹配不同命令和其推流码的正则表达式
-        # 匹配格式：command('stream-key?params')
-        command_patterns = {
-            'releaseStream': r"releaseStream\('([^']+)'\)",
-            'FCPublish': r"FCPublish\('([^']+)'\)",
-            'publish': r"publish\('([^']+)'\)",
-            'connect': r"connect\('([^']+)'\)"  # 添加connect命令
-        }
-
-        # 3. 遍历所有命令模式进行匹配
-        for command, pattern in command_patterns.items():
-            matches = re.finditer(pattern, raw_string)
-            for match in matches:
-                stream_code = match.group(1)
-                results.append({
-                    'command': command,
-                    'stream_code': stream_code,
-                    'server': server
-                })
-
-        # 4. 如果没有找到任何命令，但找到了服务器地址，返回服务器信息
-        if not results and server:
-            results.append({
-                'command': 'server_only',
-                'stream_code': None,
-                'server': server
-            })
-
-        return results
-
-
-    for stream_info in extract_stream_info(",".join(capturer.get_captured_data())):
+    for stream_info in capturer.stream_info.get_results():
         print(stream_info['command'], stream_info['stream_code'], stream_info['server'])
 
     print("\n捕获结束")
@@ -0,0 +1,340 @@
+import os
+import random
+import struct
+from typing import Optional, Tuple, Dict, List, Any
+
+from src.rtmp_decoder import LINKTYPE_ETHERNET
+
+# 合成捕获的默认地址
+CLIENT_ADDRESS = ('192.168.1.23', 52814)
+SERVER_ADDRESS = ('36.155.99.16', 1935)
+NOISE_ADDRESS = ('52.84.12.7', 443)
+MSS = 1460
+
+
+def encode_amf0(value: Any) -> bytes:
+    """把Python值编码为AMF0（支持None、bool、数字、字符串、字典和列表）"""
+    if value is None:
+        return b'\x05'
+    if isinstance(value, bool):
+        return b'\x01' + (b'\x01' if value else b'\x00')
+    if isinstance(value, (int, float)):
+        return b'\x00' + struct.pack('>d', float(value))
+    if isinstance(value, str):
+        data = value.encode('utf-8')
+        if len(data) > 0xFFFF:
+            return b'\x0c' + struct.pack('>I', len(data)) + data
+        return b'\x02' + struct.pack('>H', len(data)) + data
+    if isinstance(value, dict):
+        body = b''.join(_amf0_key(key) + encode_amf0(item) for key, item in value.items())
+        return b'\x03' + body + b'\x00\x00\x09'
+    if isinstance(value, (list, tuple)):
+        return b'\x0a' + struct.pack('>I', len(value)) + b''.join(encode_amf0(item) for item in value)
+    raise TypeError(f"不支持的AMF0类型: {type(value)}")
+
+
+def _amf0_key(key: str) -> bytes:
+    data = key.encode('utf-8')
+    return struct.pack('>H', len(data)) + data
+
+
+def encode_chunks(csid: int, message_type: int, stream_id: int, payload: bytes, chunk_size: int,
+                  timestamp: int = 0) -> bytes:
+    """
+    把一条RTMP消息编码为分块：第一个分块使用完整消息头（fmt 0），其余使用fmt 3
+
+    参数:
+        csid: 分块流ID（2-63）
+        message_type: 消息类型
+        stream_id: 消息流ID
+        payload: 消息负载
+        chunk_size: 分块大小
+        timestamp: 消息时间戳（毫秒），超过0xFFFFFF时使用扩展时间戳
+
+    返回:
+        分块数据
+    """
+    extended = timestamp >= 0xFFFFFF
+    header = bytes([csid & 0x3F])
+    header += (0xFFFFFF if extended else timestamp).to_bytes(3, 'big')
+    header += len(payload).to_bytes(3, 'big') + bytes([message_type]) + struct.pack('<I', stream_id)
+    extended_timestamp = struct.pack('>I', timestamp) if extended else b''
+    chunks = [header + extended_timestamp + payload[:chunk_size]]
+    for position in range(chunk_size, len(payload), chunk_size):
+        chunks.append(bytes([0xC0 | (csid & 0x3F)]) + extended_timestamp + payload[position:position + chunk_size])
+    return b''.join(chunks)
+
+
+def build_publish_session(stream_key: str, server: str, media_bytes: int = 200000, chunk_size: int = 4096,
+                          seed: int = 0) -> Tuple[bytes, bytes]:
+    """
+    生成一次OBS式推流会话的两个方向的RTMP字节流
+
+    参数:
+        stream_key: 推流码（可带参数）
+        server: 服务器地址，如 rtmp://push.example.com/third
+        media_bytes: 推流命令之后的音视频数据量
+        chunk_size: Set Chunk Size设置的分块大小
+        seed: 随机种子
+
+    返回:
+        (客户端->服务器, 服务器->客户端)
+    """
+    rng = random.Random(seed)
+    app = server.rstrip('/').rsplit('/', 1)[-1]
+
+    client = bytearray(b'\x03' + bytes(rng.getrandbits(8) for _ in range(1536)))  # C0+C1
+    server_data = bytearray(b'\x03' + bytes(rng.getrandbits(8) for _ in range(3072)))  # S0+S1+S2
+    client += bytes(rng.getrandbits(8) for _ in range(1536))  # C2
+
+    client += encode_chunks(2, 1, 0, struct.pack('>I', chunk_size), 128)
+    commands = [
+        ['connect', 1, {'app': app, 'type': 'nonprivate', 'flashVer': 'FMLE/3.0 (compatible; FMSc/1.0)',
+                        'swfUrl': server, 'tcUrl': server}],
+        ['releaseStream', 2, None, stream_key],
+        ['FCPublish', 3, None, stream_key],
+        ['createStream', 4, None],
+        ['publish', 5, None, stream_key, 'live'],
+    ]
+    for command in commands:
+        payload = b''.join(encode_amf0(value) for value in command)
+        client += encode_chunks(3, 20, 1 if command[0] == 'publish' else 0, payload, chunk_size)
+    server_data += encode_chunks(2, 1, 0, struct.pack('>I', chunk_size), 128)
+    server_data += encode_chunks(3, 20, 0, b''.join(encode_amf0(value) for value in
+                                                    ['_result', 1, {'fmsVer': 'FMS/3,0,1,123'},
+                                                     {'code': 'NetConnection.Connect.Success'}]), chunk_size)
+
+    # 推流开始后的音视频数据
+    timestamp = 0
+    sent = 0
+    while sent < media_bytes:
+        size = rng.randint(200, 30000)
+        message_type = 8 if rng.random() < 0.3 else 9
+        client += encode_chunks(4 if message_type == 8 else 6, message_type, 1,
+                                bytes(rng.getrandbits(8) for _ in range(size)), chunk_size, timestamp)
+        timestamp += 33
+        sent += size
+    return bytes(client), bytes(server_data)
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'>{len(data) // 2}H', data))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def ethernet_tcp_packet(src: Tuple[str, int], dst: Tuple[str, int], seq: int, ack: int, flags: int,
+                        payload: bytes = b'') -> bytes:
+    """构造一个 以太网/IPv4/TCP 数据包"""
+    tcp_header = struct.pack('!HHIIBBHHH', src[1], dst[1], seq & 0xFFFFFFFF, ack & 0xFFFFFFFF, 5 << 4, flags,
+                             65535, 0, 0)
+    ip_header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(tcp_header) + len(payload), 0, 0x4000, 64, 6, 0,
+                            bytes(int(part) for part in src[0].split('.')),
+                            bytes(int(part) for part in dst[0].split('.')))
+    ip_header = ip_header[:10] + struct.pack('!H', _checksum(ip_header)) + ip_header[12:]
+    ethernet_header = b'\x00\x11\x22\x33\x44\x55' + b'\x66\x77\x88\x99\xaa\xbb' + b'\x08\x00'
+    return ethernet_header + ip_header + tcp_header + payload
+
+
+def tcp_conversation(client_data: bytes, server_data: bytes, client: Tuple[str, int] = CLIENT_ADDRESS,
+                     server: Tuple[str, int] = SERVER_ADDRESS, reorder: float = 0.0, retransmit: float = 0.0,
+                     seed: int = 0, close: bool = True) -> List[bytes]:
+    """
+    把两个方向的字节流切分为TCP段（包括三次握手和挥手）
+
+    参数:
+        client_data: 客户端发送的数据
+        server_data: 服务器发送的数据
+        client: 客户端地址
+        server: 服务器地址
+        reorder: 相邻两个段交换顺序的概率
+        retransmit: 段被重传一次的概率
+        seed: 随机种子
+        close: 是否以FIN结束连接
+
+    返回:
+        链路层数据包列表
+    """
+    rng = random.Random(seed)
+    client_seq = 0xFFFFF000 + rng.randint(0, 0xFFF)  # 靠近回绕点，覆盖序号回绕
+    server_seq = rng.getrandbits(32)
+    packets = [
+        ethernet_tcp_packet(client, server, client_seq, 0, 0x02),
+        ethernet_tcp_packet(server, client, server_seq, client_seq + 1, 0x12),
+        ethernet_tcp_packet(client, server, client_seq + 1, server_seq + 1, 0x10),
+    ]
+    client_seq += 1
+    server_seq += 1
+
+    # 服务器的握手响应在客户端发出C0C1之后，其余数据交替发送
+    segments = []
+    client_position = server_position = 0
+    while client_position < len(client_data) or server_position < len(server_data):
+        if client_position < len(client_data):
+            size = min(MSS, len(client_data) - client_position)
+            segments.append((client, server, client_seq + client_position, server_seq + server_position,
+                             client_data[client_position:client_position + size]))
+            client_position += size
+        if server_position < len(server_data) and client_position >= 1537:
+            size = min(MSS, len(server_data) - server_position)
+            segments.append((server, client, server_seq + server_position, client_seq + client_position,
+                             server_data[server_position:server_position + size]))
+            server_position += size
+
+    index = 0
+    while index < len(segments):
+        if reorder and index + 1 < len(segments) and rng.random() < reorder:
+            segments[index], segments[index + 1] = segments[index + 1], segments[index]
+            index += 1
+        index += 1
+    for src, dst, seq, ack, payload in segments:
+        packets.append(ethernet_tcp_packet(src, dst, seq, ack, 0x18, payload))
+        if retransmit and rng.random() < retransmit:
+            packets.append(ethernet_tcp_packet(src, dst, seq, ack, 0x18, payload))
+
+    if close:
+        packets.append(ethernet_tcp_packet(client, server, client_seq + len(client_data),
+                                           server_seq + len(server_data), 0x11))
+        packets.append(ethernet_tcp_packet(server, client, server_seq + len(server_data),
+                                           client_seq + len(client_data) + 1, 0x11))
+    return packets
+
+
+def noise_packets(count: int, seed: int = 0) -> List[bytes]:
+    """生成与推流无关的HTTPS流量"""
+    rng = random.Random(seed)
+    data = bytes(rng.getrandbits(8) for _ in range(count * 1000))
+    return tcp_conversation(b'\x16' + data[:count * 300], data, CLIENT_ADDRESS[:1] + (52900,), NOISE_ADDRESS,
+                            seed=seed)
+
+
+def interleave(flows: List[List[bytes]], seed: int = 0) -> List[bytes]:
+    """按随机顺序交织多个连接的数据包（每个连接内部保持原顺序）"""
+    rng = random.Random(seed)
+    positions = [0] * len(flows)
+    packets = []
+    while True:
+        active = [index for index, flow in enumerate(flows) if positions[index] < len(flow)]
+        if not active:
+            return packets
+        index = rng.choice(active)
+        packets.append(flows[index][positions[index]])
+        positions[index] += 1
+
+
+def write_pcap(path: str, packets: List[bytes], start_time: float = 1700000000.0, interval: float = 0.0005):
+    """写入经典pcap文件（微秒时间戳，以太网链路层）"""
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 262144, LINKTYPE_ETHERNET))
+        for index, packet in enumerate(packets):
+            timestamp = start_time + index * interval
+            f.write(struct.pack('<IIII', int(timestamp), int(timestamp % 1 * 1e6), len(packet), len(packet)))
+            f.write(packet)
+
+
+def pcapng_section_header() -> bytes:
+    """pcapng节头块"""
+    return _pcapng_block(0x0A0D0D0A, struct.pack('<IHHq', 0x1A2B3C4D, 1, 0, -1))
+
+
+def pcapng_interface_description(linktype: int = LINKTYPE_ETHERNET) -> bytes:
+    """pcapng接口描述块（微秒时间戳）"""
+    return _pcapng_block(1, struct.pack('<HHI', linktype, 0, 262144))
+
+
+def pcapng_enhanced_packet(packet: bytes, timestamp: float, interface_id: int = 0) -> bytes:
+    """pcapng增强数据包块"""
+    ticks = int(round(timestamp * 1e6))
+    padding = b'\x00' * (-len(packet) % 4)
+    return _pcapng_block(6, struct.pack('<IIIII', interface_id, ticks >> 32, ticks & 0xFFFFFFFF, len(packet),
+                                        len(packet)) + packet + padding)
+
+
+def pcapng_interface_statistics(timestamp: float, received: int, dropped: int, interface_id: int = 0) -> bytes:
+    """pcapng接口统计块（isb_ifrecv、isb_ifdrop）"""
+    ticks = int(round(timestamp * 1e6))
+    options = struct.pack('<HHQ', 4, 8, received) + struct.pack('<HHQ', 5, 8, dropped) + b'\x00\x00\x00\x00'
+    return _pcapng_block(5, struct.pack('<III', interface_id, ticks >> 32, ticks & 0xFFFFFFFF) + options)
+
+
+def _pcapng_block(block_type: int, body: bytes) -> bytes:
+    length = 12 + len(body)
+    return struct.pack('<II', block_type, length) + body + struct.pack('<I', length)
+
+
+def write_pcapng(path: str, packets: List[bytes], start_time: float = 1700000000.0, interval: float = 0.0005,
+                 dropped: int = 0):
+    """写入pcapng文件，末尾附带接口统计块"""
+    with open(path, 'wb') as f:
+        f.write(pcapng_section_header())
+        f.write(pcapng_interface_description())
+        for index, packet in enumerate(packets):
+            f.write(pcapng_enhanced_packet(packet, start_time + index * interval))
+        f.write(pcapng_interface_statistics(start_time + len(packets) * interval, len(packets) + dropped, dropped))
+
+
+def generate_publish_capture(path: str, stream_key: str = "stream-1234567890?expire=1700086400&sign=abcdef",
+                             server: str = "rtmp://push-rtmp-l11.douyincdn.com/third",
+                             media_bytes: int = 200000, fmt: Optional[str] = None, reorder: float = 0.05,
+                             retransmit: float = 0.02, noise: int = 100, seed: int = 0) -> Dict:
+    """
+    生成一个包含推流会话的捕获文件，代替真实网卡捕获用于验证和基准测试
+
+    参数:
+        path: 输出文件路径
+        stream_key: 推流码
+        server: 服务器地址
+        media_bytes: 推流后的音视频数据量
+        fmt: 'pcap' 或 'pcapng'，默认按扩展名判断
+        reorder: TCP段乱序概率
+        retransmit: TCP段重传概率
+        noise: 无关连接的数据包规模
+        seed: 随机种子
+
+    返回:
+        期望的解码结果 {'server': ..., 'stream_key': ..., 'app': ..., 'packets': 数据包数}
+    """
+    client_data, server_data = build_publish_session(stream_key, server, media_bytes, seed=seed)
+    flows = [tcp_conversation(client_data, server_data, reorder=reorder, retransmit=retransmit, seed=seed)]
+    if noise:
+        flows.append(noise_packets(noise, seed=seed + 1))
+    packets = interleave(flows, seed=seed)
+
+    if fmt is None:
+        fmt = 'pcapng' if path.endswith('.pcapng') else 'pcap'
+    if fmt == 'pcapng':
+        write_pcapng(path, packets)
+    else:
+        write_pcap(path, packets)
+    return {'server': server, 'stream_key': stream_key, 'app': server.rstrip('/').rsplit('/', 1)[-1],
+            'packets': len(packets)}
+
+
+# 使用示例：生成合成捕获并用RtmpDecoder解码验证
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    from src.rtmp_decoder import RtmpDecoder
+
+    output_dir = tempfile.mkdtemp(prefix="synthetic_capture_")
+    for fmt in ('pcap', 'pcapng'):
+        path = os.path.join(output_dir, f"publish.{fmt}")
+        expected = generate_publish_capture(path, media_bytes=5000000)
+        decoder = RtmpDecoder()
+        start_time = time.perf_counter()
+        with open(path, 'rb') as f:
+            records = decoder.records(list(decoder.decode(f)))
+        elapsed = time.perf_counter() - start_time
+
+        ok = [record.stream_code for record in records] == [
+            expected['app'], expected['stream_key'], expected['stream_key'], expected['stream_key']] \
+            and all(record.server == expected['server'] for record in records)
+        print(f"{'✅' if ok else '❌'} {fmt}: {len(records)} 条命令，{expected['packets']} 个数据包，"
+              f"{elapsed * 1000:.1f} ms（{elapsed / expected['packets'] * 1e6:.2f} µs/包）")
+        for record in records:
+            print(f"   {record.frame_number}: {record.command}('{record.stream_code}') {record.server}")
+        print(f"   {decoder.get_stats()}")
@@ -0,0 +1,142 @@
+import os
+import random
+from typing import Optional, Tuple, Dict, List
+
+import cv2
+import numpy as np
+
+
+def load_templates(img_tmp_dir: str, names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    读取模板目录下的模板图像
+
+    Args:
+        img_tmp_dir: 模板目录
+        names: 可选，只读取指定的模板文件名
+
+    Returns:
+        模板文件名 -> BGR模板图像
+    """
+    if names is None:
+        names = sorted(name for name in os.listdir(img_tmp_dir) if name.lower().endswith('.png'))
+
+    templates = {}
+    for name in names:
+        template = cv2.imread(os.path.join(img_tmp_dir, name), cv2.IMREAD_COLOR)
+        if template is None:
+            print(f"❌ 无法加载模板图像: {name}")
+            continue
+        templates[name] = template
+    return templates
+
+
+def scale_template(template: np.ndarray, scale: float) -> np.ndarray:
+    """按DPI缩放比例缩放模板，模拟高DPI窗口中的控件"""
+    if abs(scale - 1.0) <= 0.05:
+        return template
+    template_h, template_w = template.shape[:2]
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    return cv2.resize(template, (max(1, int(round(template_w * scale))), max(1, int(round(template_h * scale)))),
+                      interpolation=interpolation)
+
+
+def make_background(size: Tuple[int, int], seed: int = 0) -> np.ndarray:
+    """
+    生成类似直播伴侣界面的深色背景（渐变、色块和噪声）
+
+    Args:
+        size: 窗口尺寸 (宽度, 高度)
+        seed: 随机种子
+
+    Returns:
+        BGR背景图像
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+
+    gradient = np.linspace(28, 48, height, dtype=np.float32)[:, None]
+    frame = np.repeat(np.repeat(gradient, width, axis=1)[:, :, None], 3, axis=2)
+
+    # 随机色块模拟面板和按钮
+    for _ in range(12):
+        x = int(rng.integers(0, max(1, width - 40)))
+        y = int(rng.integers(0, max(1, height - 20)))
+        w = int(rng.integers(40, max(41, width // 4)))
+        h = int(rng.integers(20, max(21, height // 6)))
+        frame[y:y + h, x:x + w] = rng.integers(20, 90, 3)
+
+    frame += rng.normal(0, 3, frame.shape).astype(np.float32)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def random_placements(templates: Dict[str, np.ndarray], size: Tuple[int, int], seed: int = 0,
+                      max_attempts: int = 200) -> Dict[str, Tuple[int, int]]:
+    """
+    为模板生成互不重叠的随机位置
+
+    Args:
+        templates: 模板文件名 -> 已按DPI缩放的模板图像
+        size: 窗口尺寸 (宽度, 高度)
+        seed: 随机种子
+        max_attempts: 每个模板寻找不重叠位置的最大尝试次数
+
+    Returns:
+        模板文件名 -> 左上角坐标 (x, y)，放不下的模板不会出现在结果中
+    """
+    width, height = size
+    rnd = random.Random(seed)
+    occupied = []
+    placements = {}
+
+    for name, template in templates.items():
+        template_h, template_w = template.shape[:2]
+        if template_w > width or template_h > height:
+            continue
+        for _ in range(max_attempts):
+            x = rnd.randint(0, width - template_w)
+            y = rnd.randint(0, height - template_h)
+            rect = (x, y, x + template_w, y + template_h)
+            if all(rect[2] <= other[0] or rect[0] >= other[2] or rect[3] <= other[1] or rect[1] >= other[3]
+                   for other in occupied):
+                occupied.append(rect)
+                placements[name] = (x, y)
+                break
+
+    return placements
+
+
+def compose_frame(img_tmp_dir: str, names: List[str], size: Tuple[int, int] = (1280, 800), scale: float = 1.0,
+                  seed: int = 0, placements: Optional[Dict[str, Tuple[int, int]]] = None
+                  ) -> Tuple[np.ndarray, Dict[str, Tuple[int, int, int, int]]]:
+    """
+    合成一张嵌入了模板的窗口截图
+
+    Args:
+        img_tmp_dir: 模板目录
+        names: 需要嵌入的模板文件名
+        size: 窗口物理像素尺寸 (宽度, 高度)
+        scale: DPI缩放比例，模板会按该比例放大后嵌入
+        seed: 随机种子
+        placements: 可选，指定模板左上角物理像素坐标，未指定的模板随机放置
+
+    Returns:
+        (BGR截图, 模板文件名 -> 嵌入位置 (x, y, 宽度, 高度))
+    """
+    templates = {name: scale_template(template, scale)
+                 for name, template in load_templates(img_tmp_dir, names).items()}
+    frame = make_background(size, seed)
+
+    positions = dict(placements or {})
+    missing = {name: template for name, template in templates.items() if name not in positions}
+    positions.update(random_placements(missing, size, seed))
+
+    embedded = {}
+    for name, template in templates.items():
+        if name not in positions:
+            continue
+        x, y = positions[name]
+        template_h, template_w = template.shape[:2]
+        frame[y:y + template_h, x:x + template_w] = template
+        embedded[name] = (x, y, template_w, template_h)
+
+    return frame, embedded
@@ -0,0 +1,221 @@
+import os
+import threading
+import time
+from typing import Optional, Tuple, Dict
+
+import cv2
+import numpy as np
+
+
+class TemplateStore:
+    """模板图像缓存，一次性加载模板目录，按文件修改时间失效，并缓存各DPI缩放比例下的模板"""
+
+    def __init__(self, img_tmp_dir: str = "../img_tmp", extensions: Tuple[str, ...] = (".png",),
+                 mtime_check_interval: float = 1.0):
+        """
+        初始化模板缓存
+
+        Args:
+            img_tmp_dir: 模板目录
+            extensions: 需要预加载的模板文件扩展名
+            mtime_check_interval: 同一模板两次检查文件修改时间的最小间隔（秒），0表示每次都检查
+        """
+        self.img_tmp_dir = img_tmp_dir
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.mtime_check_interval = mtime_check_interval
+        self._entries: Dict[str, Dict] = {}  # 模板名 -> 缓存条目
+        self._preloaded = False
+        self._lock = threading.RLock()
+        self.hits = 0  # 命中缓存次数
+        self.misses = 0  # 从磁盘加载次数（包括首次加载和修改后重新加载）
+        self.reloads = 0  # 因文件修改而重新加载的次数
+        self.scaled_builds = 0  # 生成缩放模板的次数
+
+    def set_directory(self, img_tmp_dir: str):
+        """设置模板目录，清空已有缓存"""
+        with self._lock:
+            self.img_tmp_dir = img_tmp_dir
+            self._entries.clear()
+            self._preloaded = False
+
+    def preload(self) -> int:
+        """
+        一次性加载模板目录下的全部模板
+
+        Returns:
+            成功加载的模板数量
+        """
+        with self._lock:
+            self._preloaded = True
+            if not os.path.isdir(self.img_tmp_dir):
+                print(f"❌ 模板目录不存在: {self.img_tmp_dir}")
+                return 0
+
+            loaded = 0
+            for file_name in sorted(os.listdir(self.img_tmp_dir)):
+                if not file_name.lower().endswith(self.extensions):
+                    continue
+                if file_name in self._entries:
+                    loaded += 1
+                    continue
+                if self._load(file_name) is not None:
+                    loaded += 1
+            return loaded
+
+    def get(self, template_path: str, scale: float = 1.0) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+        """
+        获取模板图像
+
+        Args:
+            template_path: 模板图像文件名（相对于模板目录）
+            scale: DPI缩放比例，不为1.0时返回按该比例缩放后的模板
+
+        Returns:
+            (模板图像, (宽度, 高度)) 或 (None, None)
+        """
+        with self._lock:
+            if not self._preloaded:
+                self.preload()
+
+            entry = self._entries.get(template_path)
+            if entry is not None and self._is_stale(entry):
+                self.reloads += 1
+                entry = None
+
+            if entry is None:
+                entry = self._load(template_path)
+                if entry is None:
+                    return None, None
+            else:
+                self.hits += 1
+
+            return self._get_variant(entry, scale)
+
+    def get_downsampled_gray(self, template_path: str, scale: float = 1.0,
+                             factor: float = 0.5) -> Tuple[Optional[np.ndarray], Optional[Tuple[int, int]]]:
+        """
+        获取降采样后的灰度模板，用于金字塔粗匹配
+
+        Args:
+            template_path: 模板图像文件名
+            scale: DPI缩放比例
+            factor: 降采样系数，如0.5表示宽高各缩小一半
+
+        Returns:
+            (灰度模板图像, (宽度, 高度)) 或 (None, None)
+        """
+        with self._lock:
+            template, template_size = self.get(template_path, scale)
+            if template is None:
+                return None, None
+
+            entry = self._entries[template_path]
+            variant_key = ('gray', round(scale, 2), round(factor, 3))
+            variant = entry['variants'].get(variant_key)
+            if variant is None:
+                template_w, template_h = template_size
+                new_width = max(1, int(template_w * factor))
+                new_height = max(1, int(template_h * factor))
+                gray = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+                small = cv2.resize(gray, (new_width, new_height), interpolation=cv2.INTER_AREA)
+                variant = (small, (new_width, new_height))
+                entry['variants'][variant_key] = variant
+                self.scaled_builds += 1
+
+            return variant
+
+    def invalidate(self, template_path: Optional[str] = None):
+        """使指定模板（或全部模板）的缓存失效"""
+        with self._lock:
+            if template_path is None:
+                self._entries.clear()
+                self._preloaded = False
+            else:
+                self._entries.pop(template_path, None)
+
+    def get_stats(self) -> Dict:
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'reloads': self.reloads,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'templates': len(self._entries),
+                'scaled_variants': sum(len(entry['variants']) for entry in self._entries.values()),
+                'scaled_builds': self.scaled_builds
+            }
+
+    def reset_stats(self):
+        """重置统计计数"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.reloads = 0
+            self.scaled_builds = 0
+
+    def _load(self, template_path: str) -> Optional[Dict]:
+        """从磁盘加载模板并写入缓存"""
+        self.misses += 1
+        full_path = os.path.join(self.img_tmp_dir, template_path)
+
+        try:
+            mtime = os.path.getmtime(full_path)
+        except OSError:
+            print(f"❌ 模板文件不存在: {full_path}")
+            self._entries.pop(template_path, None)
+            return None
+
+        try:
+            template = cv2.imread(full_path, cv2.IMREAD_COLOR)
+        except Exception as e:
+            print(f"❌ 加载模板失败: {e}")
+            return None
+
+        if template is None:
+            print(f"❌ 无法加载模板图像: {full_path}")
+            return None
+
+        template_h, template_w = template.shape[:2]
+        entry = {
+            'path': full_path,
+            'image': template,
+            'size': (template_w, template_h),
+            'mtime': mtime,
+            'checked_at': time.monotonic(),
+            'variants': {}  # 缩放比例或('gray', 缩放比例, 降采样系数) -> (模板图像, (宽度, 高度))
+        }
+        self._entries[template_path] = entry
+        return entry
+
+    def _is_stale(self, entry: Dict) -> bool:
+        """检查缓存条目对应的文件是否已被修改或删除"""
+        now = time.monotonic()
+        if now - entry['checked_at'] < self.mtime_check_interval:
+            return False
+
+        entry['checked_at'] = now
+        try:
+            return os.path.getmtime(entry['path']) != entry['mtime']
+        except OSError:
+            return True
+
+    def _get_variant(self, entry: Dict, scale: float) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """获取指定缩放比例的模板，首次请求时生成并缓存"""
+        if abs(scale - 1.0) <= 0.05:
+            return entry['image'], entry['size']
+
+        scale_key = round(scale, 2)
+        variant = entry['variants'].get(scale_key)
+        if variant is None:
+            template_w, template_h = entry['size']
+            new_width = max(1, int(round(template_w * scale_key)))
+            new_height = max(1, int(round(template_h * scale_key)))
+            interpolation = cv2.INTER_AREA if scale_key < 1.0 else cv2.INTER_CUBIC
+            scaled = cv2.resize(entry['image'], (new_width, new_height), interpolation=interpolation)
+            variant = (scaled, (new_width, new_height))
+            entry['variants'][scale_key] = variant
+            self.scaled_builds += 1
+
+        return variant
@@ -0,0 +1,84 @@
+import time
+from typing import Any, Callable, NamedTuple
+
+
+class WaitResult(NamedTuple):
+    """条件等待的结果"""
+    satisfied: bool  # 条件是否在截止时间前满足
+    waited: float  # 实际等待时间（秒）
+    polls: int  # 检查条件的次数
+    value: Any = None  # 条件满足时条件函数的返回值
+
+
+def poll_until(condition: Callable[[], Any], timeout: float, initial_interval: float = 0.02,
+               max_interval: float = 0.25, backoff: float = 1.5,
+               sleep: Callable[[float], None] = time.sleep) -> WaitResult:
+    """
+    自适应轮询直到条件满足或超时
+
+    刚开始等待时界面最可能马上响应，所以先以较短间隔检查，之后按backoff逐步放宽到max_interval；
+    每次休眠都不会超过剩余时间，截止时间到达时再检查最后一次
+
+    Args:
+        condition: 条件函数，返回真值表示条件满足
+        timeout: 最长等待时间（秒）
+        initial_interval: 首次检查后的轮询间隔（秒）
+        max_interval: 最大轮询间隔（秒）
+        backoff: 每次未满足后轮询间隔的放大倍数
+        sleep: 休眠函数
+
+    Returns:
+        WaitResult
+    """
+    start_time = time.monotonic()
+    deadline = start_time + timeout
+    interval = initial_interval
+    polls = 0
+
+    while True:
+        polls += 1
+        value = condition()
+        now = time.monotonic()
+        if value:
+            return WaitResult(True, now - start_time, polls, value)
+        if now >= deadline:
+            return WaitResult(False, now - start_time, polls)
+        sleep(min(interval, deadline - now))
+        interval = min(max_interval, interval * backoff)
+
+
+class WaitStats:
+    """条件等待统计"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """重置统计计数"""
+        self.waits = 0
+        self.satisfied = 0
+        self.timeouts = 0
+        self.waited = 0.0  # 累计等待时间（秒）
+        self.polls = 0
+
+    def record(self, result: WaitResult) -> WaitResult:
+        """记录一次等待结果并原样返回"""
+        self.waits += 1
+        if result.satisfied:
+            self.satisfied += 1
+        else:
+            self.timeouts += 1
+        self.waited += result.waited
+        self.polls += result.polls
+        return result
+
+    def get_stats(self) -> dict:
+        """获取等待统计信息"""
+        return {
+            'waits': self.waits,
+            'satisfied': self.satisfied,
+            'timeouts': self.timeouts,
+            'waited': self.waited,
+            'polls': self.polls,
+            'average_wait': self.waited / self.waits if self.waits else 0.0
+        }
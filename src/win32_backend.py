@@ -0,0 +1,210 @@
+import ctypes
+import subprocess
+
+# 尝试设置为“每显示器DPI感知”，这是最推荐的方式
+try:
+    # 2 = PROCESS_PER_MONITOR_DPI_AWARE
+    ctypes.windll.shcore.SetProcessDpiAwareness(2)
+except Exception as e:
+    # 如果上面的API不存在（如Win8.1以下），尝试旧版API
+    try:
+        # 1 = PROCESS_SYSTEM_DPI_AWARE
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    except:
+        # 终极备选方案：使用user32的旧API
+        ctypes.windll.user32.SetProcessDPIAware()
+
+import os
+import time
+from typing import Optional, Tuple, Dict, List
+
+import win32api
+import win32con
+import win32gui
+import win32process
+
+from src.backends import FrameSource, InputSink
+from src.capture_session import CaptureSession
+from src.frame import Frame
+
+
+class Win32Backend(FrameSource, InputSink):
+    """基于win32gui/PrintWindow/SendMessage的截图和输入后端"""
+
+    def __init__(self):
+        """初始化Win32后端"""
+        self._capture_sessions: Dict[int, CaptureSession] = {}  # 窗口句柄 -> 截图会话（复用DC和位图）
+        self._closed_capture_stats: List[Dict] = []  # 已关闭截图会话的统计
+        self.click_interval = 0.0  # 单击时按下与抬起之间的间隔（秒），SendMessage同步返回，默认不需要间隔
+
+    def find_windows(self, class_name: str, window_name: str) -> List[int]:
+        """
+        通过class和title获取窗口句柄
+
+        Returns:
+            窗口句柄列表
+        """
+        target_windows = []
+
+        def enum_window_callback(hwnd, extra):
+            """枚举窗口回调"""
+            try:
+                current_class = win32gui.GetClassName(hwnd)
+                current_title = win32gui.GetWindowText(hwnd)
+
+                if (current_class, current_title) == extra:
+                    target_windows.append(hwnd)
+            except:
+                pass
+            return True
+
+        try:
+            win32gui.EnumWindows(enum_window_callback, (class_name, window_name))
+        except:
+            pass
+
+        return target_windows
+
+    def capture(self, hwnd: int) -> Optional[Frame]:
+        """通过窗口的截图会话捕获截图"""
+        session = self._capture_sessions.get(hwnd)
+        if session is None or session.closed:
+            session = CaptureSession(hwnd)
+            self._capture_sessions[hwnd] = session
+        return session.capture()
+
+    def get_window_rect(self, hwnd: int) -> Tuple[int, int, int, int]:
+        return win32gui.GetWindowRect(hwnd)
+
+    def screen_to_client(self, hwnd: int, point: Tuple[int, int]) -> Tuple[int, int]:
+        return win32gui.ScreenToClient(hwnd, point)
+
+    def get_dpi_scale(self, hwnd: int) -> float:
+        """精确获取窗口的DPI缩放比例"""
+        try:
+            # 方法1: 使用GetDpiForWindow (Windows 10 1607+)
+            dpi = ctypes.windll.user32.GetDpiForWindow(hwnd)
+            return dpi / 96.0
+        except:
+            try:
+                # 方法2: 使用GetDpiForSystem作为备用
+                dpi = ctypes.windll.user32.GetDpiForSystem()
+                return dpi / 96.0
+            except:
+                try:
+                    # 方法3: 通过窗口边框估算（兼容性方案）
+                    left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+                    window_width = right - left
+
+                    client_rect = win32gui.GetClientRect(hwnd)
+                    client_width = client_rect[2]
+
+                    if window_width > 0 and client_width > 0:
+                        estimated_border = (window_width - client_width) / 2
+                        if estimated_border > 5:
+                            return estimated_border / 8.0
+                except:
+                    pass
+
+        return 1.0
+
+    def get_window_info(self, hwnd: int) -> Dict:
+        return {
+            'title': win32gui.GetWindowText(hwnd),
+            'class_name': win32gui.GetClassName(hwnd)
+        }
+
+    def get_window_process_id(self, hwnd: int) -> int:
+        return win32process.GetWindowThreadProcessId(hwnd)[1]
+
+    def is_window(self, hwnd: int) -> bool:
+        return bool(win32gui.IsWindow(hwnd))
+
+    def is_minimized(self, hwnd: int) -> bool:
+        placement = win32gui.GetWindowPlacement(hwnd)
+        return placement[1] == win32con.SW_SHOWMINIMIZED
+
+    def is_transparent(self, hwnd: int) -> bool:
+        ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
+        return bool(ex_style & win32con.WS_EX_TRANSPARENT)
+
+    def release(self, hwnd: int):
+        """关闭并移除窗口的截图会话"""
+        session = self._capture_sessions.pop(hwnd, None)
+        if session is not None:
+            session.close()
+            self._closed_capture_stats.append(session.get_stats())
+
+    def get_capture_stats(self) -> Dict:
+        """获取截图资源分配统计（包括已关闭的会话），用于检查资源复用和泄漏"""
+        sessions = [session.get_stats() for session in self._capture_sessions.values()]
+        all_stats = sessions + self._closed_capture_stats
+        allocations = sum(stats['allocations'] for stats in all_stats)
+        releases = sum(stats['releases'] for stats in all_stats)
+        return {
+            'open_sessions': len(sessions),
+            'allocations': allocations,
+            'releases': releases,
+            'live_allocations': allocations - releases,
+            'captures': sum(stats['captures'] for stats in all_stats),
+            'failures': sum(stats['failures'] for stats in all_stats),
+            'sessions': sessions
+        }
+
+    def close(self):
+        """释放全部截图会话"""
+        for hwnd in list(self._capture_sessions):
+            self.release(hwnd)
+
+    def click(self, hwnd: int, x: int, y: int, button: str = 'left', click_type: str = 'single') -> bool:
+        """通过SendMessage向窗口发送鼠标消息"""
+        # 准备点击消息
+        lParam = win32api.MAKELONG(x, y)
+
+        if button == 'left':
+            down_msg = win32con.WM_LBUTTONDOWN
+            up_msg = win32con.WM_LBUTTONUP
+            dbl_msg = win32con.WM_LBUTTONDBLCLK
+        elif button == 'right':
+            down_msg = win32con.WM_RBUTTONDOWN
+            up_msg = win32con.WM_RBUTTONUP
+            dbl_msg = win32con.WM_RBUTTONDBLCLK
+        else:  # middle
+            down_msg = win32con.WM_MBUTTONDOWN
+            up_msg = win32con.WM_MBUTTONUP
+            dbl_msg = win32con.WM_MBUTTONDBLCLK
+
+        # 发送点击消息
+        try:
+            if click_type == 'double':
+                win32gui.SendMessage(hwnd, dbl_msg, win32con.MK_LBUTTON, lParam)
+                win32gui.SendMessage(hwnd, up_msg, 0, lParam)
+            else:
+                win32gui.SendMessage(hwnd, down_msg, win32con.MK_LBUTTON, lParam)
+                if self.click_interval:
+                    time.sleep(self.click_interval)
+                win32gui.SendMessage(hwnd, up_msg, 0, lParam)
+
+            return True
+        except Exception as e:
+            print(f"❌ 点击失败: {e}")
+            return False
+
+    def restore_window(self, hwnd: int):
+        win32gui.ShowWindow(hwnd, win32con.SW_SHOWNORMAL)  # 正常显示窗口
+
+    def close_window(self, hwnd: int):
+        win32gui.PostMessage(hwnd, win32con.WM_CLOSE, 0, 0)  # 关闭窗口（向窗口发送关闭消息）
+
+    def start_program(self, launcher_path: str) -> bool:
+        """启动程序"""
+        if not os.path.exists(launcher_path):
+            print(f"❌ 程序路径不存在: {launcher_path}")
+            return False
+
+        try:
+            subprocess.Popen(launcher_path)
+            return True
+        except Exception as e:
+            print(f"❌ 启动程序失败: {e}")
+            return False
@@ -0,0 +1,226 @@
+import threading
+import time
+from typing import Optional, Tuple, Dict, List
+
+from src.backends import FrameSource
+
+
+class WindowRegistry:
+    """
+    窗口注册表
+
+    按 (类名, 标题) 缓存窗口枚举结果，按窗口缓存DPI缩放比例和窗口角色（主窗口、副窗口、遮罩窗口）；
+    窗口销毁或尺寸变化时才失效，而不是每次轮询都重新枚举所有窗口
+    """
+
+    MAIN = 'main'  # 主窗口：同类窗口中面积最大的可见窗口
+    SECONDARY = 'secondary'  # 副窗口：弹出的对话框
+    OVERLAY = 'overlay'  # 遮罩窗口：鼠标穿透的透明窗口（截图全黑的窗口暂时按遮罩处理）
+
+    def __init__(self, frame_source: FrameSource, ttl: float = 1.0, black_overlay_ttl: float = 5.0):
+        """
+        初始化窗口注册表
+
+        Args:
+            frame_source: 截图来源，用于枚举窗口和查询窗口信息
+            ttl: 枚举结果的最长缓存时间（秒），过期后重新枚举以发现新弹出的窗口
+            black_overlay_ttl: 截图全黑的窗口按遮罩处理的时间（秒），过期后重新分类；
+                窗口最小化、恢复或GPU合成时可能偶尔截到全黑，不能据此永久跳过窗口
+        """
+        self.frame_source = frame_source
+        self.ttl = ttl
+        self.black_overlay_ttl = black_overlay_ttl
+        self._groups: Dict[Tuple[str, str], Dict] = {}  # (类名, 标题) -> {'hwnds', 'time'}
+        self._windows: Dict[int, Dict] = {}  # 窗口句柄 -> {'rect', 'dpi_scale', 'role', 'group'}
+        self._lock = threading.RLock()
+        self.enumerations = 0  # 实际枚举窗口的次数
+        self.cached_lookups = 0  # 使用缓存枚举结果的次数
+        self.dpi_queries = 0  # 实际查询DPI的次数
+        self.invalidations = 0  # 窗口销毁或尺寸变化导致的失效次数
+
+    def find(self, class_name: str, window_name: str) -> List[int]:
+        """
+        获取指定类名和标题的窗口句柄，缓存未过期且窗口都还存在时不重新枚举
+
+        Returns:
+            窗口句柄列表
+        """
+        key = (class_name, window_name)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is not None and time.monotonic() - group['time'] < self.ttl:
+                if all(self.frame_source.is_window(hwnd) for hwnd in group['hwnds']):
+                    self.cached_lookups += 1
+                    return list(group['hwnds'])
+
+            hwnds = self.frame_source.find_windows(class_name, window_name)
+            self.enumerations += 1
+            previous = group['hwnds'] if group else []
+            for hwnd in previous:
+                if hwnd not in hwnds:
+                    self._forget(hwnd)
+            for hwnd in hwnds:
+                self._windows.setdefault(hwnd, {'rect': None, 'dpi_scale': None, 'role': None, 'group': key})
+            self._groups[key] = {'hwnds': hwnds, 'time': time.monotonic()}
+            return list(hwnds)
+
+    def mark_stale(self):
+        """使所有枚举结果过期（执行操作后可能弹出新窗口），下次查找时重新枚举"""
+        with self._lock:
+            for group in self._groups.values():
+                group['time'] = float('-inf')
+
+    def get_dpi_scale(self, hwnd: int) -> float:
+        """获取窗口的DPI缩放比例，窗口尺寸没有变化时复用上次的结果"""
+        with self._lock:
+            window = self._validate(hwnd)
+            if window['dpi_scale'] is None:
+                window['dpi_scale'] = self.frame_source.get_dpi_scale(hwnd)
+                self.dpi_queries += 1
+            return window['dpi_scale']
+
+    def get_process_id(self, hwnd: int) -> int:
+        """获取窗口所属进程ID，窗口存在期间不会变化，只查询一次"""
+        with self._lock:
+            window = self._windows.setdefault(hwnd, {'rect': None, 'dpi_scale': None, 'role': None, 'group': None})
+            if window.get('process_id') is None:
+                window['process_id'] = self.frame_source.get_window_process_id(hwnd)
+            return window['process_id']
+
+    def get_role(self, hwnd: int) -> Optional[str]:
+        """
+        获取窗口角色，每个窗口只分类一次（尺寸变化后重新分类）
+
+        Returns:
+            'main'/'secondary'/'overlay'，窗口最小化暂时无法分类时返回None
+        """
+        with self._lock:
+            window = self._validate(hwnd)
+            overlay_until = window.get('overlay_until')
+            if overlay_until is not None and time.monotonic() >= overlay_until:
+                window.update(role=None, overlay_until=None)  # 截图全黑判定的遮罩已过期
+            if window['role'] is None:
+                self._classify_group(hwnd)
+            return window['role']
+
+    def note_frame(self, hwnd: int, black: bool):
+        """
+        记录一次截图结果：截图正常的窗口不再按截图全黑判定的遮罩处理
+
+        Args:
+            hwnd: 窗口句柄
+            black: 截图是否全黑
+        """
+        if black:
+            return
+        with self._lock:
+            window = self._windows.get(hwnd)
+            if window is not None and window.get('overlay_until') is not None:
+                window.update(role=None, overlay_until=None)
+
+    def invalidate(self, hwnd: int):
+        """窗口尺寸变化或截图失败时清除该窗口的缓存信息"""
+        with self._lock:
+            window = self._windows.get(hwnd)
+            if window is not None:
+                window.update(rect=None, dpi_scale=None, role=None, overlay_until=None)
+                self.invalidations += 1
+
+    def forget(self, hwnd: int):
+        """窗口已销毁，从注册表中移除"""
+        with self._lock:
+            self._forget(hwnd)
+            for group in self._groups.values():
+                if hwnd in group['hwnds']:
+                    group['hwnds'] = [other for other in group['hwnds'] if other != hwnd]
+
+    def get_stats(self) -> Dict:
+        """获取枚举和缓存统计信息"""
+        with self._lock:
+            return {
+                'enumerations': self.enumerations,
+                'cached_lookups': self.cached_lookups,
+                'dpi_queries': self.dpi_queries,
+                'invalidations': self.invalidations,
+                'windows': {hwnd: {'role': window['role'], 'dpi_scale': window['dpi_scale']}
+                            for hwnd, window in self._windows.items()}
+            }
+
+    def _forget(self, hwnd: int):
+        if self._windows.pop(hwnd, None) is not None:
+            self.invalidations += 1
+
+    def _validate(self, hwnd: int) -> Dict:
+        """检查窗口尺寸，变化时清除缓存的DPI和角色"""
+        window = self._windows.setdefault(hwnd, {'rect': None, 'dpi_scale': None, 'role': None, 'group': None})
+        try:
+            rect = self.frame_source.get_window_rect(hwnd)
+        except Exception:
+            rect = None
+        if window['rect'] is not None and rect != window['rect']:
+            self.invalidate(hwnd)
+            # 同组其他窗口的主/副角色依赖于面积比较，也需要重新分类
+            for other in self._windows.values():
+                if other['group'] == window['group'] and other['role'] != self.OVERLAY:
+                    other['role'] = None
+        window['rect'] = rect
+        return window
+
+    def _classify_group(self, hwnd: int):
+        """
+        分类窗口所在组中尚未分类的窗口
+
+        鼠标穿透的窗口为遮罩窗口；截图失败或全黑的窗口在black_overlay_ttl内暂时按遮罩处理；
+        同一进程的其余可见窗口中面积最大的为主窗口，其他为副窗口
+        """
+        window = self._windows[hwnd]
+        group = self._groups.get(window['group'])
+        members = group['hwnds'] if group and hwnd in group['hwnds'] else [hwnd]
+        process_id = self.get_process_id(hwnd)
+        members = [member for member in members if self.get_process_id(member) == process_id]
+
+        candidates = []
+        for member in members:
+            member_window = self._windows.setdefault(member, {'rect': None, 'dpi_scale': None, 'role': None,
+                                                              'group': window['group']})
+            if member_window['role'] == self.OVERLAY:
+                continue
+            if self.frame_source.is_minimized(member):
+                continue  # 最小化时无法判断，恢复后再分类
+            if member_window['rect'] is None:
+                member_window['rect'] = self._safe_rect(member)
+            if member_window['role'] is None:
+                if self.frame_source.is_transparent(member):
+                    member_window['role'] = self.OVERLAY
+                    continue
+                if self._is_black(member):
+                    member_window.update(role=self.OVERLAY, overlay_until=time.monotonic() + self.black_overlay_ttl)
+                    continue
+            candidates.append(member)
+
+        if not candidates:
+            return
+        main = max(candidates, key=lambda member: self._area(self._windows[member]['rect']))
+        for member in candidates:
+            self._windows[member]['role'] = self.MAIN if member == main else self.SECONDARY
+
+    def _is_black(self, hwnd: int) -> bool:
+        """窗口截图是否失败或全黑"""
+        try:
+            frame = self.frame_source.capture(hwnd)
+        except Exception:
+            frame = None
+        return frame is None or frame.is_mostly_black()
+
+    def _safe_rect(self, hwnd: int) -> Optional[Tuple[int, int, int, int]]:
+        try:
+            return self.frame_source.get_window_rect(hwnd)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _area(rect: Optional[Tuple[int, int, int, int]]) -> int:
+        if rect is None:
+            return 0
+        left, top, right, bottom = rect
+        return max(0, right - left) * max(0, bottom - top)
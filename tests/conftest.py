@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试以项目根目录为导入根（与 python -m src.xxx 的用法一致）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import os
+
+from src.capture_buffer import CaptureBuffer
+
+
+def lines(start, stop):
+    return [f"{number};frame {number}" for number in range(start, stop)]
+
+
+def test_tail_and_range_across_spill_boundary():
+    buffer = CaptureBuffer(capacity=4, block_size=3)
+    for line in lines(1, 21):
+        buffer.append(line)
+
+    stats = buffer.get_stats()
+    assert len(buffer) == 20
+    assert stats['in_memory'] == 4 and stats['spilled'] == 16
+    assert buffer.tail(4) == lines(17, 21)  # 全部在内存中
+    assert buffer.tail(6) == lines(15, 21)  # 跨越溢出文件和内存
+    assert buffer.range(0) == lines(1, 21)
+    assert buffer.range(5, 9) == lines(6, 10)  # 起点在稀疏索引块中间
+    assert buffer.range(15, 17) == lines(16, 18)  # 最后一条溢出记录到第一条内存记录
+    buffer.close()
+
+
+def test_since_frame_in_spill_and_memory():
+    buffer = CaptureBuffer(capacity=4, block_size=3)
+    for line in lines(1, 21):
+        buffer.append(line)
+
+    assert buffer.since_frame(16) == lines(17, 21)
+    assert buffer.since_frame(4, limit=3) == lines(5, 8)
+    assert buffer.since_frame(0) == lines(1, 21)
+    assert buffer.since_frame(20) == []
+    buffer.close()
+
+
+def test_close_deletes_temporary_spill_file():
+    buffer = CaptureBuffer(capacity=2)
+    for line in lines(1, 10):
+        buffer.append(line)
+    path = buffer.get_stats()['spill_path']
+    assert os.path.exists(path)
+
+    buffer.close()
+
+    assert not os.path.exists(path)
+
+
+def test_clear_and_drop_without_spill():
+    buffer = CaptureBuffer(capacity=3, spill=False)
+    for line in lines(1, 8):
+        buffer.append(line)
+
+    assert buffer.get_stats()['dropped'] == 4
+    assert buffer.range(0) == lines(5, 8)
+    assert buffer.tail(10) == lines(5, 8)
+
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.tail(5) == []
@@ -0,0 +1,126 @@
+import stat
+import sys
+import time
+
+import pytest
+
+from src.dumpcap_capture import DumpcapCapturer
+from src.synthetic_capture import (build_publish_session, noise_packets, pcapng_enhanced_packet,
+                                   pcapng_interface_description, pcapng_interface_statistics, pcapng_section_header,
+                                   tcp_conversation)
+
+STREAM_KEY = "stream-1234567890?expire=1700086400&sign=abcdef"
+SERVER = "rtmp://push-rtmp-l11.douyincdn.com/third"
+
+# 模拟dumpcap：先输出捕获到的数据包，收到SIGINT后再输出一些数据包和接口统计块，然后退出
+FAKE_DUMPCAP = '''#!{python}
+import signal
+import sys
+import time
+
+
+def finish(*args):
+    with open({tail!r}, 'rb') as f:
+        sys.stdout.buffer.write(f.read())
+    sys.stdout.flush()
+    sys.stderr.write("Packets received/dropped on interface 'eth0': 1/1 (pcap:1/dumpcap:0/flushed:0)\\n")
+    sys.exit(0)
+
+
+signal.signal(signal.SIGINT, finish)
+with open({head!r}, 'rb') as f:
+    sys.stdout.buffer.write(f.read())
+sys.stdout.flush()
+while True:
+    time.sleep(0.05)
+'''
+
+
+def write_fake_dumpcap(tmp_path, head: bytes, tail: bytes) -> str:
+    (tmp_path / "head.bin").write_bytes(head)
+    (tmp_path / "tail.bin").write_bytes(tail)
+    script = tmp_path / "dumpcap"
+    script.write_text(FAKE_DUMPCAP.format(python=sys.executable, head=str(tmp_path / "head.bin"),
+                                          tail=str(tmp_path / "tail.bin")))
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+
+def write_stuck_dumpcap(tmp_path, head: bytes) -> str:
+    """不响应SIGINT/SIGTERM、也不再输出数据的dumpcap"""
+    (tmp_path / "head.bin").write_bytes(head)
+    script = tmp_path / "dumpcap"
+    script.write_text(f"""#!{sys.executable}
+import signal
+import sys
+import time
+
+signal.signal(signal.SIGINT, signal.SIG_IGN)
+signal.signal(signal.SIGTERM, signal.SIG_IGN)
+with open({str(tmp_path / "head.bin")!r}, 'rb') as f:
+    sys.stdout.buffer.write(f.read())
+sys.stdout.flush()
+while True:
+    time.sleep(0.05)
+""")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    return str(script)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="模拟的dumpcap通过SIGINT停止")
+def test_interface_statistics_after_stop_are_parsed(tmp_path):
+    client, server = build_publish_session(STREAM_KEY, SERVER, media_bytes=20000)
+    packets = tcp_conversation(client, server)
+    late = noise_packets(20)
+    head = pcapng_section_header() + pcapng_interface_description() + b''.join(
+        pcapng_enhanced_packet(packet, 1700000000.0 + index * 0.001) for index, packet in enumerate(packets))
+    tail = b''.join(pcapng_enhanced_packet(packet, 1700000001.0) for packet in late)
+    tail += pcapng_interface_statistics(1700000002.0, len(packets) + len(late) + 3, 3)
+
+    capturer = DumpcapCapturer(write_fake_dumpcap(tmp_path, head, tail), spill_path=str(tmp_path / "spill.txt"))
+    capturer.interface = "1"
+    capturer.capture_filter = ""
+    try:
+        assert capturer.start()
+        deadline = time.monotonic() + 10
+        while capturer.decoder is None or capturer.decoder.packets < len(packets):
+            assert time.monotonic() < deadline, "模拟的dumpcap输出未被读取"
+            time.sleep(0.02)
+
+        capturer.stop()
+        stats = capturer.get_capture_stats()
+    finally:
+        capturer.close()
+
+    # 停止后输出的数据包被丢弃，末尾的接口统计块仍被解析（优先于标准错误输出中的统计）
+    assert stats['kernel_received'] == len(packets) + len(late) + 3
+    assert stats['kernel_dropped'] == 3
+    assert stats['dissected'] == len(packets)
+    assert capturer.get_stream_info() == {'server': SERVER, 'stream_code': STREAM_KEY}
+    assert not capturer.thread.is_alive()
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="模拟的dumpcap通过信号停止")
+def test_stop_kills_dumpcap_that_ignores_interrupt(tmp_path):
+    head = pcapng_section_header() + pcapng_interface_description() + pcapng_enhanced_packet(
+        noise_packets(20)[0], 1700000000.0)
+    capturer = DumpcapCapturer(write_stuck_dumpcap(tmp_path, head), spill_path=str(tmp_path / "spill.txt"))
+    capturer.interface = "1"
+    capturer.capture_filter = ""
+    try:
+        assert capturer.start()
+        deadline = time.monotonic() + 10
+        while capturer.decoder is None or capturer.decoder.packets < 1:
+            assert time.monotonic() < deadline, "模拟的dumpcap输出未被读取"
+            time.sleep(0.02)
+
+        start_time = time.monotonic()
+        capturer.stop()
+        elapsed = time.monotonic() - start_time
+    finally:
+        capturer.close()
+
+    # 中断和终止都被忽略时强制结束进程，管道关闭后捕获线程随之退出
+    assert elapsed < 6
+    assert capturer.process.poll() is not None
+    assert not capturer.thread.is_alive()
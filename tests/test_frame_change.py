@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from src.application_operation import WindowController, TemplateSpec
+from src.frame_change import FrameChangeDetector
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import compose_frame, make_background
+
+IMG_TMP_DIR = "img_tmp"
+SIZE = (640, 360)
+BUTTON = TemplateSpec("main_start_live.png")
+
+
+def test_fingerprint_marks_only_changed_tiles():
+    detector = FrameChangeDetector(tiles=(4, 3), samples_per_tile=(8, 8))
+    frame = make_background(SIZE)
+    changed = frame.copy()
+    changed[0:120, 480:640] = 255  # 右上角图块
+
+    dirty = detector.compare(detector.fingerprint(frame), detector.fingerprint(changed))
+
+    assert dirty.shape == (3, 4)
+    assert dirty.tolist() == [[False, False, False, True], [False] * 4, [False] * 4]
+    assert detector.region_overlaps((500, 10, 20, 20), dirty, SIZE)
+    assert not detector.region_overlaps((10, 200, 100, 100), dirty, SIZE)
+
+
+def test_noise_below_tolerance_is_unchanged():
+    detector = FrameChangeDetector(tolerance=8)
+    frame = make_background(SIZE)
+    noisy = np.clip(frame.astype(np.int16) + 2, 0, 255).astype(np.uint8)
+
+    dirty = detector.compare(detector.fingerprint(frame), detector.fingerprint(noisy))
+
+    assert not dirty.any()
+    assert not detector.has_changed(detector.fingerprint(frame), detector.fingerprint(noisy))
+    assert detector.get_stats()['unchanged_frames'] == 1
+
+
+def test_first_frame_invalidates_everything():
+    detector = FrameChangeDetector()
+    fingerprint = detector.fingerprint(make_background(SIZE))
+
+    assert detector.compare(None, fingerprint) is None
+    assert detector.has_changed(None, fingerprint)
+    assert detector.get_stats()['changed_frames'] == 1
+
+
+@pytest.fixture
+def replay():
+    button_frame, embedded = compose_frame(IMG_TMP_DIR, [BUTTON.template_path], SIZE,
+                                           placements={BUTTON.template_path: (40, 40)})
+    elsewhere = button_frame.copy()
+    elsewhere[280:360, 520:640] = 255  # 远离按钮的区域变化
+    moved, _ = compose_frame(IMG_TMP_DIR, [BUTTON.template_path], SIZE,
+                             placements={BUTTON.template_path: (400, 200)})
+
+    backend = ReplayBackend(advance='manual')
+    hwnd = backend.add_window([button_frame, elsewhere, moved])
+    controller = WindowController(launcher_path=None, frame_source=backend)
+    controller.set_img_tmp_dir(IMG_TMP_DIR)
+    controller.set_window_handle(hwnd)
+    yield backend, controller, hwnd
+    controller.close()
+
+
+def test_unchanged_frame_reuses_cached_match(replay):
+    backend, controller, hwnd = replay
+
+    first = controller.match_all([BUTTON])
+    second = controller.match_all([BUTTON])  # 新截图，内容相同
+
+    assert first and second == first
+    assert controller.evaluated_match_count == 1
+    assert controller.cached_match_count == 1
+    assert not controller.last_frame_changed(hwnd)
+
+
+def test_change_outside_match_region_keeps_cache(replay):
+    backend, controller, hwnd = replay
+    first = controller.match_all([BUTTON])
+
+    backend.advance(hwnd)
+    assert controller.match_all([BUTTON]) == first
+
+    assert controller.evaluated_match_count == 1
+    assert controller.cached_match_count == 1
+    assert controller.last_frame_changed(hwnd)
+
+
+def test_change_over_match_region_rematches(replay):
+    backend, controller, hwnd = replay
+    first = controller.match_all([BUTTON])
+
+    backend.advance(hwnd, 2)
+    moved = controller.match_all([BUTTON])
+
+    assert controller.evaluated_match_count == 2
+    assert moved[0]['client_position'] != first[0]['client_position']
+
+
+def test_cached_match_expires_after_max_age(replay):
+    backend, controller, hwnd = replay
+    controller.frame_cache_max_age = 0.0
+    controller.match_all([BUTTON])
+
+    controller.match_all([BUTTON])
+
+    assert controller.evaluated_match_count == 2
+    assert controller.cached_match_count == 0
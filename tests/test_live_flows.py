@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from src.application_operation import WindowController
+from src.live_flows import start_live, stop_live
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import compose_frame, load_templates
+
+IMG_TMP_DIR = "img_tmp"
+SIZE = (640, 400)
+# 模板在窗口中的固定位置（左上角物理像素坐标），便于计算期望的点击位置
+PLACEMENTS = {
+    "main_start_live.png": (520, 340),
+    "main_stop_live.png": (540, 350),
+    "main_live_stopped_return.png": (560, 360),
+    "sec_no_sound_reminder.png": (180, 100),
+    "sec_restore_live_broadcast_screen.png": (180, 100),
+    "sec_true_stop_live_is.png": (180, 100),
+}
+
+
+def screen(*names):
+    """合成一帧：相同背景上显示指定模板"""
+    frame, _ = compose_frame(IMG_TMP_DIR, list(names), SIZE, placements=PLACEMENTS)
+    return frame
+
+
+def click_position(name, ratio=(0.5, 0.5)):
+    """模板按点击比例换算出的窗口坐标（与WindowController的取整方式相同）"""
+    template_h, template_w = load_templates(IMG_TMP_DIR, [name])[name].shape[:2]
+    x, y = PLACEMENTS[name]
+    return x + int(template_w * ratio[0]), y + int(template_h * ratio[1])
+
+
+def clicks(backend):
+    return [(click['hwnd'], click['frame_index'], click['position']) for click in backend.clicks]
+
+
+@pytest.fixture
+def backend():
+    return ReplayBackend(advance='click')
+
+
+@pytest.fixture
+def controller(backend):
+    controller = WindowController(launcher_path=None, frame_source=backend)
+    controller.set_img_tmp_dir(IMG_TMP_DIR)
+    yield controller
+    controller.close()
+
+
+def test_start_live_happy_path(backend, controller):
+    main = backend.add_window([
+        screen("main_start_live.png"),  # 未开播，点击开始直播
+        screen("sec_no_sound_reminder.png"),  # 弹出无声音提醒，点击确认
+        screen("main_stop_live.png"),  # 已开播
+    ])
+
+    stats = start_live(controller, timeout=30)
+
+    assert stats['finished']
+    assert stats['state'] == 'stop_live'
+    assert clicks(backend) == [
+        (main, 0, click_position("main_start_live.png")),
+        (main, 1, click_position("sec_no_sound_reminder.png", (0.5, 0.875))),
+    ]
+
+
+def test_stop_live_happy_path(backend, controller):
+    main = backend.add_window([
+        screen("main_stop_live.png"),  # 直播中，点击关闭直播
+        screen("sec_true_stop_live_is.png"),  # 确认关闭直播
+        screen("main_live_stopped_return.png"),  # 直播已结束
+    ])
+
+    stats = stop_live(controller, timeout=30)
+
+    assert stats['finished']
+    assert stats['state'] == 'live_stopped_return'
+    assert clicks(backend) == [
+        (main, 0, click_position("main_stop_live.png")),
+        (main, 1, click_position("sec_true_stop_live_is.png", (0.75, 0.875))),
+    ]
+
+
+def test_start_live_times_out_without_known_screen(backend, controller):
+    backend.add_window([screen()])  # 界面中没有任何已知按钮
+
+    stats = start_live(controller, timeout=1.0)
+
+    assert not stats['finished']
+    assert stats['state'] == 'unknown'
+    assert stats['polls'] > 1
+    assert clicks(backend) == []
+
+
+def test_start_live_when_dialog_window_disappears_mid_flow(backend, controller):
+    # 点击主窗口后弹窗被关闭：同一轮轮询中弹窗已经截不到图，后续枚举不再包含它
+    main = backend.add_window([screen("main_start_live.png"), screen("main_stop_live.png")])
+    dialog = backend.add_window([screen("sec_restore_live_broadcast_screen.png")], position=(100, 100))
+    click = backend.click
+
+    def click_and_close_dialog(*args, **kwargs):
+        clicked = click(*args, **kwargs)
+        backend.close_window(dialog)
+        return clicked
+
+    backend.click = click_and_close_dialog
+
+    stats = start_live(controller, timeout=30)
+
+    assert stats['finished']
+    assert stats['state'] == 'stop_live'
+    assert clicks(backend) == [(main, 0, click_position("main_start_live.png"))]
+    assert dialog not in controller._get_windows("Chrome_WidgetWin_1", "直播伴侣")
+
+
+def test_start_live_ignores_transparent_overlay(backend, controller):
+    main = backend.add_window([
+        screen("main_start_live.png"),
+        screen("sec_no_sound_reminder.png"),
+        screen("main_stop_live.png"),
+    ])
+    overlay = backend.add_window([np.zeros((SIZE[1], SIZE[0], 3), np.uint8)], transparent=True)
+
+    stats = start_live(controller, timeout=30)
+
+    assert stats['finished']
+    assert clicks(backend) == [
+        (main, 0, click_position("main_start_live.png")),
+        (main, 1, click_position("sec_no_sound_reminder.png", (0.5, 0.875))),
+    ]
+    assert controller.scheduler.get_stats()[overlay]['polls'] <= stats['polls']
@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.application_operation import WindowController
+from src.live_flows import START_LIVE_STATES, WINDOW_CLASS, WINDOW_TITLE
+from src.live_state_machine import LiveStateMachine
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import make_background
+from src.window_registry import WindowRegistry
+
+IMG_TMP_DIR = "img_tmp"
+
+
+def test_overlay_window_does_not_busy_loop():
+    # 遮罩窗口不匹配，但仍要推迟下次轮询时间，否则run()不会休眠，1秒内轮询数万次
+    backend = ReplayBackend(advance='manual')
+    main = backend.add_window([make_background((640, 400))])
+    overlay = backend.add_window([np.zeros((300, 400, 3), np.uint8)], transparent=True)
+    controller = WindowController(frame_source=backend)
+    controller.set_img_tmp_dir(IMG_TMP_DIR)
+    machine = LiveStateMachine(START_LIVE_STATES, WINDOW_CLASS, WINDOW_TITLE, start_program=False)
+
+    try:
+        assert machine.run(controller, timeout=1.5) is None
+        assert controller.get_window_role(overlay) == WindowRegistry.OVERLAY
+    finally:
+        controller.close()
+
+    # 两个窗口的间隔都从0.02秒指数增长到最长1秒，1.5秒内各轮询不超过十几次
+    stats = controller.scheduler.get_stats()
+    assert machine.polls < 50
+    assert 0 < stats[overlay]['polls'] < 20
+    assert stats[overlay]['idle_polls'] == stats[overlay]['polls']
+    assert 0 < stats[main]['polls'] < 20
+    assert backend.clicks == []
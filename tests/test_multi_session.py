@@ -0,0 +1,41 @@
+import threading
+import time
+
+from src.multi_session import MultiSessionController
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import make_background
+
+CLASS_NAME = "Chrome_WidgetWin_1"
+TITLE = "直播伴侣"
+
+
+def tracking_flow(active, peaks, lock):
+    """记录每个控制器上同时运行的流程数"""
+    def flow(controller):
+        with lock:
+            active[controller] = active.get(controller, 0) + 1
+            peaks[controller] = max(peaks.get(controller, 0), active[controller])
+        time.sleep(0.05)
+        with lock:
+            active[controller] -= 1
+        return controller.process_id
+    return flow
+
+
+def test_flows_on_one_session_never_share_the_controller_concurrently():
+    backend = ReplayBackend(advance='manual')
+    for process_id in (1, 2):
+        backend.add_window([make_background((320, 200))], process_id=process_id)
+    active, peaks, lock = {}, {}, threading.Lock()
+
+    with MultiSessionController("img_tmp", frame_source=backend, max_workers=8,
+                                session_concurrency=4) as multi:
+        sessions = multi.discover_sessions(CLASS_NAME, TITLE)
+        flow = tracking_flow(active, peaks, lock)
+        futures = [multi.submit(session, flow) for session in sessions for _ in range(4)]
+        results = sorted(future.result() for future in futures)
+
+    assert results == [1] * 4 + [2] * 4
+    assert all(session.max_concurrency == 1 for session in sessions)
+    assert sorted(peaks.values()) == [1, 1]  # 同一控制器上的流程逐个运行
+    assert all(session.get_stats()['runs'] == 4 for session in sessions)
@@ -0,0 +1,151 @@
+import io
+import os
+
+import pytest
+
+from src.rtmp_decoder import RtmpDecoder, RtmpChunkParser, decode_amf0, decode_file, read_packets
+from src.synthetic_capture import (build_publish_session, encode_amf0, encode_chunks, generate_publish_capture,
+                                   tcp_conversation, write_pcap, write_pcapng)
+
+STREAM_KEY = "stream-1234567890?expire=1700086400&sign=abcdef"
+SERVER = "rtmp://push-rtmp-l11.douyincdn.com/third"
+
+
+def expected_records(stream_key=STREAM_KEY, server=SERVER):
+    app = server.rsplit('/', 1)[-1]
+    return [('connect', app, server), ('releaseStream', stream_key, server),
+            ('FCPublish', stream_key, server), ('publish', stream_key, server)]
+
+
+def decode(path, **kwargs):
+    decoder = RtmpDecoder(**kwargs)
+    with open(path, 'rb') as f:
+        commands = list(decoder.decode(f))
+    return decoder, commands
+
+
+@pytest.mark.parametrize("fmt", ["pcap", "pcapng"])
+@pytest.mark.parametrize("seed", range(4))
+def test_decode_with_reordering_and_retransmission(tmp_path, fmt, seed):
+    path = str(tmp_path / f"publish.{fmt}")
+    generate_publish_capture(path, STREAM_KEY, SERVER, media_bytes=200000, reorder=0.3, retransmit=0.2,
+                             seed=seed)
+
+    records = decode_file(path)
+
+    assert [(record.command, record.stream_code, record.server) for record in records] == expected_records()
+    assert all(record.frame_number > 0 for record in records)
+
+
+def test_amf_strings_match_tshark_field_order(tmp_path):
+    path = str(tmp_path / "publish.pcapng")
+    generate_publish_capture(path, STREAM_KEY, SERVER, reorder=0.0, retransmit=0.0)
+
+    _, commands = decode(path)
+
+    assert commands[0].strings == ['connect', 'app', 'third', 'type', 'nonprivate', 'flashVer',
+                                   'FMLE/3.0 (compatible; FMSc/1.0)', 'swfUrl', SERVER, 'tcUrl', SERVER]
+    assert commands[3].strings == ['publish', STREAM_KEY, 'live']
+    assert commands[3].info == f"publish('{STREAM_KEY}')"
+
+
+def test_small_chunk_size_and_full_media_parse(tmp_path):
+    # 默认分块大小128，长推流码跨多个分块；publish后继续解析全部音视频分块
+    stream_key = "k" * 500 + "?sign=x"
+    client, server = build_publish_session(stream_key, "rtmp://a.example.com/live", media_bytes=300000,
+                                           chunk_size=128, seed=3)
+    path = str(tmp_path / "small_chunks.pcap")
+    write_pcap(path, tcp_conversation(client, server, reorder=0.2, retransmit=0.1, seed=3))
+
+    decoder, commands = decode(path, stop_after_publish=False)
+
+    assert [command.stream_code for command in commands] == ['live'] + [stream_key] * 3
+    assert decoder.get_stats()['desynchronized'] == 0
+
+
+def test_fin_releases_all_flow_state(tmp_path):
+    path = str(tmp_path / "publish.pcapng")
+    generate_publish_capture(path, reorder=0.1, retransmit=0.1)
+
+    decoder, commands = decode(path)
+
+    assert len(commands) == 4
+    assert decoder.get_stats()['finished'] == 1
+    assert len(decoder._flows) == 0
+    assert len(decoder._servers) == 0
+
+
+def test_idle_flows_without_fin_expire(tmp_path):
+    client, server = build_publish_session(STREAM_KEY, SERVER, media_bytes=50000)
+    path = str(tmp_path / "no_fin.pcap")
+    write_pcap(path, tcp_conversation(client, server, close=False), interval=1.0)
+
+    decoder, commands = decode(path, idle_timeout=5.0)
+
+    assert len(commands) == 4
+    assert decoder.get_stats()['expired'] > 0
+    assert len(decoder._flows) <= 1
+
+
+def test_pcapng_interface_statistics(tmp_path):
+    client, server = build_publish_session(STREAM_KEY, SERVER, media_bytes=10000)
+    packets = tcp_conversation(client, server)
+    path = str(tmp_path / "stats.pcapng")
+    write_pcapng(path, packets, dropped=7)
+
+    stats = []
+    with open(path, 'rb') as f:
+        count = sum(1 for _ in read_packets(f, stats))
+
+    assert count == len(packets)
+    assert [(item.received, item.dropped) for item in stats] == [(len(packets) + 7, 7)]
+
+
+def test_read_packets_handles_short_reads(tmp_path):
+    # 管道每次只返回部分数据时仍能完整读取
+    path = str(tmp_path / "publish.pcapng")
+    generate_publish_capture(path, media_bytes=20000, noise=0)
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    class Trickle(io.RawIOBase):
+        def __init__(self):
+            self.position = 0
+
+        def read(self, size=-1):
+            chunk = data[self.position:self.position + min(size, 7)]
+            self.position += len(chunk)
+            return chunk
+
+    with open(path, 'rb') as f:
+        expected = [packet.data for packet in read_packets(f)]
+    assert [packet.data for packet in read_packets(Trickle())] == expected
+
+
+def test_amf0_round_trip():
+    values = ['connect', 1.0, {'app': 'live', 'nested': {'flag': True, 'none': None}}, [1.0, 'x'], 'y' * 70000]
+    payload = b''.join(encode_amf0(value) for value in values)
+
+    decoded, strings = decode_amf0(payload)
+
+    assert decoded == values
+    assert strings == ['connect', 'app', 'live', 'nested', 'flag', 'none', 'x', 'y' * 70000]
+
+
+def test_chunk_parser_accepts_arbitrary_splits():
+    payload = b''.join(encode_amf0(value) for value in ['publish', 5.0, None, 'key', 'live'])
+    stream = b'\x03' + bytes(3072) + encode_chunks(3, 20, 1, payload, 128)
+
+    parser = RtmpChunkParser()
+    messages = []
+    for position in range(0, len(stream), 5):
+        messages.extend(parser.feed(stream[position:position + 5]))
+
+    assert messages == [(20, 1, payload)]
+    assert not parser.failed
+
+
+def test_non_rtmp_flow_is_ignored():
+    parser = RtmpChunkParser()
+    assert parser.feed(b'\x16\x03\x01' + os.urandom(100)) == []
+    assert parser.failed
@@ -0,0 +1,81 @@
+import pytest
+
+from src.scheduler import PollScheduler
+
+
+def window_interval(scheduler, key):
+    return scheduler.get_stats()[key]['interval']
+
+
+def test_idle_polls_back_off_exponentially_to_max_interval():
+    scheduler = PollScheduler(min_interval=0.01, max_interval=0.08, backoff=2.0, cpu_cap=1.0)
+
+    intervals = []
+    for _ in range(5):
+        scheduler.record_poll('hwnd', 0.0, changed=False)
+        intervals.append(window_interval(scheduler, 'hwnd'))
+
+    assert intervals == pytest.approx([0.02, 0.04, 0.08, 0.08, 0.08])
+    assert scheduler.get_stats()['hwnd']['idle_polls'] == 5
+    assert not scheduler.is_due('hwnd')
+    assert 0.05 < scheduler.time_until_due(['hwnd']) <= 0.08
+
+
+def test_changed_frame_resets_interval():
+    scheduler = PollScheduler(min_interval=0.01, max_interval=1.0, backoff=2.0, cpu_cap=1.0)
+    for _ in range(4):
+        scheduler.record_poll('hwnd', 0.0, changed=False)
+
+    scheduler.record_poll('hwnd', 0.0, changed=True)
+
+    assert window_interval(scheduler, 'hwnd') == pytest.approx(0.01)
+    assert scheduler.time_until_due(['hwnd']) <= 0.01
+
+
+def test_action_starts_burst_at_min_interval():
+    scheduler = PollScheduler(min_interval=0.01, max_interval=1.0, backoff=2.0, burst_duration=60.0, cpu_cap=1.0)
+    for _ in range(6):
+        scheduler.record_poll('hwnd', 0.0, changed=False)
+    assert scheduler.time_until_due(['hwnd']) > 0.5
+
+    scheduler.notify_action('hwnd')
+    assert scheduler.is_due('hwnd')
+
+    # 突发模式内画面没有变化也按最短间隔轮询
+    scheduler.record_poll('hwnd', 0.0, changed=False)
+    assert scheduler.time_until_due(['hwnd']) <= 0.01
+    assert scheduler.get_stats()['hwnd']['bursts'] == 1
+
+
+@pytest.mark.parametrize("cpu_cap, busy, expected", [
+    (0.5, 0.2, 0.2),  # busy / (busy + delay) = 0.5
+    (0.25, 0.1, 0.3),  # busy / (busy + delay) = 0.25
+    (1.0, 0.2, 0.01),  # 不限制时使用最短间隔
+])
+def test_cpu_cap_delays_next_poll(cpu_cap, busy, expected):
+    scheduler = PollScheduler(min_interval=0.01, max_interval=1.0, burst_duration=60.0, cpu_cap=cpu_cap)
+    scheduler.notify_action('hwnd')
+
+    scheduler.record_poll('hwnd', busy, changed=True)
+
+    assert scheduler.time_until_due(['hwnd']) == pytest.approx(expected, abs=0.005)
+
+
+def test_invalid_cpu_cap_is_rejected():
+    with pytest.raises(ValueError):
+        PollScheduler(cpu_cap=0)
+    with pytest.raises(ValueError):
+        PollScheduler(cpu_cap=1.5)
+
+
+def test_windows_are_scheduled_independently():
+    scheduler = PollScheduler(min_interval=0.01, max_interval=1.0, cpu_cap=1.0)
+    for _ in range(6):
+        scheduler.record_poll('idle', 0.0, changed=False)
+
+    assert scheduler.is_due('new')  # 没有轮询记录的窗口立即到期
+    assert scheduler.time_until_due(['idle', 'new']) == 0.0
+    assert scheduler.time_until_due(['idle']) > 0.5
+
+    scheduler.forget('idle')
+    assert 'idle' not in scheduler.get_stats()
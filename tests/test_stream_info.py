@@ -0,0 +1,125 @@
+import re
+import threading
+
+import pytest
+
+from src.dumpcap_capture import format_command_line
+from src.rtmp_decoder import RtmpDecoder
+from src.stream_info import StreamInfoExtractor, extract_stream_info
+from src.synthetic_capture import generate_publish_capture
+
+FIELDS = ['frame.number', 'frame.time', '_ws.col.protocol', '_ws.col.info', 'ip.src', 'ip.dst',
+          'tcp.srcport', 'tcp.dstport', 'amf.string']
+
+
+def legacy_extract_stream_info(raw_string):
+    """app.py中原来的实现，用于确认增量提取的结果不变"""
+    results = []
+    server = None
+    for pattern in (r"tcUrl,(rtmp://[^,]+)", r"swfUrl,(rtmp://[^,]+)"):
+        server_match = re.search(pattern, raw_string)
+        if server_match:
+            server = server_match.group(1)
+            break
+    command_patterns = {
+        'releaseStream': r"releaseStream\('([^']+)'\)",
+        'FCPublish': r"FCPublish\('([^']+)'\)",
+        'publish': r"publish\('([^']+)'\)",
+        'connect': r"connect\('([^']+)'\)"
+    }
+    for command, pattern in command_patterns.items():
+        for match in re.finditer(pattern, raw_string):
+            results.append({'command': command, 'stream_code': match.group(1), 'server': server})
+    if not results and server:
+        results.append({'command': 'server_only', 'stream_code': None, 'server': server})
+    return results
+
+
+CAPTURES = {
+    'obs_publish': [
+        "12;Nov 14, 2023 22:13:20.000500000 CST;RTMP;connect('third');192.168.1.23;36.155.99.16;52814;1935;"
+        "connect,app,third,type,nonprivate,swfUrl,rtmp://push.example.com/third,tcUrl,rtmp://push.example.com/third",
+        "14;Nov 14, 2023 22:13:20.000600000 CST;RTMP;releaseStream('key-1?sign=a') | FCPublish('key-1?sign=a') "
+        "| createStream();192.168.1.23;36.155.99.16;52814;1935;releaseStream,key-1?sign=a,FCPublish,key-1?sign=a,"
+        "createStream",
+        "17;Nov 14, 2023 22:13:20.000700000 CST;RTMP;publish('key-1?sign=a');192.168.1.23;36.155.99.16;52814;1935;"
+        "publish,key-1?sign=a,live",
+    ],
+    'swf_only': [
+        "3;t;RTMP;connect('live');1.1.1.1;2.2.2.2;5000;1935;app,live,swfUrl,rtmp://swf.example.com/live",
+        "5;t;RTMP;publish('k');1.1.1.1;2.2.2.2;5000;1935;publish,k",
+    ],
+    'server_only': [
+        "3;t;RTMP;_result();2.2.2.2;1.1.1.1;1935;5000;tcUrl,rtmp://only.example.com/app",
+    ],
+    'two_sessions': [
+        "1;t;RTMP;connect('a');1.1.1.1;2.2.2.2;5000;1935;tcUrl,rtmp://first.example.com/a",
+        "2;t;RTMP;publish('k1');1.1.1.1;2.2.2.2;5000;1935;publish,k1",
+        "9;t;RTMP;connect('b');1.1.1.1;3.3.3.3;5001;1935;tcUrl,rtmp://second.example.com/b",
+        "10;t;RTMP;publish('k2');1.1.1.1;3.3.3.3;5001;1935;publish,k2",
+    ],
+    'nothing': ["1;t;TCP;52814 → 1935 [ACK];1.1.1.1;2.2.2.2;5000;1935;"],
+}
+
+
+@pytest.mark.parametrize("name", sorted(CAPTURES))
+def test_incremental_matches_legacy(name):
+    lines = CAPTURES[name]
+    extractor = StreamInfoExtractor()
+    for line in lines:
+        extractor.feed(line)
+
+    expected = legacy_extract_stream_info(",".join(lines))
+    assert extractor.get_results() == expected
+    assert extract_stream_info(",".join(lines)) == expected
+
+
+def test_current_stream_info_follows_latest_session():
+    extractor = StreamInfoExtractor()
+    for line in CAPTURES['two_sessions']:
+        extractor.feed(line)
+
+    assert extractor.get_current() == {'server': 'rtmp://second.example.com/b', 'stream_code': 'k2'}
+    assert [record.frame_number for record in extractor.records] == [1, 2, 9, 10]
+
+    extractor.reset()
+    assert extractor.get_current() == {'server': None, 'stream_code': None}
+    assert extractor.get_results() == []
+
+
+def test_decoded_lines_feed_extractor_like_tshark(tmp_path):
+    # RtmpDecoder的输出按tshark字段格式化后，提取结果与直接添加记录相同
+    path = str(tmp_path / "publish.pcapng")
+    expected = generate_publish_capture(path)
+    decoder = RtmpDecoder()
+    with open(path, 'rb') as f:
+        commands = list(decoder.decode(f))
+
+    from_lines = StreamInfoExtractor()
+    for command in commands:
+        from_lines.feed(format_command_line(command, FIELDS))
+    from_records = StreamInfoExtractor()
+    from_records.add_records(decoder.records(commands))
+
+    assert from_lines.get_results() == from_records.get_results()
+    assert from_lines.get_current() == {'server': expected['server'], 'stream_code': expected['stream_key']}
+
+
+def test_line_count_is_exact_with_concurrent_feeds():
+    # 输出回调可能在多个线程中调用feed()，行数计数不能丢失
+    extractor = StreamInfoExtractor()
+    noise = "1;Nov 14, 2023 22:13:20.000000000 CST;TCP;ack"
+    command = "2;Nov 14, 2023 22:13:20.000000000 CST;RTMP;publish('live-key')"
+
+    def worker():
+        for i in range(5000):
+            extractor.feed(command if i % 10 == 0 else noise)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert extractor.lines == 4 * 5000
+    assert len(extractor.records) == 4 * 500
@@ -0,0 +1,56 @@
+import cv2
+import pytest
+
+from src import application_operation
+from src.application_operation import WindowController, TemplateSpec
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import compose_frame
+
+IMG_TMP_DIR = "img_tmp"
+SIZE = (1280, 800)
+BUTTON = TemplateSpec("main_start_live.png", 0.85)
+
+
+@pytest.mark.parametrize("dpi_scale", [1.0, 1.25, 1.5, 2.0])
+@pytest.mark.parametrize("mode", ["full", "pyramid"])
+def test_prescaled_template_matches_native_frame(monkeypatch, dpi_scale, mode):
+    position = (700, 500)
+    frame, embedded = compose_frame(IMG_TMP_DIR, [BUTTON.template_path], SIZE, scale=dpi_scale,
+                                    placements={BUTTON.template_path: position})
+    backend = ReplayBackend(advance='manual')
+    hwnd = backend.add_window([frame], dpi_scale=dpi_scale)
+
+    with WindowController(launcher_path=None, frame_source=backend) as controller:
+        controller.set_img_tmp_dir(IMG_TMP_DIR)
+        controller.set_match_mode(mode)
+        controller.use_region_search = False
+        controller.set_window_handle(hwnd)
+
+        # 截图保持物理像素分辨率，不应缩放整张截图
+        resized = []
+        resize = cv2.resize
+
+        def recording_resize(image, *args, **kwargs):
+            resized.append(image.shape)
+            return resize(image, *args, **kwargs)
+
+        monkeypatch.setattr(application_operation.cv2, 'resize', recording_resize)
+        matches = controller.match_all([BUTTON])
+
+    assert all(shape[:2] != (SIZE[1], SIZE[0]) for shape in resized if len(shape) == 3)
+    assert len(matches) == 1
+    x, y, width, height = embedded[BUTTON.template_path]
+    assert matches[0]['template_size'] == (width, height)
+    assert matches[0]['confidence'] >= BUTTON.confidence
+    assert matches[0]['client_position'] == (x + width // 2, y + height // 2)
+
+
+def test_missing_template_is_not_reported_below_confidence():
+    frame, _ = compose_frame(IMG_TMP_DIR, [], SIZE)
+    backend = ReplayBackend(advance='manual')
+    hwnd = backend.add_window([frame], dpi_scale=1.5)
+
+    with WindowController(launcher_path=None, frame_source=backend) as controller:
+        controller.set_img_tmp_dir(IMG_TMP_DIR)
+        controller.set_window_handle(hwnd)
+        assert controller.match_all([BUTTON]) == []
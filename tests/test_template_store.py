@@ -0,0 +1,68 @@
+import os
+
+import cv2
+import numpy as np
+
+from src.template_store import TemplateStore
+
+
+def write_template(path, width, height, value=128, mtime=None):
+    cv2.imwrite(str(path), np.full((height, width, 3), value, np.uint8))
+    if mtime is not None:
+        os.utime(str(path), (mtime, mtime))
+
+
+def test_cached_template_is_reused_until_file_changes(tmp_path):
+    write_template(tmp_path / "button.png", 40, 20, mtime=1_700_000_000)
+    store = TemplateStore(str(tmp_path), mtime_check_interval=0)
+
+    template, size = store.get("button.png")
+    assert size == (40, 20)
+    assert store.get("button.png")[0] is template
+    assert store.get_stats()['misses'] == 1
+    assert store.get_stats()['reloads'] == 0
+
+    # 文件被替换（修改时间变化）后重新加载，旧的缩放模板一并失效
+    store.get("button.png", 1.5)
+    write_template(tmp_path / "button.png", 60, 30, value=200, mtime=1_700_000_100)
+    template, size = store.get("button.png")
+    assert size == (60, 30)
+    assert int(template[0, 0, 0]) == 200
+    assert store.get("button.png", 1.5)[1] == (90, 45)
+    stats = store.get_stats()
+    assert stats['reloads'] == 1
+    assert stats['misses'] == 2
+
+
+def test_mtime_is_checked_at_most_once_per_interval(tmp_path):
+    write_template(tmp_path / "button.png", 40, 20, mtime=1_700_000_000)
+    store = TemplateStore(str(tmp_path), mtime_check_interval=3600)
+    store.get("button.png")
+
+    write_template(tmp_path / "button.png", 60, 30, mtime=1_700_000_100)
+    assert store.get("button.png")[1] == (40, 20)  # 检查间隔内不访问文件系统
+
+    store.mtime_check_interval = 0
+    assert store.get("button.png")[1] == (60, 30)
+
+
+def test_deleted_template_is_dropped(tmp_path):
+    write_template(tmp_path / "button.png", 40, 20)
+    store = TemplateStore(str(tmp_path), mtime_check_interval=0)
+    assert store.get("button.png")[0] is not None
+
+    os.remove(str(tmp_path / "button.png"))
+
+    assert store.get("button.png") == (None, None)
+    assert store.get_stats()['templates'] == 0
+
+
+def test_scaled_variants_are_built_once(tmp_path):
+    write_template(tmp_path / "button.png", 40, 20)
+    store = TemplateStore(str(tmp_path))
+
+    scaled, size = store.get("button.png", 1.25)
+    assert size == (50, 25)
+    assert store.get("button.png", 1.25)[0] is scaled
+    assert store.get("button.png", 1.02)[1] == (40, 20)  # 接近1.0的比例直接使用原模板
+    assert store.get_stats()['scaled_builds'] == 1
@@ -0,0 +1,93 @@
+import time
+
+import numpy as np
+
+from src.replay_backend import ReplayBackend
+from src.synthetic_frames import make_background
+from src.window_registry import WindowRegistry
+
+CLASS_NAME = "Chrome_WidgetWin_1"
+TITLE = "直播伴侣"
+
+
+def black(size):
+    return np.zeros((size[1], size[0], 3), np.uint8)
+
+
+def test_roles_by_area_transparency_and_black_capture():
+    backend = ReplayBackend(advance='manual')
+    main = backend.add_window([make_background((1280, 800))])
+    dialog = backend.add_window([make_background((400, 300), seed=1)], position=(400, 250))
+    overlay = backend.add_window([black((1280, 800))], transparent=True)
+    blank = backend.add_window([black((1600, 900))])
+    registry = WindowRegistry(backend)
+    registry.find(CLASS_NAME, TITLE)
+
+    assert registry.get_role(main) == WindowRegistry.MAIN
+    assert registry.get_role(dialog) == WindowRegistry.SECONDARY
+    assert registry.get_role(overlay) == WindowRegistry.OVERLAY
+    assert registry.get_role(blank) == WindowRegistry.OVERLAY  # 面积最大但截图全黑，不能作为主窗口
+
+
+def test_black_capture_overlay_expires():
+    backend = ReplayBackend(advance='manual')
+    hwnd = backend.add_window([black((800, 600)), make_background((800, 600))])
+    registry = WindowRegistry(backend, black_overlay_ttl=0.05)
+    registry.find(CLASS_NAME, TITLE)
+    assert registry.get_role(hwnd) == WindowRegistry.OVERLAY
+
+    backend.advance(hwnd)
+    assert registry.get_role(hwnd) == WindowRegistry.OVERLAY  # 有效期内不重新截图分类
+    time.sleep(0.06)
+    assert registry.get_role(hwnd) == WindowRegistry.MAIN
+
+
+def test_normal_frame_clears_black_overlay_immediately():
+    backend = ReplayBackend(advance='manual')
+    hwnd = backend.add_window([black((800, 600)), make_background((800, 600))])
+    registry = WindowRegistry(backend, black_overlay_ttl=60.0)
+    registry.find(CLASS_NAME, TITLE)
+    assert registry.get_role(hwnd) == WindowRegistry.OVERLAY
+
+    backend.advance(hwnd)
+    registry.note_frame(hwnd, black=False)
+
+    assert registry.get_role(hwnd) == WindowRegistry.MAIN
+
+
+def test_transparent_overlay_is_permanent():
+    backend = ReplayBackend(advance='manual')
+    hwnd = backend.add_window([black((800, 600))], transparent=True)
+    registry = WindowRegistry(backend, black_overlay_ttl=0.0)
+    registry.find(CLASS_NAME, TITLE)
+
+    registry.note_frame(hwnd, black=False)
+
+    assert registry.get_role(hwnd) == WindowRegistry.OVERLAY
+
+
+def test_each_process_has_its_own_main_window():
+    backend = ReplayBackend(advance='manual')
+    first_main = backend.add_window([make_background((1280, 800))], process_id=1)
+    first_dialog = backend.add_window([make_background((400, 300))], process_id=1)
+    second_main = backend.add_window([make_background((1024, 768))], process_id=2)
+    registry = WindowRegistry(backend)
+    registry.find(CLASS_NAME, TITLE)
+
+    assert registry.get_role(first_main) == WindowRegistry.MAIN
+    assert registry.get_role(first_dialog) == WindowRegistry.SECONDARY
+    assert registry.get_role(second_main) == WindowRegistry.MAIN
+
+
+def test_resize_reclassifies_group():
+    backend = ReplayBackend(advance='manual')
+    first = backend.add_window([make_background((1280, 800)), make_background((300, 200))])
+    second = backend.add_window([make_background((800, 600))])
+    registry = WindowRegistry(backend)
+    registry.find(CLASS_NAME, TITLE)
+    assert registry.get_role(first) == WindowRegistry.MAIN
+
+    backend.advance(first)  # 窗口尺寸变小
+
+    assert registry.get_role(first) == WindowRegistry.SECONDARY
+    assert registry.get_role(second) == WindowRegistry.MAIN